@@ -3,6 +3,83 @@ DEFAULT_FACE_DETECTION_MODEL = "app/models/yolov8n-face.onnx"
 DEFAULT_FACENET_MODEL = "app/models/facenet.onnx"
 # MEDIUM_OBJ_DETECTION_MODEL = "app/models/yolov8m.onnx" # not supported
 
+# Load the models in the background at startup instead of on first use
+WARM_UP_MODELS = True
+
+# Dynamic micro-batching of concurrent inference requests (1 disables batching).
+# Only helps models exported with a dynamic batch size; models with a static
+# batch size of 1, like the shipped YOLOv8 and FaceNet ones, always run unbatched.
+INFERENCE_BATCH_SIZE = 8
+INFERENCE_BATCH_WAIT_MS = 5
+# Feed YOLOv8 input buffers to ONNX Runtime through IOBinding (no batching)
+YOLO_USE_IO_BINDING = False
+
+# ONNX Runtime performance profile applied to every session. Thread counts of
+# 0 let ONNX Runtime decide; inter-op threads only matter in "parallel" mode.
+ONNX_INTRA_OP_THREADS = 0
+ONNX_INTER_OP_THREADS = 0
+ONNX_EXECUTION_MODE = "sequential"  # "sequential" or "parallel"
+ONNX_GRAPH_OPTIMIZATION_LEVEL = "all"  # "disabled", "basic", "extended" or "all"
+# Optimized graphs are saved here and reused by later startups ("" disables)
+ONNX_OPTIMIZED_MODEL_DIR = "app/models/optimized"
+
+# INT8 model variants: "" keeps the float models, "dynamic" or "static" selects
+# the quantized ones, which are only used once `benchmarks.bench_quantization`
+# has recorded that they pass the gate below
+ONNX_QUANTIZATION = ""
+QUANTIZATION_REPORT_PATH = "app/models/quantization_report.json"
+QUANTIZATION_MIN_CLASS_AGREEMENT = 0.95  # images with identical class sets
+QUANTIZATION_MIN_BOX_IOU = 0.85  # mean IoU of matched detections
+QUANTIZATION_MAX_EMBEDDING_DRIFT = 0.02  # mean 1 - cosine similarity
+QUANTIZATION_MIN_SPEEDUP = 1.0  # float latency / INT8 latency
+
+# Face quality filter between face detection and FaceNet: faces with a
+# detection score of at most FACE_MIN_SCORE, a box side shorter than
+# FACE_MIN_SIZE original pixels, or a crop sharpness (variance of the
+# Laplacian at 160x160) below FACE_MIN_SHARPNESS are recorded as skipped
+# instead of embedded (0 disables the size and sharpness checks)
+FACE_MIN_SCORE = 0.3
+FACE_MIN_SIZE = 24
+FACE_MIN_SHARPNESS = 20.0
+
+# Update face clusters in place instead of refitting DBSCAN on every removal
+FACE_CLUSTER_INCREMENTAL = True
+# Full reclustering: "sparse" runs DBSCAN on a sparse neighborhood graph built
+# in bounded memory, "sharded" splits that work into k-means shards clustered
+# in FACE_CLUSTER_WORKERS processes (0 for one per CPU), "sklearn" runs on the
+# raw embeddings (O(n^2) memory)
+FACE_CLUSTER_BACKEND = "sparse"
+FACE_CLUSTER_WORKERS = 0
+# Nearest-neighbor index behind face clustering: "ivf" (approximate, scans
+# FACE_INDEX_NPROBE buckets per query) or "exact" (brute force)
+FACE_INDEX = "ivf"
+FACE_INDEX_NPROBE = 16
+# New faces within eps - margin of a cluster centroid join that cluster and
+# faces beyond eps + margin of every centroid start a new one, without
+# looking up their nearest face (non-incremental clustering only)
+FACE_CENTROID_MARGIN = 0.05
+# Storage type of the face embeddings clustering works on: "float32" or
+# "float16" (half the memory, rounded to about 3 significant digits)
+FACE_EMBEDDING_DTYPE = "float32"
+# Project face embeddings to this many dimensions (0 keeps all 512) with a PCA
+# fitted on the library whenever all faces are clustered from scratch or
+# loaded from the database, if there are FACE_PROJECTION_MIN_FACES. The
+# projection is only used if at least FACE_PROJECTION_MIN_RECALL of the
+# eps-neighbor pairs of sampled faces survive it (and of the pairs it finds
+# were neighbors before); the database always keeps the full embeddings
+FACE_PROJECTION_DIM = 0
+FACE_PROJECTION_MIN_FACES = 1000
+FACE_PROJECTION_MIN_RECALL = 0.95
+# Restore face clusters at startup from a memory-mapped snapshot next to the
+# database, rebuilt from the database only when it is stale; the incremental
+# clustering state is then rebuilt from it in the background
+FACE_CLUSTER_SNAPSHOT = True
+# Without incremental clustering, refit the face clusters in the background
+# once this many faces were added or removed, and at least every
+# FACE_RECLUSTER_INTERVAL seconds while any were
+FACE_RECLUSTER_THRESHOLD = 500
+FACE_RECLUSTER_INTERVAL = 600
+
 TEST_INPUT_PATH = "tests/inputs"
 TEST_OUTPUT_PATH = "tests/outputs"
 DATABASE_PATH = "app/database/PictoPy.db"
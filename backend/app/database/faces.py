@@ -1,56 +1,167 @@
 import sqlite3
 import json
+import logging
 import numpy as np
 from app.config.settings import DATABASE_PATH
 
+logger = logging.getLogger(__name__)
+
 
 def create_faces_table():
     # Connect to the SQLite database
     conn = sqlite3.connect(DATABASE_PATH)
     cursor = conn.cursor()
 
-    # Create 'faces' table if it doesn't already exist
+    # Older databases store each image's embeddings as one JSON list
+    cursor.execute("PRAGMA table_info(faces)")
+    columns = [row[1] for row in cursor.fetchall()]
+    if "embeddings" in columns:
+        cursor.execute("ALTER TABLE faces RENAME TO faces_json")
+
+    # Create 'faces' table if it doesn't already exist, one row per face with
+    # the embedding as raw float32 bytes
     cursor.execute(
         """
         CREATE TABLE IF NOT EXISTS faces (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
-            image_id INTEGER,
-            embeddings TEXT,
+            image_id INTEGER NOT NULL,
+            face_index INTEGER NOT NULL,
+            embedding BLOB NOT NULL,
+            x1 REAL,
+            y1 REAL,
+            x2 REAL,
+            y2 REAL,
+            score REAL,
+            UNIQUE (image_id, face_index),
             FOREIGN KEY (image_id) REFERENCES image_id_mapping(id) ON DELETE CASCADE
         )
     """
     )
+
+    # Detected faces the quality filter kept from being embedded, with why
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS skipped_faces (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            image_id INTEGER NOT NULL,
+            x1 REAL,
+            y1 REAL,
+            x2 REAL,
+            y2 REAL,
+            score REAL,
+            reason TEXT NOT NULL,
+            FOREIGN KEY (image_id) REFERENCES image_id_mapping(id) ON DELETE CASCADE
+        )
+    """
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS skipped_faces_image_id ON skipped_faces (image_id)"
+    )
+
+    if "embeddings" in columns:
+        migrate_json_embeddings(cursor)
     conn.commit()
     conn.close()
 
 
-def insert_face_embeddings(image_path, embeddings):
+def migrate_json_embeddings(cursor):
+    # Move the rows of the old JSON table into the per-face table; for images
+    # stored several times the latest row wins
+    cursor.execute("SELECT image_id, embeddings FROM faces_json ORDER BY id")
+    latest = {}
+    for image_id, embeddings_json in cursor.fetchall():
+        latest[image_id] = json.loads(embeddings_json)
+
+    cursor.executemany(
+        "INSERT INTO faces (image_id, face_index, embedding) VALUES (?, ?, ?)",
+        [
+            (image_id, face_index, embedding_to_blob(embedding))
+            for image_id, embeddings in latest.items()
+            for face_index, embedding in enumerate(embeddings)
+        ],
+    )
+    cursor.execute("DROP TABLE faces_json")
+    logger.info(f"Migrated face embeddings of {len(latest)} images to the faces table")
+
+
+def embedding_to_blob(embedding):
+    return np.asarray(embedding, dtype=np.float32).tobytes()
+
+
+def blob_to_embedding(blob):
+    # A read-only view of the bytes returned by SQLite, not a copy
+    return np.frombuffer(blob, dtype=np.float32)
+
+
+def insert_face_embeddings(image_path, embeddings, boxes=None, scores=None, conn=None):
+    """
+    Store the face embeddings of an image, replacing any stored before, with
+    their optional bounding boxes (x1, y1, x2, y2) and detection scores. If
+    `conn` is given the insert is made on it and left uncommitted, so the
+    caller can commit it together with related writes.
+    """
     from app.database.images import get_id_from_path
 
     # Connect to database
-    conn = sqlite3.connect(DATABASE_PATH)
+    own_connection = conn is None
+    if own_connection:
+        conn = sqlite3.connect(DATABASE_PATH)
     cursor = conn.cursor()
 
     # Get image_id from the given image path
     image_id = get_id_from_path(image_path)
     if image_id is None:
-        conn.close()
+        if own_connection:
+            conn.close()
         raise ValueError(f"Image '{image_path}' not found in the database")
 
-    # Convert NumPy embeddings to JSON string
-    embeddings_json = json.dumps([emb.tolist() for emb in embeddings])
+    boxes = boxes if boxes is not None else [(None, None, None, None)] * len(embeddings)
+    scores = scores if scores is not None else [None] * len(embeddings)
+    rows = [
+        (
+            image_id,
+            face_index,
+            embedding_to_blob(embedding),
+            *(None if value is None else float(value) for value in box),
+            None if score is None else float(score),
+        )
+        for face_index, (embedding, box, score) in enumerate(
+            zip(embeddings, boxes, scores)
+        )
+    ]
 
-    # Insert or update embeddings for the image
-    cursor.execute(
+    # Re-processing an image replaces its faces
+    cursor.execute("DELETE FROM faces WHERE image_id = ?", (image_id,))
+    cursor.executemany(
         """
-        INSERT OR REPLACE INTO faces (image_id, embeddings)
-        VALUES (?, ?)
+        INSERT INTO faces (image_id, face_index, embedding, x1, y1, x2, y2, score)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
     """,
-        (image_id, embeddings_json),
+        rows,
     )
 
-    conn.commit()
-    conn.close()
+    if own_connection:
+        conn.commit()
+        conn.close()
+
+
+def insert_skipped_faces(image_id, skipped, conn):
+    """
+    Record the faces of an image the quality filter skipped, as (box, score,
+    reason) tuples, replacing any recorded before. The insert is made on
+    `conn` and left uncommitted.
+    """
+    conn.execute("DELETE FROM skipped_faces WHERE image_id = ?", (image_id,))
+    conn.executemany(
+        """
+        INSERT INTO skipped_faces (image_id, x1, y1, x2, y2, score, reason)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """,
+        [
+            (image_id, *(float(value) for value in box), float(score), reason)
+            for box, score, reason in skipped
+        ],
+    )
 
 
 def get_face_embeddings(image_path):
@@ -69,50 +180,48 @@ def get_face_embeddings(image_path):
     # Fetch embeddings from DB
     cursor.execute(
         """
-        SELECT embeddings FROM faces
+        SELECT embedding FROM faces
         WHERE image_id = ?
+        ORDER BY face_index
     """,
         (image_id,),
     )
 
-    result = cursor.fetchone()
+    results = cursor.fetchall()
     conn.close()
 
-    # Convert JSON back to NumPy array
-    if result:
-        embeddings_json = result[0]
-        embeddings = np.array(json.loads(embeddings_json))
-        return embeddings
+    if results:
+        return np.stack([blob_to_embedding(row[0]) for row in results])
     else:
         return None
 
 
 def get_all_face_embeddings():
-    from app.database.images import get_path_from_id
-
     # Connect to database
     conn = sqlite3.connect(DATABASE_PATH)
     cursor = conn.cursor()
 
-    # Fetch all embeddings and image_ids
+    # Fetch all embeddings with their image paths, grouped by image
     cursor.execute(
         """
-        SELECT image_id, embeddings FROM faces
+        SELECT faces.image_id, image_id_mapping.path, faces.embedding
+        FROM faces
+        LEFT JOIN image_id_mapping ON image_id_mapping.id = faces.image_id
+        ORDER BY faces.image_id, faces.face_index
     """
     )
 
     results = cursor.fetchall()
-    all_embeddings = []
+    conn.close()
 
-    # Process each result and convert JSON back to NumPy
-    for image_id, embeddings_json in results:
-        image_path = get_path_from_id(image_id)
-        embeddings = np.array(json.loads(embeddings_json))
-        all_embeddings.append({"image_path": image_path, "embeddings": embeddings})
+    # Embeddings are float32 views of the fetched blobs, in face order
+    all_embeddings = {}
+    for image_id, image_path, blob in results:
+        if image_id not in all_embeddings:
+            all_embeddings[image_id] = {"image_path": image_path, "embeddings": []}
+        all_embeddings[image_id]["embeddings"].append(blob_to_embedding(blob))
 
-    print("returning")
-    conn.close()
-    return all_embeddings
+    return list(all_embeddings.values())
 
 
 def delete_face_embeddings(image_id):
@@ -121,6 +230,7 @@ def delete_face_embeddings(image_id):
     cursor = conn.cursor()
 
     cursor.execute("DELETE FROM faces WHERE image_id = ?", (image_id,))
+    cursor.execute("DELETE FROM skipped_faces WHERE image_id = ?", (image_id,))
 
     conn.commit()
     conn.close()
@@ -131,8 +241,10 @@ def cleanup_face_embeddings():
     conn = sqlite3.connect(DATABASE_PATH)
     cursor = conn.cursor()
 
-    # Get all image_ids from 'faces' table
-    cursor.execute("SELECT DISTINCT image_id FROM faces")
+    # Get all image_ids from the 'faces' and 'skipped_faces' tables
+    cursor.execute(
+        "SELECT image_id FROM faces UNION SELECT image_id FROM skipped_faces"
+    )
     face_image_ids = set(row[0] for row in cursor.fetchall())
 
     # Get valid image_ids from 'image_id_mapping'
@@ -145,6 +257,7 @@ def cleanup_face_embeddings():
     # Delete orphaned embeddings
     for orphaned_id in orphaned_ids:
         cursor.execute("DELETE FROM faces WHERE image_id = ?", (orphaned_id,))
+        cursor.execute("DELETE FROM skipped_faces WHERE image_id = ?", (orphaned_id,))
 
     conn.commit()
     conn.close()
@@ -0,0 +1,412 @@
+from __future__ import annotations
+
+import logging
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from numpy.typing import NDArray
+
+from app.facecluster.incremental_dbscan import normalize_rows
+
+logger = logging.getLogger(__name__)
+
+
+class ExactIndex:
+    """
+    Brute-force cosine index over face embeddings, addressed by integer keys.
+
+    Vectors are stored unit-length in a growable float32 matrix. Removed keys
+    only mark their slot dead; dead slots are compacted away once they make
+    up half of the matrix.
+
+    Attributes:
+        dim: Embedding dimension, set by the first added vector
+    """
+
+    def __init__(self) -> None:
+        self.dim: Optional[int] = None
+        self._vectors = np.empty((0, 0), dtype=np.float32)
+        self._keys = np.empty(0, dtype=np.int64)
+        self._alive = np.empty(0, dtype=bool)
+        self._size = 0
+        self._slots: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, key: int) -> bool:
+        return key in self._slots
+
+    def add(self, keys: Sequence[int], vectors: NDArray) -> None:
+        """
+        Insert vectors under the given keys.
+
+        Args:
+            keys: One new key per vector
+            vectors: (M, D) embeddings
+        """
+        vectors = normalize_rows(np.atleast_2d(vectors))
+        if len(keys) != len(vectors):
+            raise ValueError("Number of keys must match number of vectors")
+        if len(vectors) == 0:
+            return
+        duplicates = [key for key in keys if int(key) in self._slots]
+        if duplicates:
+            raise ValueError(f"Keys already indexed: {duplicates}")
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+            self._vectors = np.empty((0, self.dim), dtype=np.float32)
+
+        needed = self._size + len(vectors)
+        if needed > len(self._vectors):
+            self._resize(max(needed, 2 * len(self._vectors), 64))
+
+        slots = np.arange(self._size, needed)
+        self._vectors[slots] = vectors
+        self._keys[slots] = keys
+        self._alive[slots] = True
+        self._size = needed
+        for key, slot in zip(keys, slots.tolist()):
+            self._slots[int(key)] = slot
+        self._on_add(slots)
+
+    def remove(self, keys: Sequence[int]) -> None:
+        """Drop the vectors stored under `keys`, ignoring unknown keys."""
+        slots = [self._slots.pop(int(key)) for key in keys if int(key) in self._slots]
+        if not slots:
+            return
+        self._alive[slots] = False
+        if len(self._slots) < self._size // 2:
+            self._compact()
+
+    def _resize(self, capacity: int) -> None:
+        vectors = np.empty((capacity, self.dim), dtype=np.float32)
+        vectors[: self._size] = self._vectors[: self._size]
+        keys = np.zeros(capacity, dtype=np.int64)
+        keys[: self._size] = self._keys[: self._size]
+        alive = np.zeros(capacity, dtype=bool)
+        alive[: self._size] = self._alive[: self._size]
+        self._vectors, self._keys, self._alive = vectors, keys, alive
+
+    def _compact(self) -> None:
+        # Keep live vectors only, in their original order
+        live = np.flatnonzero(self._alive[: self._size])
+        remap = np.full(self._size, -1, dtype=np.int64)
+        remap[live] = np.arange(len(live))
+        self._vectors[: len(live)] = self._vectors[live]
+        self._keys[: len(live)] = self._keys[live]
+        self._alive[: len(live)] = True
+        self._alive[len(live) : self._size] = False
+        self._size = len(live)
+        self._slots = {
+            int(key): slot for slot, key in enumerate(self._keys[: self._size])
+        }
+        self._on_compact(remap)
+
+    def _on_add(self, slots: NDArray) -> None:
+        """Hook for subclasses, called with the slots of new vectors."""
+
+    def _on_compact(self, remap: NDArray) -> None:
+        """Hook for subclasses, called with the old slot -> new slot mapping."""
+
+    def _candidates(
+        self, query: NDArray, eps: Optional[float] = None, exact: bool = False
+    ) -> NDArray:
+        """Slots worth comparing with `query` (all of them for exact search)."""
+        return np.arange(self._size)
+
+    def _search(
+        self, query: NDArray, eps: Optional[float] = None, exact: bool = False
+    ) -> Tuple[NDArray, NDArray]:
+        query = normalize_rows(np.atleast_2d(query))[0]
+        slots = self._candidates(query, eps, exact)
+        slots = slots[self._alive[slots]]
+        distances = 1 - self._vectors[slots] @ query
+        np.clip(distances, 0, 2, out=distances)
+        return slots, distances
+
+    def knn(
+        self, query: NDArray, k: int, exact: bool = False
+    ) -> Tuple[NDArray, NDArray]:
+        """
+        Find the `k` nearest stored vectors by cosine distance.
+
+        Args:
+            query: (D,) embedding
+            k: Number of neighbors
+            exact: Scan every vector even if the index is approximate
+
+        Returns:
+            Tuple of (keys, distances), nearest first; fewer than `k` (even
+            none) if the scanned vectors were removed
+        """
+        slots, distances = self._search(query, exact=exact)
+        if k < len(slots):
+            nearest = np.argpartition(distances, k - 1)[:k]
+            slots, distances = slots[nearest], distances[nearest]
+        order = np.argsort(distances, kind="stable")
+        return self._keys[slots[order]], distances[order]
+
+    def radius(
+        self, query: NDArray, eps: float, exact: bool = False
+    ) -> Tuple[NDArray, NDArray]:
+        """
+        Find the stored vectors within cosine distance `eps` (inclusive).
+
+        Args:
+            query: (D,) embedding
+            eps: Maximum cosine distance
+            exact: Find all of them even if the index is approximate
+
+        Returns:
+            Tuple of (keys, distances) in insertion order
+        """
+        slots, distances = self._search(query, eps, exact)
+        within = distances <= eps
+        slots, distances = slots[within], distances[within]
+        order = np.argsort(slots, kind="stable")
+        return self._keys[slots[order]], distances[order]
+
+    def radius_batch(
+        self, queries: NDArray, eps: float, exact: bool = False
+    ) -> List[NDArray]:
+        """
+        `radius` of many queries at once, comparing blocks of queries with
+        the stored vectors in one matrix product.
+
+        Args:
+            queries: (M, D) embeddings
+            eps: Maximum cosine distance
+            exact: Find all of them even if the index is approximate
+
+        Returns:
+            List of M arrays with the keys of the matches, in insertion order
+        """
+        queries = normalize_rows(np.atleast_2d(queries))
+        return self._radius_block(queries, None, eps)
+
+    def _radius_block(
+        self,
+        queries: NDArray,
+        slots: Optional[NDArray],
+        eps: float,
+        max_pairs: int = 1 << 24,
+    ) -> List[NDArray]:
+        # Keys within eps of each query among `slots` (all if None), sorted by
+        # slot; all slots are read in place, a subset is gathered first
+        if slots is None:
+            slots = np.flatnonzero(self._alive[: self._size])
+            vectors = self._vectors[: self._size]
+            columns: Optional[NDArray] = slots
+        else:
+            slots = np.sort(slots)
+            slots = slots[self._alive[slots]]
+            vectors = self._vectors[slots]
+            columns = None
+        found: List[NDArray] = []
+        chunk_size = max(1, max_pairs // max(len(vectors), 1))
+        for start in range(0, len(queries), chunk_size):
+            chunk = queries[start : start + chunk_size]
+            distances = chunk @ vectors.T
+            distances *= -1
+            distances += 1
+            np.clip(distances, 0, 2, out=distances)
+            if columns is not None:
+                distances = distances[:, columns]
+            rows, cols = np.nonzero(distances <= eps)
+            splits = np.searchsorted(rows, range(1, len(chunk)))
+            found.extend(self._keys[slots[cols]] for cols in np.split(cols, splits))
+        return found
+
+
+class IVFFlatIndex(ExactIndex):
+    """
+    Inverted-file cosine index: vectors are bucketed by their nearest k-means
+    centroid and a query only scans the `nprobe` buckets whose centroids are
+    closest to it.
+
+    Until `min_train_size` vectors are stored the index scans everything.
+    It then trains `nlist` centroids (sqrt of the size by default) with
+    spherical k-means, and retrains when the size has grown `retrain_factor`
+    times since, so buckets stay balanced as the library grows.
+
+    Radius queries also skip buckets that provably hold nothing within `eps`,
+    using each bucket's radius around its centroid. With `exact=True`, or for
+    a radius query asking for exact results, every other bucket is scanned
+    too, which gives exact results.
+
+    Attributes:
+        nlist: Number of buckets, None to pick sqrt(size) when training
+        nprobe: Number of buckets scanned per query
+        exact: Scan every bucket that may hold a match, ignoring `nprobe`
+        min_train_size: Number of vectors needed before training
+        retrain_factor: Growth since the last training that triggers a retrain
+        seed: Seed for k-means initialisation
+    """
+
+    def __init__(
+        self,
+        nlist: Optional[int] = None,
+        nprobe: int = 16,
+        exact: bool = False,
+        min_train_size: int = 4096,
+        retrain_factor: float = 4.0,
+        seed: int = 0,
+    ) -> None:
+        super().__init__()
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.exact = exact
+        self.min_train_size = min_train_size
+        self.retrain_factor = retrain_factor
+        self.seed = seed
+        self._centroids: Optional[NDArray] = None
+        self._trained_size = 0
+        self._lists: List[List[int]] = []
+        self._list_arrays: List[Optional[NDArray]] = []
+        # Largest Euclidean distance between a bucket member and its centroid
+        self._list_radius = np.empty(0, dtype=np.float32)
+
+    @property
+    def trained(self) -> bool:
+        return self._centroids is not None
+
+    def _on_add(self, slots: NDArray) -> None:
+        if not self.trained:
+            if len(self) >= self.min_train_size:
+                self.train()
+            return
+        if len(self) >= self._trained_size * self.retrain_factor:
+            self.train()
+            return
+        self._assign(slots)
+
+    def _on_compact(self, remap: NDArray) -> None:
+        if self.trained:
+            self._fill_lists()
+
+    def train(self) -> None:
+        """(Re)build the centroids from the stored vectors and refill buckets."""
+        live = np.flatnonzero(self._alive[: self._size])
+        nlist = self.nlist or max(1, int(math.sqrt(len(live))))
+        nlist = min(nlist, len(live))
+        rng = np.random.default_rng(self.seed)
+
+        # A sample is enough to place the centroids
+        sample_size = min(len(live), 64 * nlist)
+        sample = self._vectors[rng.choice(live, size=sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, size=nlist, replace=False)].copy()
+        for _ in range(10):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            counts = np.bincount(assignment, minlength=nlist)
+            empty = counts == 0
+            sums[empty] = sample[rng.choice(sample_size, size=int(empty.sum()))]
+            centroids = normalize_rows(sums)
+
+        self._centroids = centroids
+        self._trained_size = len(live)
+        self._fill_lists()
+        logger.info(f"Trained IVF index with {nlist} lists on {len(live)} vectors")
+
+    def _fill_lists(self) -> None:
+        nlist = len(self._centroids)
+        self._lists = [[] for _ in range(nlist)]
+        self._list_arrays = [None] * nlist
+        self._list_radius = np.zeros(nlist, dtype=np.float32)
+        self._assign(np.flatnonzero(self._alive[: self._size]))
+
+    def _assign(self, slots: NDArray, chunk_size: int = 4096) -> None:
+        for start in range(0, len(slots), chunk_size):
+            chunk = slots[start : start + chunk_size]
+            similarity = self._vectors[chunk] @ self._centroids.T
+            assignment = np.argmax(similarity, axis=1)
+            best = similarity[np.arange(len(chunk)), assignment]
+            # Unit vectors: |x - c|^2 = 2 - 2 x.c
+            distance = np.sqrt(np.maximum(2 - 2 * best, 0))
+            np.maximum.at(self._list_radius, assignment, distance)
+            for slot, list_id in zip(chunk.tolist(), assignment.tolist()):
+                self._lists[list_id].append(slot)
+                self._list_arrays[list_id] = None
+
+    def _list(self, list_id: int) -> NDArray:
+        array = self._list_arrays[list_id]
+        if array is None:
+            array = np.array(self._lists[list_id], dtype=np.int64)
+            self._list_arrays[list_id] = array
+        return array
+
+    def radius_batch(
+        self, queries: NDArray, eps: float, exact: bool = False
+    ) -> List[NDArray]:
+        if not (self.exact or exact):
+            return [self.radius(query, eps)[0] for query in np.atleast_2d(queries)]
+        queries = normalize_rows(np.atleast_2d(queries))
+        if not self.trained:
+            return self._radius_block(queries, None, eps)
+
+        # Every bucket is compared with the queries it may hold a match for,
+        # by the same bound as `_candidates`
+        similarity = queries @ self._centroids.T
+        distance = np.sqrt(np.maximum(2 - 2 * similarity, 0))
+        reachable = distance - self._list_radius <= math.sqrt(2 * eps)
+        pairs_query, pairs_slot = [], []
+        for list_id in np.flatnonzero(reachable.any(axis=0)).tolist():
+            slots = self._list(list_id)
+            slots = slots[self._alive[slots]]
+            members = np.flatnonzero(reachable[:, list_id])
+            if len(slots) == 0:
+                continue
+            distances = 1 - queries[members] @ self._vectors[slots].T
+            np.clip(distances, 0, 2, out=distances)
+            rows, cols = np.nonzero(distances <= eps)
+            pairs_query.append(members[rows])
+            pairs_slot.append(slots[cols])
+
+        if not pairs_query:
+            return [np.empty(0, dtype=np.int64) for _ in range(len(queries))]
+        pairs_query = np.concatenate(pairs_query)
+        pairs_slot = np.concatenate(pairs_slot)
+        order = np.lexsort((pairs_slot, pairs_query))
+        splits = np.searchsorted(pairs_query[order], range(1, len(queries)))
+        return np.split(self._keys[pairs_slot[order]], splits)
+
+    def _candidates(
+        self, query: NDArray, eps: Optional[float] = None, exact: bool = False
+    ) -> NDArray:
+        if not self.trained:
+            return np.arange(self._size)
+
+        similarity = self._centroids @ query
+        order = np.argsort(-similarity)
+        if eps is not None:
+            # A bucket can only hold a match if the query is within its radius
+            # plus the Euclidean equivalent of eps, sqrt(2 eps)
+            distance = np.sqrt(np.maximum(2 - 2 * similarity[order], 0))
+            order = order[distance - self._list_radius[order] <= math.sqrt(2 * eps)]
+        if not (self.exact or exact):
+            order = order[: self.nprobe]
+        if len(order) == 0:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([self._list(list_id) for list_id in order])
+
+
+def make_index(kind: str = "ivf", **kwargs) -> ExactIndex:
+    """
+    Create a face embedding index.
+
+    Args:
+        kind: "ivf" for the approximate inverted-file index or "exact" for
+            brute-force search
+        **kwargs: Options passed to `IVFFlatIndex`
+
+    Returns:
+        A new, empty index
+    """
+    if kind == "exact":
+        return ExactIndex()
+    if kind == "ivf":
+        return IVFFlatIndex(**kwargs)
+    raise ValueError(f"Unknown face index: {kind}")
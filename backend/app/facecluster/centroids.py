@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
+from numpy.typing import NDArray
+
+from app.facecluster.incremental_dbscan import normalize_rows
+
+
+class ClusterCentroids:
+    """
+    Running per-cluster centroids of unit-length face embeddings.
+
+    Each cluster keeps the float64 sum and count of its members, updated as
+    faces join or leave it, so assigning a face to a known person costs one
+    comparison per cluster instead of one per face. Noise (label -1) has no
+    centroid.
+    """
+
+    def __init__(self) -> None:
+        self._sums: Dict[int, NDArray] = {}
+        self._counts: Dict[int, int] = {}
+        # Stacked unit centroids, rebuilt lazily after changes
+        self._labels: Optional[NDArray] = None
+        self._matrix: Optional[NDArray] = None
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def rebuild(self, embeddings: NDArray, labels: NDArray) -> None:
+        """Recompute all centroids from scratch."""
+        self._sums.clear()
+        self._counts.clear()
+        self.update(embeddings, np.full(len(labels), -1), labels)
+
+    def update(
+        self,
+        embeddings: NDArray,
+        old_labels: Union[NDArray, int],
+        new_labels: Union[NDArray, int],
+    ) -> None:
+        """
+        Move faces between clusters.
+
+        Args:
+            embeddings: (M, D) embeddings of the faces
+            old_labels: Cluster each face leaves, -1 if none, or one for all
+            new_labels: Cluster each face joins, -1 if none, or one for all
+        """
+        if len(embeddings) == 0:
+            return
+        vectors = normalize_rows(np.atleast_2d(embeddings)).astype(np.float64)
+        old_labels = np.broadcast_to(old_labels, len(vectors))
+        new_labels = np.broadcast_to(new_labels, len(vectors))
+        moved = old_labels != new_labels
+        for sign, labels in ((-1, old_labels), (1, new_labels)):
+            for label in np.unique(labels[moved & (labels >= 0)]).tolist():
+                members = vectors[moved & (labels == label)]
+                if label not in self._sums:
+                    self._sums[label] = np.zeros(vectors.shape[1])
+                    self._counts[label] = 0
+                self._sums[label] += sign * members.sum(axis=0)
+                self._counts[label] += sign * len(members)
+                if self._counts[label] <= 0:
+                    del self._sums[label]
+                    del self._counts[label]
+        self._matrix = None
+
+    def _stacked(self) -> Tuple[NDArray, NDArray]:
+        if self._matrix is None:
+            self._labels = np.fromiter(self._sums.keys(), dtype=np.int64)
+            sums = np.array(list(self._sums.values()), dtype=np.float32)
+            self._matrix = normalize_rows(sums.reshape(len(self._labels), -1))
+        return self._labels, self._matrix
+
+    def nearest(self, embedding: NDArray) -> Optional[Tuple[int, float]]:
+        """
+        Find the cluster whose centroid is closest to a face.
+
+        Args:
+            embedding: (D,) face embedding
+
+        Returns:
+            Tuple of (label, cosine distance), or None if there are no clusters
+        """
+        if not self._sums:
+            return None
+        labels, matrix = self._stacked()
+        query = normalize_rows(np.atleast_2d(embedding))[0]
+        distances = 1 - matrix @ query
+        best = int(np.argmin(distances))
+        return int(labels[best]), float(max(distances[best], 0.0))
+
+    def centroids(self) -> Dict[int, Tuple[NDArray, int]]:
+        """Unit-length centroid and member count of every cluster."""
+        if not self._sums:
+            return {}
+        labels, matrix = self._stacked()
+        return {
+            int(label): (matrix[i], self._counts[int(label)])
+            for i, label in enumerate(labels)
+        }
@@ -0,0 +1,388 @@
+from __future__ import annotations
+
+import logging
+import math
+import os
+import warnings
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple, Type
+
+import numpy as np
+from numpy.typing import NDArray
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+from sklearn.cluster import DBSCAN
+from sklearn.exceptions import EfficiencyWarning
+
+from app.config.settings import FACE_CLUSTER_WORKERS
+from app.facecluster.incremental_dbscan import normalize_rows
+
+logger = logging.getLogger(__name__)
+
+
+class ClusteringBackend(ABC):
+    """
+    Full (re)clustering of face embeddings.
+
+    Attributes:
+        eps: Maximum distance between neighbors
+        min_samples: Neighbors (including the point itself) a core point needs
+        metric: Distance metric
+    """
+
+    def __init__(self, eps: float, min_samples: int, metric: str = "cosine") -> None:
+        self.eps = eps
+        self.min_samples = min_samples
+        self.metric = metric
+
+    @abstractmethod
+    def fit_predict(self, embeddings: NDArray) -> NDArray:
+        """
+        Cluster embeddings.
+
+        Args:
+            embeddings: (N, D) array of embeddings
+
+        Returns:
+            (N,) array of cluster labels, -1 for noise
+        """
+
+
+class SklearnDBSCANBackend(ClusteringBackend):
+    """
+    scikit-learn DBSCAN on the raw embeddings. With the cosine metric this
+    computes all pairwise distances, O(N^2) memory.
+    """
+
+    def __init__(self, eps: float, min_samples: int, metric: str = "cosine") -> None:
+        super().__init__(eps, min_samples, metric)
+        self.dbscan = DBSCAN(
+            eps=eps,
+            min_samples=min_samples,
+            metric=metric,
+            n_jobs=-1,  # Use all available CPU cores
+        )
+
+    def fit_predict(self, embeddings: NDArray) -> NDArray:
+        return self.dbscan.fit_predict(embeddings)
+
+
+def eps_neighborhood_graph(
+    embeddings: NDArray, eps: float, block_size: int = 2048
+) -> sparse.csr_matrix:
+    """
+    Sparse graph of the cosine distances that are at most `eps`.
+
+    Distances are computed as normalized dot products, one
+    `block_size` x `block_size` tile at a time, so memory stays bounded by the
+    tile plus the edges kept. Only tiles on or above the diagonal are
+    computed; the graph is symmetric.
+
+    Args:
+        embeddings: (N, D) array of embeddings
+        eps: Maximum cosine distance, inclusive
+        block_size: Rows and columns per tile
+
+    Returns:
+        (N, N) CSR matrix of distances, with the diagonal stored explicitly
+    """
+    vectors = normalize_rows(embeddings)
+    count = len(vectors)
+    rows, cols, distances = [], [], []
+    for start in range(0, count, block_size):
+        block = vectors[start : start + block_size]
+        for other in range(start, count, block_size):
+            similarity = block @ vectors[other : other + block_size].T
+            # Preselect on similarity, then apply the exact distance test
+            tile_rows, tile_cols = np.nonzero(similarity >= 1 - eps - 1e-5)
+            values = 1 - similarity[tile_rows, tile_cols]
+            np.clip(values, 0, 2, out=values)
+            within = values <= eps
+            tile_rows, tile_cols, values = (
+                tile_rows[within],
+                tile_cols[within],
+                values[within],
+            )
+            tile_rows += start
+            tile_cols += other
+            rows.append(tile_rows)
+            cols.append(tile_cols)
+            distances.append(values)
+            if other != start:
+                rows.append(tile_cols)
+                cols.append(tile_rows)
+                distances.append(values)
+
+    rows = np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+    cols = np.concatenate(cols) if cols else np.empty(0, dtype=np.int64)
+    distances = (
+        np.concatenate(distances) if distances else np.empty(0, dtype=np.float32)
+    )
+    return sparse.csr_matrix((distances, (rows, cols)), shape=(count, count))
+
+
+class SparseGraphDBSCANBackend(ClusteringBackend):
+    """
+    DBSCAN over a precomputed sparse eps-neighborhood graph.
+
+    The graph is built in tiles by `eps_neighborhood_graph`, so peak memory
+    grows with the number of neighbor pairs rather than with N^2. Only the
+    cosine metric is supported.
+
+    Attributes:
+        block_size: Rows and columns per distance tile
+    """
+
+    def __init__(
+        self,
+        eps: float,
+        min_samples: int,
+        metric: str = "cosine",
+        block_size: int = 2048,
+    ) -> None:
+        if metric != "cosine":
+            raise ValueError("The sparse graph backend only supports cosine")
+        super().__init__(eps, min_samples, metric)
+        self.block_size = block_size
+
+    def fit_predict(self, embeddings: NDArray) -> NDArray:
+        if len(embeddings) == 0:
+            return np.empty(0, dtype=np.int64)
+        graph = eps_neighborhood_graph(embeddings, self.eps, self.block_size)
+        logger.debug(f"Face neighborhood graph has {graph.nnz} edges")
+        dbscan = DBSCAN(
+            eps=self.eps, min_samples=self.min_samples, metric="precomputed"
+        )
+        with warnings.catch_warnings():
+            # Rows sorted by distance only speed up k-nearest queries
+            warnings.simplefilter("ignore", EfficiencyWarning)
+            return dbscan.fit_predict(graph)
+
+
+def coarse_cells(vectors: NDArray, num_cells: int, seed: int = 0) -> NDArray:
+    """
+    Unit-length k-means centroids of unit-length vectors, fitted on a sample.
+
+    Args:
+        vectors: (N, D) unit-length vectors
+        num_cells: Number of centroids
+        seed: Random seed
+
+    Returns:
+        (num_cells, D) centroids
+    """
+    rng = np.random.default_rng(seed)
+    num_cells = min(num_cells, len(vectors))
+    sample = vectors[
+        rng.choice(len(vectors), min(len(vectors), 256 * num_cells), False)
+    ]
+    centroids = sample[rng.choice(len(sample), num_cells, replace=False)].copy()
+    for _ in range(10):
+        assignment = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, sample)
+        empty = np.bincount(assignment, minlength=num_cells) == 0
+        sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+        centroids = normalize_rows(sums)
+    return centroids
+
+
+def shard_rows(
+    vectors: NDArray, centroids: NDArray, eps: float
+) -> List[Tuple[NDArray, int]]:
+    """
+    Rows of each shard: the vectors of its k-means cell, followed by the
+    vectors of other cells that may lie within cosine distance `eps` of it.
+
+    A vector x of cell i is within Euclidean distance r of cell j only if its
+    distance to their bisecting hyperplane, (x.c_i - x.c_j) / |c_i - c_j|,
+    is at most r. For unit vectors, cosine distance eps is r = sqrt(2 eps).
+
+    Args:
+        vectors: (N, D) unit-length vectors
+        centroids: (K, D) unit-length cell centroids
+        eps: Maximum cosine distance between neighbors
+
+    Returns:
+        For every cell, its own rows followed by its halo rows, and the
+        number of own rows
+    """
+    similarity = vectors @ centroids.T
+    cells = np.argmax(similarity, axis=1)
+    own_similarity = similarity[np.arange(len(vectors)), cells]
+    centroid_distance = np.sqrt(np.maximum(2 - 2 * (centroids @ centroids.T), 0))
+    radius = math.sqrt(2 * eps) + 1e-4
+
+    shards = []
+    for cell in range(len(centroids)):
+        own = np.flatnonzero(cells == cell)
+        gap = (own_similarity - similarity[:, cell]) / np.maximum(
+            centroid_distance[cells, cell], 1e-12
+        )
+        halo = np.flatnonzero((cells != cell) & (gap <= radius))
+        shards.append((np.concatenate([own, halo]), len(own)))
+    return shards
+
+
+def _cluster_shard(
+    embeddings: NDArray, own_count: int, eps: float, min_samples: int, block_size: int
+) -> Tuple[NDArray, ...]:
+    # The halo holds every neighbor of the own points, so their core flags
+    # and edges are exact; halo points' own shards decide theirs
+    graph = eps_neighborhood_graph(embeddings, eps, block_size)
+    core = np.diff(graph.indptr)[:own_count] >= min_samples
+
+    own_graph = graph[:own_count, :own_count].tocoo()
+    keep = core[own_graph.row] & core[own_graph.col]
+    own_core_graph = sparse.coo_matrix(
+        (
+            np.ones(int(keep.sum()), dtype=np.int8),
+            (own_graph.row[keep], own_graph.col[keep]),
+        ),
+        shape=(own_count, own_count),
+    )
+    _, components = connected_components(own_core_graph, directed=False)
+
+    rows = np.repeat(np.arange(own_count), np.diff(graph.indptr)[:own_count])
+    cols = graph.indices[: graph.indptr[own_count]]
+    cross = core[rows] & (cols >= own_count)
+    border = ~core[rows] & (rows != cols)
+    return core, components, rows[cross], cols[cross], rows[border], cols[border]
+
+
+class ShardedDBSCANBackend(ClusteringBackend):
+    """
+    DBSCAN split into k-means shards clustered in parallel processes.
+
+    Each shard holds one cell of a coarse k-means over the normalized
+    embeddings plus a halo of the faces from other cells that may be within
+    eps of it (see `shard_rows`), so its faces' neighborhoods are complete.
+    Shards report core faces, their connected groups and their edges into
+    the halo; the merge joins groups linked across shard borders and gives
+    border faces the lowest-numbered cluster among their core neighbors.
+    Clusters are numbered by their first core face, so the labels are those
+    of scikit-learn DBSCAN on the whole set. Only the cosine metric is
+    supported.
+
+    Attributes:
+        num_shards: Number of k-means cells, one per worker if None
+        workers: Worker processes, FACE_CLUSTER_WORKERS or the CPU count if
+            None; 1 clusters the shards in this process
+        block_size: Rows and columns per distance tile
+    """
+
+    def __init__(
+        self,
+        eps: float,
+        min_samples: int,
+        metric: str = "cosine",
+        num_shards: Optional[int] = None,
+        workers: Optional[int] = None,
+        block_size: int = 2048,
+    ) -> None:
+        if metric != "cosine":
+            raise ValueError("The sharded backend only supports cosine")
+        super().__init__(eps, min_samples, metric)
+        self.workers = workers or FACE_CLUSTER_WORKERS or os.cpu_count() or 1
+        self.num_shards = num_shards or self.workers
+        self.block_size = block_size
+
+    def fit_predict(self, embeddings: NDArray) -> NDArray:
+        count = len(embeddings)
+        if count == 0:
+            return np.empty(0, dtype=np.int64)
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        vectors = normalize_rows(embeddings)
+        shards = shard_rows(vectors, coarse_cells(vectors, self.num_shards), self.eps)
+        logger.debug(
+            f"Clustering {count} faces in {len(shards)} shards of "
+            f"{[len(rows) for rows, _ in shards]} faces"
+        )
+
+        tasks = [
+            (embeddings[rows], own_count, self.eps, self.min_samples, self.block_size)
+            for rows, own_count in shards
+        ]
+        if self.workers == 1 or len(shards) == 1:
+            results = [_cluster_shard(*task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                results = list(pool.map(_cluster_shard, *zip(*tasks)))
+        return self._merge(count, shards, results)
+
+    def _merge(
+        self,
+        count: int,
+        shards: List[Tuple[NDArray, int]],
+        results: List[Tuple[NDArray, ...]],
+    ) -> NDArray:
+        core = np.zeros(count, dtype=bool)
+        for (rows, own_count), (shard_core, *_) in zip(shards, results):
+            core[rows[:own_count]] = shard_core
+
+        # Core faces linked inside a shard, or across shards through a core
+        # halo face, belong to the same cluster
+        edge_starts, edge_ends, border_faces, border_neighbors = [], [], [], []
+        for (rows, own_count), result in zip(shards, results):
+            _, components, cross_rows, cross_cols, border_rows, border_cols = result
+            own = rows[:own_count]
+            firsts = np.full(own_count, -1)
+            firsts[components[::-1]] = np.arange(own_count)[::-1]
+            edge_starts += [own, rows[cross_rows]]
+            edge_ends += [own[firsts[components]], rows[cross_cols]]
+            border_faces.append(own[border_rows])
+            border_neighbors.append(rows[border_cols])
+        starts, ends = np.concatenate(edge_starts), np.concatenate(edge_ends)
+        linked = core[starts] & core[ends]
+        graph = sparse.coo_matrix(
+            (np.ones(int(linked.sum()), dtype=np.int8), (starts[linked], ends[linked])),
+            shape=(count, count),
+        )
+        _, components = connected_components(graph, directed=False)
+
+        # Clusters are numbered in the order of their first core face
+        labels = np.full(count, -1, dtype=np.int64)
+        core_faces = np.flatnonzero(core)
+        _, firsts, inverse = np.unique(
+            components[core_faces], return_index=True, return_inverse=True
+        )
+        labels[core_faces] = np.argsort(np.argsort(firsts))[inverse]
+
+        # Border faces join the lowest-numbered cluster among their neighbors
+        faces = np.concatenate(border_faces)
+        neighbor_labels = labels[np.concatenate(border_neighbors)]
+        faces = faces[neighbor_labels >= 0]
+        neighbor_labels = neighbor_labels[neighbor_labels >= 0]
+        order = np.lexsort((neighbor_labels, faces))
+        faces, neighbor_labels = faces[order], neighbor_labels[order]
+        first = np.flatnonzero(np.diff(faces, prepend=-1))
+        labels[faces[first]] = neighbor_labels[first]
+        return labels
+
+
+BACKENDS: Dict[str, Type[ClusteringBackend]] = {
+    "sklearn": SklearnDBSCANBackend,
+    "sparse": SparseGraphDBSCANBackend,
+    "sharded": ShardedDBSCANBackend,
+}
+
+
+def make_backend(
+    name: str, eps: float, min_samples: int, metric: str = "cosine"
+) -> ClusteringBackend:
+    """
+    Create a clustering backend by name.
+
+    Args:
+        name: "sklearn", "sparse" or "sharded"
+        eps: Maximum distance between neighbors
+        min_samples: Neighbors (including the point itself) a core point needs
+        metric: Distance metric
+
+    Returns:
+        A new backend
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown clustering backend: {name}")
+    return BACKENDS[name](eps, min_samples, metric)
@@ -0,0 +1,307 @@
+from __future__ import annotations
+
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from numpy.typing import DTypeLike, NDArray
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingStore:
+    """
+    Growable face embedding matrix with parallel norm, label, image id and
+    key arrays.
+
+    Capacity doubles when full, so appending n faces copies O(n) data in
+    total. Removed faces are only marked dead (tombstoned); the arrays are
+    compacted once dead rows make up `compact_ratio` of them. Every face gets
+    a key, increasing in insertion order and never reused, that external
+    indexes can refer to it by. A stored embedding is never overwritten in
+    place, so `embeddings` views can be read while faces are added.
+
+    Embeddings are kept as float32, or as float16 to halve their memory;
+    norms are computed from the stored values.
+
+    Attributes:
+        dim: Embedding dimension, set by the first added face
+        compact_ratio: Fraction of dead rows that triggers compaction
+        dtype: Storage type of the embeddings
+    """
+
+    def __init__(
+        self, compact_ratio: float = 0.5, dtype: DTypeLike = np.float32
+    ) -> None:
+        self.compact_ratio = compact_ratio
+        self.dtype = np.dtype(dtype)
+        self.dim: Optional[int] = None
+        self._vectors = np.empty((0, 0), dtype=self.dtype)
+        self._norms = np.empty(0, dtype=np.float32)
+        self._labels = np.empty(0, dtype=np.int64)
+        self._image_ids = np.empty(0, dtype=object)
+        self._keys = np.empty(0, dtype=np.int64)
+        self._alive = np.empty(0, dtype=bool)
+        self._size = 0
+        self._dead = 0
+        self._next_key = 0
+        # Image id -> rows of its live faces
+        self._rows: Dict[str, List[int]] = {}
+
+    def __len__(self) -> int:
+        return self._size - self._dead
+
+    def __contains__(self, image_id: str) -> bool:
+        return image_id in self._rows
+
+    def reset(
+        self,
+        embeddings: NDArray,
+        image_ids: Sequence[str],
+        labels: Optional[NDArray] = None,
+    ) -> NDArray:
+        """
+        Replace the contents and restart keys from 0.
+
+        Args:
+            embeddings: (N, D) face embeddings
+            image_ids: Image id of every face
+            labels: Cluster label of every face, -1 if not given
+
+        Returns:
+            (N,) keys of the faces
+        """
+        self.dim = None
+        self._size = self._dead = self._next_key = 0
+        self._vectors = np.empty((0, 0), dtype=self.dtype)
+        self._rows = {}
+        return self.add(embeddings, image_ids, labels)
+
+    def adopt(
+        self,
+        embeddings: NDArray,
+        image_ids: Sequence[str],
+        labels: Optional[NDArray] = None,
+    ) -> NDArray:
+        """
+        Replace the contents like `reset`, keeping `embeddings` as the storage
+        instead of copying it.
+
+        The array is only read, so a read-only memory map can be adopted; it
+        is copied to a new array once faces are added or it is compacted.
+
+        Args:
+            embeddings: (N, D) face embeddings
+            image_ids: Image id of every face
+            labels: Cluster label of every face, -1 if not given
+
+        Returns:
+            (N,) keys of the faces
+        """
+        embeddings = np.asarray(embeddings, dtype=self.dtype)
+        count = len(image_ids)
+        if count == 0 or embeddings.ndim != 2:
+            return self.reset(embeddings, image_ids, labels)
+        if len(embeddings) != count:
+            raise ValueError("Number of embeddings must match number of image ids")
+
+        self.dim = embeddings.shape[1]
+        self._vectors = embeddings
+        self._norms = np.linalg.norm(embeddings.astype(np.float32, copy=False), axis=1)
+        self._labels = (
+            np.full(count, -1, dtype=np.int64)
+            if labels is None
+            else np.array(labels, dtype=np.int64)
+        )
+        self._image_ids = np.empty(count, dtype=object)
+        self._image_ids[:] = list(image_ids)
+        self._keys = np.arange(count, dtype=np.int64)
+        self._alive = np.ones(count, dtype=bool)
+        self._size = self._next_key = count
+        self._dead = 0
+        self._rows = {}
+        for row, image_id in enumerate(self._image_ids.tolist()):
+            self._rows.setdefault(image_id, []).append(row)
+        return self.keys
+
+    def add(
+        self,
+        embeddings: NDArray,
+        image_ids: Sequence[str],
+        labels: Optional[NDArray] = None,
+    ) -> NDArray:
+        """
+        Append faces.
+
+        Args:
+            embeddings: (M, D) face embeddings
+            image_ids: Image id of every face
+            labels: Cluster label of every face, -1 if not given
+
+        Returns:
+            (M,) keys of the new faces
+        """
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if embeddings.ndim == 1 and embeddings.size:
+            embeddings = embeddings.reshape(1, -1)
+        count = len(image_ids)
+        if len(embeddings) != count:
+            raise ValueError("Number of embeddings must match number of image ids")
+        if count == 0:
+            return np.empty(0, dtype=np.int64)
+        if self.dim is None:
+            self.dim = embeddings.shape[1]
+            self._vectors = np.empty((0, self.dim), dtype=self.dtype)
+
+        needed = self._size + count
+        if needed > len(self._vectors):
+            self._resize(max(needed, 2 * len(self._vectors), 64))
+
+        rows = np.arange(self._size, needed)
+        keys = np.arange(self._next_key, self._next_key + count)
+        self._vectors[rows] = embeddings
+        self._norms[rows] = np.linalg.norm(
+            self._vectors[rows].astype(np.float32, copy=False), axis=1
+        )
+        self._labels[rows] = -1 if labels is None else labels
+        self._image_ids[rows] = list(image_ids)
+        self._keys[rows] = keys
+        self._alive[rows] = True
+        self._size = needed
+        self._next_key += count
+        for row, image_id in zip(rows.tolist(), image_ids):
+            self._rows.setdefault(image_id, []).append(row)
+        return keys
+
+    def remove(self, image_id: str) -> NDArray:
+        """
+        Remove the faces of an image.
+
+        Args:
+            image_id: Image to remove
+
+        Returns:
+            Keys of the removed faces, empty if the image is unknown
+        """
+        rows = self._rows.pop(image_id, [])
+        if not rows:
+            return np.empty(0, dtype=np.int64)
+        keys = self._keys[rows]
+        self._alive[rows] = False
+        self._dead += len(rows)
+        if self._dead > self.compact_ratio * self._size:
+            self.compact()
+        return keys
+
+    def _resize(self, capacity: int) -> None:
+        vectors = np.empty((capacity, self.dim), dtype=self.dtype)
+        vectors[: self._size] = self._vectors[: self._size]
+        self._vectors = vectors
+        for name, fill in (
+            ("_norms", 0),
+            ("_labels", -1),
+            ("_image_ids", None),
+            ("_keys", 0),
+            ("_alive", False),
+        ):
+            old = getattr(self, name)
+            new = np.full(capacity, fill, dtype=old.dtype)
+            new[: self._size] = old[: self._size]
+            setattr(self, name, new)
+
+    def compact(self) -> None:
+        """
+        Drop dead rows, keeping the live ones in insertion order.
+
+        The rows are copied to new arrays, so `embeddings` views taken before
+        stay valid.
+        """
+        if self._dead == 0:
+            return
+        live = self._live_rows()
+        for name in ("_vectors", "_norms", "_labels", "_image_ids", "_keys"):
+            array = getattr(self, name)
+            compacted = np.empty_like(array)
+            compacted[: len(live)] = array[live]
+            setattr(self, name, compacted)
+        self._alive[: len(live)] = True
+        self._alive[len(live) : self._size] = False
+        self._image_ids[len(live) : self._size] = None
+        self._size = len(live)
+        self._dead = 0
+
+        self._rows = {}
+        for row, image_id in enumerate(self._image_ids[: self._size]):
+            self._rows.setdefault(image_id, []).append(row)
+        logger.debug(f"Compacted embedding store to {self._size} faces")
+
+    def _live_rows(self) -> NDArray:
+        if self._dead == 0:
+            return np.arange(self._size)
+        return np.flatnonzero(self._alive[: self._size])
+
+    def _live(self, array: NDArray) -> NDArray:
+        # A view while there are no dead rows, a copy otherwise
+        if self._dead == 0:
+            return array[: self._size]
+        return array[: self._size][self._alive[: self._size]]
+
+    @property
+    def embeddings(self) -> NDArray:
+        """(N, D) embeddings of the live faces, in insertion order."""
+        if self.dim is None:
+            return np.empty((0, 0), dtype=self.dtype)
+        return self._live(self._vectors)
+
+    @property
+    def norms(self) -> NDArray:
+        """(N,) L2 norms of `embeddings`, computed once per face."""
+        return self._live(self._norms)
+
+    @property
+    def labels(self) -> NDArray:
+        return self._live(self._labels)
+
+    @property
+    def image_ids(self) -> List[str]:
+        return self._live(self._image_ids).tolist()
+
+    @property
+    def keys(self) -> NDArray:
+        return self._live(self._keys)
+
+    def set_labels(self, labels: NDArray) -> None:
+        """Set the labels of all live faces, in insertion order."""
+        self._labels[self._live_rows()] = labels
+
+    def rows(self, image_id: str) -> List[int]:
+        """Rows of the live faces of an image."""
+        return self._rows.get(image_id, [])
+
+    def rows_for_keys(self, keys: NDArray) -> NDArray:
+        """Rows of the faces with the given keys."""
+        return np.searchsorted(self._keys[: self._size], keys)
+
+    def positions(self, keys: NDArray) -> NDArray:
+        """Positions of the faces with the given keys among the live faces."""
+        return np.searchsorted(self.keys, keys)
+
+    def vectors(self, rows: Sequence[int]) -> NDArray:
+        return self._vectors[rows]
+
+    def image_ids_at(self, rows: Sequence[int]) -> List[str]:
+        return self._image_ids[rows].tolist()
+
+    def face_ids(self, rows: Sequence[int]) -> List[Tuple[str, int]]:
+        """(image id, index among the image's faces) of the given rows."""
+        face_ids = []
+        for row in rows:
+            image_id = self._image_ids[row]
+            face_ids.append((image_id, self._rows[image_id].index(row)))
+        return face_ids
+
+    def keys_at(self, rows: Sequence[int]) -> NDArray:
+        return self._keys[rows]
+
+    def labels_at(self, rows: Sequence[int]) -> NDArray:
+        return self._labels[rows]
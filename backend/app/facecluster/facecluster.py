@@ -1,82 +1,61 @@
 from __future__ import annotations
 
 import numpy as np
-from sklearn.cluster import DBSCAN
-from sklearn.metrics.pairwise import cosine_distances
 import sqlite3
 import json
 from collections import defaultdict
 from contextlib import contextmanager
 import logging
-from typing import Dict, List, Optional, Set, Union, Any, Callable, TypeVar, ParamSpec
-from pathlib import Path
+import threading
 import time
-from functools import wraps
+from typing import (
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+    Any,
+    TYPE_CHECKING,
+)
+from pathlib import Path
 from numpy.typing import NDArray
 
-from app.config.settings import DATABASE_PATH
+from app.config.settings import (
+    DATABASE_PATH,
+    FACE_CENTROID_MARGIN,
+    FACE_CLUSTER_BACKEND,
+    FACE_CLUSTER_INCREMENTAL,
+    FACE_CLUSTER_SNAPSHOT,
+    FACE_EMBEDDING_DTYPE,
+    FACE_INDEX,
+    FACE_INDEX_NPROBE,
+    FACE_PROJECTION_DIM,
+    FACE_PROJECTION_MIN_FACES,
+    FACE_PROJECTION_MIN_RECALL,
+)
+from app.facecluster.ann_index import ExactIndex, make_index
+from app.facecluster.centroids import ClusterCentroids
+from app.facecluster.clustering import ClusteringBackend, make_backend
+from app.facecluster.embedding_store import EmbeddingStore
+from app.facecluster.incremental_dbscan import IncrementalDBSCAN
+from app.facecluster.projection import EmbeddingProjection, fit_projection
+from app.facecluster.snapshot import (
+    database_fingerprint,
+    load_snapshot,
+    save_snapshot,
+)
 from app.utils.path_id_mapping import get_id_from_path
-from app.database.faces import get_all_face_embeddings
+from app.utils.rwlock import ReadWriteLock
+from app.database.faces import blob_to_embedding
+
+if TYPE_CHECKING:
+    from app.facecluster.recluster import Reclusterer
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
-# Type variables for generic type hints
-P = ParamSpec("P")
-R = TypeVar("R")
-
-
-class TTLCache:
-    """
-    Time-based LRU cache implementation with type safety.
-
-    Attributes:
-        maxsize: Maximum number of items to store in cache
-        ttl: Time-to-live in seconds for cache entries
-        cache: Dictionary storing cached values and timestamps
-    """
-
-    def __init__(self, maxsize: int = 128, ttl: int = 3600) -> None:
-        self.maxsize = maxsize
-        self.ttl = ttl
-        self.cache: Dict[str, tuple[Any, float]] = {}
-
-    def __call__(self, func: Callable[P, R]) -> Callable[P, R]:
-        """Create a cached version of the function."""
-
-        @wraps(func)
-        def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
-            # Create cache key from function arguments
-            key = f"{func.__name__}:{str(args)}:{str(kwargs)}"
-
-            # Check if result is cached and not expired
-            if key in self.cache:
-                result, timestamp = self.cache[key]
-                if time.time() - timestamp <= self.ttl:
-                    return result
-                else:
-                    del self.cache[key]
-
-            # Compute new result
-            result = func(*args, **kwargs)
-
-            # Add to cache
-            self.cache[key] = (result, time.time())
-
-            # Enforce cache size limit
-            if len(self.cache) > self.maxsize:
-                oldest_key = min(self.cache.keys(), key=lambda k: self.cache[k][1])
-                del self.cache[oldest_key]
-
-            return result
-
-        def clear_cache() -> None:
-            """Clear the cache."""
-            self.cache.clear()
-
-        wrapper.clear_cache = clear_cache  # type: ignore
-        return wrapper
-
 
 @contextmanager
 def database_connection(db_path: Union[str, Path]):
@@ -96,19 +75,177 @@ def database_connection(db_path: Union[str, Path]):
         conn.close()
 
 
+class ClusterView:
+    """
+    Read-only copy of the clustering state that FaceCluster publishes after
+    every change, so that reads never wait for a writer.
+
+    Derived data is built on first use. Concurrent readers may both build
+    it, which is harmless since the view never changes.
+
+    Attributes:
+        embeddings: Array of face embeddings, shared with the store
+        norms: L2 norms of the embeddings, shared with the store
+        image_ids: List of image IDs
+        labels: Cluster labels
+        eps: Maximum cosine distance between faces of related images
+        version: Number of the view, increasing with every change
+        created_at: Time the view was published
+        dirty_faces: Faces added or removed since the last full clustering
+        reclustered_at: Time of the last full clustering, None if there was
+            none since startup
+    """
+
+    # Related image lookups remembered per view
+    RELATED_CACHE_SIZE = 128
+
+    def __init__(
+        self,
+        embeddings: NDArray,
+        norms: NDArray,
+        image_ids: List[str],
+        labels: NDArray,
+        eps: float,
+        version: int = 0,
+        dirty_faces: int = 0,
+        reclustered_at: Optional[float] = None,
+    ) -> None:
+        self.embeddings = embeddings
+        self.norms = norms
+        self.image_ids = image_ids
+        self.labels = labels
+        self.eps = eps
+        self.version = version
+        self.created_at = time.time()
+        self.dirty_faces = dirty_faces
+        self.reclustered_at = reclustered_at
+        self._clusters: Optional[Dict[int, List[str]]] = None
+        self._rows: Optional[Dict[Any, List[int]]] = None
+        self._related: Dict[Tuple, List[Tuple[Any, float]]] = {}
+
+    def age(self) -> float:
+        """Seconds since the view was published."""
+        return time.time() - self.created_at
+
+    def clusters(self) -> Dict[int, List[str]]:
+        """Cluster labels mapped to the IDs of the images with faces in them."""
+        if self._clusters is None:
+            clusters: Dict[int, Set[str]] = defaultdict(set)
+            for image_id, label in zip(self.image_ids, self.labels.tolist()):
+                clusters[label].add(image_id)
+            self._clusters = {k: list(v) for k, v in clusters.items()}
+        return self._clusters
+
+    def related_images(
+        self,
+        image_id: str,
+        limit: Optional[int] = None,
+        min_similarity: Optional[float] = None,
+    ) -> List[Tuple[Any, float]]:
+        """
+        Find the other images with faces similar to those of an image.
+
+        The similarity of an image is the highest cosine similarity between
+        one of its faces and one of the query image's faces.
+
+        Args:
+            image_id: ID of the query image
+            limit: Maximum number of images returned, all if None
+            min_similarity: Lowest similarity returned, 1 - eps if None
+
+        Returns:
+            List of (image ID, similarity), most similar first
+        """
+        if min_similarity is None:
+            min_similarity = 1 - self.eps
+        key = (image_id, limit, min_similarity)
+        related = self._related.get(key)
+        if related is None:
+            related = self._find_related(image_id, limit, min_similarity)
+            if len(self._related) >= self.RELATED_CACHE_SIZE:
+                self._related.clear()
+            self._related[key] = related
+        return related
+
+    def _find_related(
+        self, image_id: str, limit: Optional[int], min_similarity: float
+    ) -> List[Tuple[Any, float]]:
+        if self._rows is None:
+            rows: Dict[Any, List[int]] = defaultdict(list)
+            for row, face_image_id in enumerate(self.image_ids):
+                rows[face_image_id].append(row)
+            self._rows = dict(rows)
+        if image_id not in self._rows or limit == 0:
+            return []
+
+        # One matrix product against all query faces, each face keeping its
+        # best similarity to any of them
+        rows = self._rows[image_id]
+        queries = self.embeddings[rows] / np.maximum(self.norms[rows], 1e-12)[:, None]
+        similarity = (self.embeddings @ queries.T).max(axis=1)
+        similarity /= np.maximum(self.norms, 1e-12)
+        similarity[rows] = -np.inf
+        candidates = np.flatnonzero(similarity >= min_similarity)
+
+        # The best faces of the top `limit` images are among the top faces;
+        # take more faces until they cover `limit` images
+        count = len(candidates) if limit is None else min(limit, len(candidates))
+        while True:
+            if count < len(candidates):
+                top = np.argpartition(-similarity[candidates], count - 1)[:count]
+                top = candidates[top]
+            else:
+                top = candidates
+            top = top[np.argsort(-similarity[top], kind="stable")]
+
+            related: Dict[Any, float] = {}
+            for row in top.tolist():
+                related.setdefault(self.image_ids[row], float(similarity[row]))
+                if limit is not None and len(related) == limit:
+                    return list(related.items())
+            if len(top) == len(candidates):
+                return list(related.items())
+            count *= 2
+
+
 class FaceCluster:
     """
     Face clustering implementation with caching and optimized performance.
 
+    Safe to share between threads: changes are serialized by a reader-writer
+    lock, and `get_clusters` and `get_related_images` read the last published
+    `ClusterView` without taking it.
+
+    Without incremental clustering, added faces join the cluster of their
+    nearest neighbor and removed faces are simply dropped, which drifts from
+    a full DBSCAN run. With a `Reclusterer` attached, the clusters are fitted
+    again in the background once enough faces changed (see `recluster`);
+    otherwise `remove_image` refits right away.
+
+    Embeddings can be stored as float16 and projected to fewer dimensions
+    by a PCA fitted on the library (see `fit_projection`); all distances are
+    then computed between the stored, projected embeddings.
+
     Attributes:
         eps: DBSCAN epsilon parameter
         min_samples: DBSCAN minimum samples parameter
         metric: Distance metric for clustering
-        dbscan: DBSCAN clustering instance
+        dbscan: Clustering backend used for full refits
+        store: Face embeddings with their image IDs and cluster labels
         embeddings: Array of face embeddings
         image_ids: List of image IDs
         labels: Cluster labels
         db_path: Path to the database
+        incremental: Whether clusters are updated in place (cosine metric only)
+        engine: Incremental DBSCAN state, None until `build_engine` swapped
+            it in
+        index: Nearest-neighbor index over the embeddings, by store key
+        snapshot_dir: Directory of the on-disk state snapshot, None if disabled
+        centroids: Running centroid of every cluster
+        reclusterer: Background job refitting the clusters, if attached
+        projection_dim: Dimensions to project the embeddings to, 0 for none
+        projection: Projection of the stored embeddings, None if they are
+            kept whole
     """
 
     def __init__(
@@ -117,6 +254,12 @@ class FaceCluster:
         min_samples: int = 2,
         metric: str = "cosine",
         db_path: Union[str, Path] = DATABASE_PATH,
+        incremental: bool = FACE_CLUSTER_INCREMENTAL,
+        index: str = FACE_INDEX,
+        snapshot: bool = FACE_CLUSTER_SNAPSHOT,
+        backend: str = FACE_CLUSTER_BACKEND,
+        embedding_dtype: str = FACE_EMBEDDING_DTYPE,
+        projection_dim: int = FACE_PROJECTION_DIM,
     ) -> None:
         """
         Initialize the face cluster manager.
@@ -126,21 +269,60 @@ class FaceCluster:
             min_samples: DBSCAN minimum samples parameter
             metric: Distance metric for clustering
             db_path: Path to the database
+            incremental: Keep the DBSCAN neighbor graph and only recompute the
+                clusters touched by added or removed faces, instead of
+                refitting everything on removal
+            index: "ivf" for approximate nearest-neighbor queries or "exact"
+                for brute-force search
+            snapshot: Keep a memory-mappable snapshot of the state next to the
+                database, so restarts do not rebuild it from the database
+            backend: "sparse" to run DBSCAN on a sparse neighborhood graph
+                built in bounded memory, "sharded" to split that work into
+                k-means shards clustered in parallel processes (both cosine
+                metric only) or "sklearn" for scikit-learn DBSCAN on the
+                embeddings
+            embedding_dtype: "float32" or "float16" storage of the embeddings
+            projection_dim: Project the embeddings to this many dimensions
+                when all faces are fitted or loaded, if the projection keeps
+                their eps-neighbors (cosine metric only); 0 keeps them whole
         """
         self.eps = eps
         self.min_samples = min_samples
         self.metric = metric
-        logger.debug(f"Initializing DBSCAN with eps={eps}")
-        self.dbscan = DBSCAN(
-            eps=eps,
-            min_samples=min_samples,
-            metric=metric,
-            n_jobs=-1,  # Use all available CPU cores
+        self.incremental = incremental and metric == "cosine"
+        self.engine: Optional[IncrementalDBSCAN] = None
+        self.index_kind = index
+        logger.debug(f"Initializing {backend} DBSCAN with eps={eps}")
+        self.dbscan: ClusteringBackend = make_backend(
+            backend if metric == "cosine" else "sklearn", eps, min_samples, metric
         )
-        self.embeddings: NDArray = np.array([])
-        self.image_ids: List[str] = []
-        self.labels: Optional[NDArray] = None
+        self.projection_dim = projection_dim if metric == "cosine" else 0
+        self.projection: Optional[EmbeddingProjection] = None
+        self.store = EmbeddingStore(dtype=embedding_dtype)
+        self.centroids = ClusterCentroids()
         self.db_path = Path(db_path)
+        self.snapshot_dir: Optional[Path] = (
+            self.db_path.with_name(f"{self.db_path.stem}.face_snapshot")
+            if snapshot
+            else None
+        )
+        # Assignments not yet written: (image ID, face index) -> label, the
+        # images whose faces were removed, and whether to rewrite everything
+        self._pending: Dict[Tuple[Any, int], int] = {}
+        self._removed: Set[Any] = set()
+        self._full_save = False
+        self._lock = ReadWriteLock()
+        self._recluster_lock = threading.Lock()
+        self._engine_lock = threading.Lock()
+        self._engine_thread: Optional[threading.Thread] = None
+        # Bumped by `fit`, so an engine built from older faces is dropped
+        self._engine_generation = 0
+        self.reclusterer: Optional[Reclusterer] = None
+        self._dirty = 0
+        self._version = 0
+        self._reclustered_at: Optional[float] = None
+        self._reset_index()
+        self._publish()
 
         # Initialize database
         self._init_database()
@@ -148,15 +330,19 @@ class FaceCluster:
     def _init_database(self) -> None:
         """Initialize the database schema if it doesn't exist."""
         with database_connection(self.db_path) as conn:
+            # One row per face; seq keeps the insertion order of the faces
             conn.execute(
                 """
-                CREATE TABLE IF NOT EXISTS face_clusters (
-                    id INTEGER PRIMARY KEY,
-                    image_ids TEXT NOT NULL,
-                    labels TEXT NOT NULL
+                CREATE TABLE IF NOT EXISTS face_cluster_assignments (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    image_id INTEGER NOT NULL,
+                    face_index INTEGER NOT NULL,
+                    label INTEGER NOT NULL,
+                    UNIQUE (image_id, face_index)
                 )
             """
             )
+            conn.commit()
 
     def _validate_input(
         self, embeddings: List[NDArray], image_paths: List[str]
@@ -176,6 +362,28 @@ class FaceCluster:
         if not all(isinstance(path, str) for path in image_paths):
             raise ValueError("All image paths must be strings")
 
+    @property
+    def embeddings(self) -> NDArray:
+        return self.store.embeddings
+
+    @property
+    def image_ids(self) -> List[str]:
+        return self.store.image_ids
+
+    @property
+    def labels(self) -> Optional[NDArray]:
+        return self.store.labels if len(self.store) else None
+
+    @property
+    def view(self) -> ClusterView:
+        """The last published clustering state."""
+        return self._view
+
+    @property
+    def dirty_faces(self) -> int:
+        """Faces added or removed since the last full clustering."""
+        return self._dirty
+
     def fit(
         self, embeddings: List[NDArray], image_paths: List[str]
     ) -> Dict[int, List[str]]:
@@ -190,95 +398,181 @@ class FaceCluster:
             Dict mapping cluster labels to lists of image IDs
         """
         self._validate_input(embeddings, image_paths)
+        image_ids = [get_id_from_path(path) for path in image_paths]
+
+        with self._lock.write():
+            self.engine = None
+            self._engine_generation += 1
+            self._pending.clear()
+            self._removed.clear()
+            self._full_save = True
+            embeddings = np.array(embeddings, dtype=np.float32)
+            self.projection = self._fit_projection(embeddings)
+            self.store.reset(self._prepare(embeddings), image_ids)
+            self._reset_index()
+            if self.incremental:
+                self.engine = self._new_engine()
+                if len(embeddings):
+                    self.store.set_labels(self.engine.fit(self.embeddings))
+            elif len(embeddings):
+                self.store.set_labels(self.dbscan.fit_predict(self.embeddings))
+            self.centroids.rebuild(self.store.embeddings, self.store.labels)
+            self._dirty = 0
+            self._reclustered_at = time.time()
+            self._publish()
 
-        if not embeddings:
-            self.embeddings = np.array([])
-            self.image_ids = []
-            self.labels = None
-        else:
-            self.embeddings = np.array(embeddings)
-            self.image_ids = [get_id_from_path(path) for path in image_paths]
-            self.labels = self.dbscan.fit_predict(self.embeddings)
-
-        self._clear_caches()
         return self.get_clusters()
 
-    @TTLCache(maxsize=128, ttl=3600)
     def get_clusters(self) -> Dict[int, List[str]]:
         """
-        Get current clustering results with TTL caching.
+        Get current clustering results, without waiting for writers.
 
         Returns:
             Dict mapping cluster labels to lists of image IDs
         """
-        clusters: Dict[int, Set[str]] = defaultdict(set)
-        if self.labels is not None:
-            for i, label in enumerate(self.labels):
-                clusters[int(label)].add(self.image_ids[i])
-        return {k: list(v) for k, v in clusters.items()}
+        return self._view.clusters()
 
-    def add_face(self, embedding: NDArray, image_path: str) -> Dict[int, List[str]]:
+    def add_face(
+        self, embedding: NDArray, image_path: str, save: bool = True
+    ) -> Dict[int, List[str]]:
         """
         Add a new face embedding to the clusters.
 
         Args:
             embedding: Face embedding vector
             image_path: Path to the image
+            save: Write the changed assignments to the database right away;
+                otherwise they are written by the next `save_to_db`
 
         Returns:
             Updated clustering results
         """
         image_id = get_id_from_path(image_path)
+        self.add_faces(embedding.reshape(1, -1), [image_id], save=save)
+        return self.get_clusters()
 
-        if len(self.embeddings) == 0:
-            self.embeddings = np.array([embedding])
-            self.image_ids = [image_id]
-            self.labels = np.array([-1])
-        else:
-            # Vectorized distance calculation
-            distances = cosine_distances(embedding.reshape(1, -1), self.embeddings)[0]
-            nearest_neighbor = np.argmin(distances)
+    def add_faces(
+        self,
+        embeddings: NDArray,
+        image_ids: Sequence[Any],
+        save: bool = True,
+        conn: Optional[sqlite3.Connection] = None,
+        replace: bool = False,
+    ) -> NDArray:
+        """
+        Add a batch of face embeddings to the clusters.
 
-            # Determine cluster assignment
-            if distances[nearest_neighbor] <= self.eps:
-                new_label = self.labels[nearest_neighbor]
+        The whole batch is clustered under one acquisition of the write lock
+        and its assignments are written in one flush. With incremental
+        clustering, faces added before `build_engine` swapped the engine in
+        join the cluster of their nearest neighbor like without it; the
+        engine then gives them their DBSCAN labels.
+
+        Args:
+            embeddings: (M, D) face embeddings
+            image_ids: Image ID of every face
+            save: Write the changed assignments to the database; otherwise
+                they are written by the next `save_to_db`
+            conn: Connection to save with, left uncommitted like in
+                `save_to_db`
+            replace: First remove the faces stored before for these images,
+                as when an image is processed again; the new faces are then
+                numbered from 0 like its rows in the faces table
+
+        Returns:
+            (M,) cluster labels of the new faces
+        """
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        embeddings = embeddings.reshape(len(image_ids), -1)
+
+        with self._lock.write():
+            if replace:
+                for image_id in dict.fromkeys(image_ids):
+                    if image_id in self.store:
+                        self._remove(image_id)
+            embeddings = self._prepare(embeddings)
+            if self.incremental and self.engine is None and len(self.store) == 0:
+                self.engine = self._new_engine()
+            if self.incremental and self.engine is not None:
+                before = self._snapshot()
+                keys = self._store_faces(embeddings, image_ids)
+                self.store.set_labels(self.engine.add(embeddings))
+                self._track_changes(before)
             else:
-                new_label = max(self.labels) + 1 if len(self.labels) > 0 else 0
+                keys = np.array(
+                    [
+                        self._assign_face(embedding, image_id)
+                        for embedding, image_id in zip(embeddings, image_ids)
+                    ],
+                    dtype=np.int64,
+                )
+                self._mark_dirty(len(keys))
+                if self.incremental:
+                    self.start_engine_build()
 
-            # Update state
-            self.embeddings = np.vstack([self.embeddings, embedding])
-            self.image_ids.append(image_id)
-            self.labels = np.append(self.labels, new_label)
+            if save:
+                self._flush(conn)
+            self._publish()
+            return self.store.labels_at(self.store.rows_for_keys(keys))
 
-        self._clear_caches()
-        self.save_to_db()
-        return self.get_clusters()
+    def _assign_face(self, embedding: NDArray, image_id: Any) -> int:
+        """
+        Add one face to the clusters of its nearest neighbor, for
+        non-incremental clustering.
+
+        Returns:
+            Store key of the face
+        """
+        before = self._snapshot()
+        embedding = embedding.reshape(1, -1)
+        if len(self.store) == 0:
+            new_label = -1
+        else:
+            # Faces clearly inside or outside a known person's cluster are
+            # assigned from the centroids; the nearest stored face is only
+            # looked up near the eps boundary
+            match = self.centroids.nearest(embedding[0])
+            if match is not None and match[1] <= self.eps - FACE_CENTROID_MARGIN:
+                new_label = match[0]
+            elif match is not None and match[1] > self.eps + FACE_CENTROID_MARGIN:
+                new_label = self.store.labels.max() + 1
+            else:
+                keys, distances = self.index.knn(embedding[0], 1)
+                if len(keys) == 0:
+                    # Every face in the probed buckets was removed
+                    keys, distances = self.index.knn(embedding[0], 1, exact=True)
+                nearest_neighbor = self.store.rows_for_keys(keys)
+
+                # Determine cluster assignment
+                if distances[0] <= self.eps:
+                    new_label = self.store.labels_at(nearest_neighbor)[0]
+                else:
+                    new_label = self.store.labels.max() + 1
 
-    @TTLCache(maxsize=128, ttl=3600)
-    def get_related_images(self, image_id: str) -> List[str]:
+        keys = self._store_faces(embedding, [image_id], np.array([new_label]))
+        self._track_changes(before)
+        return keys[0]
+
+    def get_related_images(
+        self,
+        image_id: str,
+        limit: Optional[int] = None,
+        min_similarity: Optional[float] = None,
+    ) -> List[Tuple[Any, float]]:
         """
-        Find related images based on embedding similarity with TTL caching.
+        Find related images based on embedding similarity, without waiting
+        for writers.
 
         Args:
             image_id: ID of the query image
+            limit: Maximum number of images returned, all if None
+            min_similarity: Lowest cosine similarity between faces of related
+                images, 1 - eps if None
 
         Returns:
-            List of related image IDs
+            List of (related image ID, similarity), most similar first
         """
-        if image_id not in self.image_ids:
-            return []
-
-        indices = [i for i, id in enumerate(self.image_ids) if id == image_id]
-        embeddings = self.embeddings[indices]
-
-        related_images = set()
-        for embedding in embeddings:
-            distances = cosine_distances(embedding.reshape(1, -1), self.embeddings)[0]
-            for i, distance in enumerate(distances):
-                if self.image_ids[i] != image_id and distance <= self.eps:
-                    related_images.add(self.image_ids[i])
-
-        return list(related_images)
+        return self._view.related_images(image_id, limit, min_similarity)
 
     def remove_image(self, image_id: str) -> Dict[int, List[str]]:
         """
@@ -290,77 +584,525 @@ class FaceCluster:
         Returns:
             Updated clustering results
         """
-        if image_id in self.image_ids:
-            # Create mask for filtering
-            mask = np.array([id != image_id for id in self.image_ids])
+        with self._lock.write():
+            if image_id in self.store:
+                self._remove(image_id)
+                self._publish()
+            self._flush(None)
 
-            # Update arrays efficiently
-            self.embeddings = self.embeddings[mask]
-            self.image_ids = list(np.array(self.image_ids)[mask])
+        return self.get_clusters()
 
-            if len(self.embeddings) > 0:
-                self.labels = self.dbscan.fit_predict(self.embeddings)
-            else:
-                self.labels = None
+    def _remove(self, image_id: Any) -> None:
+        """`remove_image` of a stored image, with the write lock held."""
+        engine = self.engine if self.incremental else None
+        before = self._snapshot()
+        rows = self.store.rows(image_id)
+        if engine is not None:
+            # Only the clusters around the removed faces are recomputed
+            engine.remove(self.store.positions(self.store.keys_at(rows)))
+        self.centroids.update(self.store.vectors(rows), self.store.labels_at(rows), -1)
+
+        self.index.remove(self.store.remove(image_id))
+
+        if engine is not None:
+            self.store.set_labels(engine.labels)
+        elif self.incremental or self.reclusterer is not None:
+            self._mark_dirty(len(rows))
+            if self.incremental:
+                self.start_engine_build()
+        elif len(self.store) > 0:
+            self.store.set_labels(self.dbscan.fit_predict(self.embeddings))
+
+        self._removed.add(image_id)
+        self._pending = {
+            face: label for face, label in self._pending.items() if face[0] != image_id
+        }
+        self._track_changes(before)
+
+    def recluster(self) -> bool:
+        """
+        Fit the clusters of all faces again without blocking other calls.
 
-        self._clear_caches()
-        self.save_to_db()
-        return self.get_clusters()
+        DBSCAN runs on the faces stored when the call starts while reads and
+        writes go on, then the new labels are swapped in under the write
+        lock in one step. Faces added in the meantime join the nearest new
+        cluster centroid within eps, or start a cluster of their own, and
+        stay dirty until the next run. With incremental clustering the
+        labels are always those of a full run and nothing is done.
 
-    def _clear_caches(self) -> None:
-        """Clear all internal caches."""
-        self.get_clusters.clear_cache()  # type: ignore
-        self.get_related_images.clear_cache()  # type: ignore
+        Returns:
+            Whether new labels were swapped in; False if there was nothing to
+            do or another run was in progress
+        """
+        if self.incremental or not self._recluster_lock.acquire(blocking=False):
+            return False
+        try:
+            with self._lock.read():
+                # The store never overwrites stored embeddings, so this view
+                # can be read after the lock is released
+                embeddings = self.store.embeddings
+                keys = self.store.keys.copy()
+                dirty = self._dirty
+            if len(keys) == 0:
+                return False
+
+            start = time.perf_counter()
+            labels = self.dbscan.fit_predict(embeddings)
+            logger.info(
+                f"Reclustered {len(keys)} faces in {time.perf_counter() - start:.2f}s"
+            )
 
-    def save_to_db(self) -> None:
-        """Save current state to the database."""
-        with database_connection(self.db_path) as conn:
-            state = {
-                "image_ids": json.dumps(self.image_ids),
-                "labels": json.dumps(
-                    self.labels.tolist() if self.labels is not None else []
-                ),
-            }
-
-            conn.execute("DELETE FROM face_clusters")
-            conn.execute(
-                """INSERT INTO face_clusters (image_ids, labels)
-                   VALUES (:image_ids, :labels)""",
-                state,
+            with self._lock.write():
+                before = self._snapshot()
+                current = self.store.keys
+                rows = self.store.rows_for_keys(current)
+                positions = np.minimum(np.searchsorted(keys, current), len(keys) - 1)
+                fitted = keys[positions] == current
+                new_labels = np.where(fitted, labels[positions], -1)
+                centroids = ClusterCentroids()
+                centroids.rebuild(self.store.vectors(rows[fitted]), new_labels[fitted])
+
+                # Keys only increase, so faces missing from the run were added
+                # after it started
+                next_label = int(new_labels.max(initial=-1)) + 1
+                for i in np.flatnonzero(~fitted).tolist():
+                    vector = self.store.vectors([rows[i]])
+                    match = centroids.nearest(vector[0])
+                    if match is not None and match[1] <= self.eps:
+                        new_labels[i] = match[0]
+                    else:
+                        new_labels[i], next_label = next_label, next_label + 1
+                    centroids.update(vector, -1, new_labels[i : i + 1])
+
+                self.store.set_labels(new_labels)
+                self._track_changes(before)
+                self.centroids = centroids
+                self._dirty -= dirty
+                self._reclustered_at = time.time()
+                self._flush(None)
+                self._publish()
+            return True
+        finally:
+            self._recluster_lock.release()
+
+    def _mark_dirty(self, count: int) -> None:
+        """Count faces whose labels may differ from a full clustering."""
+        self._dirty += count
+        if self.reclusterer is not None:
+            self.reclusterer.notify(self._dirty)
+
+    def _new_engine(self) -> IncrementalDBSCAN:
+        """Empty incremental DBSCAN state answering queries from the index."""
+        return IncrementalDBSCAN(
+            eps=self.eps,
+            min_samples=self.min_samples,
+            radius_search=self._radius_search,
+        )
+
+    def start_engine_build(self) -> None:
+        """Run `build_engine` in a background thread, unless one is running."""
+        with self._engine_lock:
+            if self._engine_thread is not None and self._engine_thread.is_alive():
+                return
+            self._engine_thread = threading.Thread(
+                target=self._build_engine_in_background,
+                name="face-cluster-engine",
+                daemon=True,
+            )
+            self._engine_thread.start()
+
+    def _build_engine_in_background(self) -> None:
+        try:
+            self.build_engine()
+        except Exception as e:
+            logger.error(f"Building the incremental face clusters failed: {e}")
+
+    def build_engine(self) -> None:
+        """
+        Build the incremental DBSCAN state of the stored faces and swap it in.
+
+        The eps-neighbor graph is built without holding the lock, through a
+        separate index over the faces stored when the call starts, so reads
+        and writes go on meanwhile. Faces added or removed since are then
+        applied to it under the write lock, and the labels replaced by its
+        DBSCAN labels.
+        """
+        if not self.incremental:
+            return
+        with self._lock.read():
+            if self.engine is not None:
+                return
+            # The store never overwrites stored embeddings, so this view can
+            # be read after the lock is released
+            embeddings = self.store.embeddings
+            keys = self.store.keys.copy()
+            generation = self._engine_generation
+
+        start = time.perf_counter()
+        index = make_index(self.index_kind, nprobe=FACE_INDEX_NPROBE)
+        index.add(np.arange(len(keys)), embeddings)
+        engine = IncrementalDBSCAN(
+            eps=self.eps,
+            min_samples=self.min_samples,
+            radius_search=lambda vectors: index.radius_batch(
+                vectors, self.eps, exact=True
+            ),
+        )
+        if len(keys):
+            engine.fit(embeddings)
+        engine.radius_search = self._radius_search
+        logger.info(
+            f"Built incremental face clusters of {len(keys)} faces in "
+            f"{time.perf_counter() - start:.2f}s"
+        )
+
+        with self._lock.write():
+            if self.engine is not None or generation != self._engine_generation:
+                return
+            before = self._snapshot()
+            current = self.store.keys
+            # Keys only increase, so faces past the last built one are new
+            gone = np.flatnonzero(~np.isin(keys, current))
+            if len(gone):
+                engine.remove(gone)
+            added = current[current > keys[-1]] if len(keys) else current
+            if len(added):
+                engine.add(self.store.vectors(self.store.rows_for_keys(added)))
+
+            self.engine = engine
+            self.store.set_labels(engine.labels)
+            self._track_changes(before)
+            self._dirty = 0
+            self._flush(None)
+            self._publish()
+
+    def _reset_index(self) -> None:
+        """Rebuild the nearest-neighbor index from the stored embeddings."""
+        self.index: ExactIndex = make_index(self.index_kind, nprobe=FACE_INDEX_NPROBE)
+        if len(self.store) > 0:
+            self.index.add(self.store.keys, self.store.embeddings)
+
+    def _store_faces(
+        self,
+        embeddings: NDArray,
+        image_ids: Sequence[Any],
+        labels: Optional[NDArray] = None,
+    ) -> NDArray:
+        """Append faces to the store and the index, returning their keys."""
+        keys = self.store.add(embeddings, image_ids, labels)
+        self.index.add(keys, embeddings)
+        return keys
+
+    def _radius_search(self, embeddings: NDArray) -> List[NDArray]:
+        """
+        Positions among the stored faces of all faces within eps of each
+        embedding.
+
+        The incremental engine keeps exact DBSCAN labels, so these queries
+        scan every bucket that may hold a match even with the approximate
+        index; only nearest-neighbor assignment uses `nprobe`.
+        """
+        keys = self.store.keys
+        return [
+            np.searchsorted(keys, found)
+            for found in self.index.radius_batch(embeddings, self.eps, exact=True)
+        ]
+
+    def _snapshot(self) -> Tuple[NDArray, NDArray]:
+        """Copy of the current keys and labels, for `_track_changes`."""
+        return self.store.keys.copy(), self.store.labels.copy()
+
+    def _track_changes(self, before: Tuple[NDArray, NDArray]) -> None:
+        """Queue the faces added or relabelled since `before` for saving."""
+        keys_before, labels_before = before
+        keys, labels = self.store.keys, self.store.labels
+        changed = np.ones(len(keys), dtype=bool)
+        if len(keys_before):
+            positions = np.minimum(
+                np.searchsorted(keys_before, keys), len(keys_before) - 1
             )
+            known = keys_before[positions] == keys
+            changed = ~known | (labels_before[positions] != labels)
+
+        rows = self.store.rows_for_keys(keys[changed])
+        for face, label in zip(self.store.face_ids(rows), labels[changed].tolist()):
+            self._pending[face] = label
+
+        if len(keys_before):
+            old_labels = np.where(known, labels_before[positions], -1)[changed]
+        else:
+            old_labels = np.full(len(rows), -1)
+        self.centroids.update(self.store.vectors(rows), old_labels, labels[changed])
+
+    def get_centroids(self) -> Dict[int, Tuple[NDArray, int]]:
+        """
+        Get the centroid of every cluster.
+
+        Centroids of projected embeddings are mapped back to the space of the
+        embeddings given to `fit` and `add_faces`.
+
+        Returns:
+            Dict mapping cluster labels to (unit-length centroid, face count)
+        """
+        with self._lock.read():
+            centroids = self.centroids.centroids()
+            projection = self.projection
+        if projection is None:
+            return centroids
+        return {
+            label: (projection.inverse_transform(centroid)[0], count)
+            for label, (centroid, count) in centroids.items()
+        }
+
+    def identify(
+        self, embedding: NDArray, max_distance: Optional[float] = None
+    ) -> Optional[Tuple[int, float]]:
+        """
+        Find the known person (cluster) a face belongs to.
+
+        Args:
+            embedding: Face embedding vector
+            max_distance: Largest cosine distance to a cluster centroid that
+                still counts as a match, eps by default
+
+        Returns:
+            Tuple of (cluster label, distance to its centroid), or None if no
+            centroid is close enough
+        """
+        with self._lock.read():
+            match = self.centroids.nearest(self._prepare(embedding.reshape(1, -1))[0])
+        max_distance = self.eps if max_distance is None else max_distance
+        if match is None or match[1] > max_distance:
+            return None
+        return match
+
+    def _fit_projection(self, embeddings: NDArray) -> Optional[EmbeddingProjection]:
+        """Fit the projection to `projection_dim` on whole embeddings."""
+        return fit_projection(
+            embeddings,
+            self.projection_dim,
+            self.eps,
+            FACE_PROJECTION_MIN_RECALL,
+            FACE_PROJECTION_MIN_FACES,
+        )
+
+    def _prepare(self, embeddings: NDArray) -> NDArray:
+        """
+        Whole (M, D) embeddings as they are stored: projected if there is a
+        projection, and rounded to the storage type, so that the index and
+        the incremental engine see the same values as the store.
+        """
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if self.projection is not None:
+            embeddings = self.projection.transform(embeddings)
+        rounded = embeddings.astype(self.store.dtype, copy=False)
+        return rounded.astype(np.float32, copy=False)
+
+    def _publish(self) -> None:
+        """Replace the view readers see with the current state."""
+        self._version += 1
+        self._view = ClusterView(
+            self.store.embeddings,
+            self.store.norms,
+            self.store.image_ids,
+            self.store.labels.copy(),
+            self.eps,
+            version=self._version,
+            dirty_faces=self._dirty,
+            reclustered_at=self._reclustered_at,
+        )
+
+    def save_to_db(self, conn: Optional[sqlite3.Connection] = None) -> None:
+        """
+        Write the cluster assignments changed since the last save.
+
+        Only the faces that were added or changed label are upserted, and
+        removed images deleted; after `fit` all assignments are rewritten.
+
+        Args:
+            conn: Connection to write with, left uncommitted so the caller can
+                save in the same transaction as the faces themselves. A new
+                connection is opened and committed if not given.
+        """
+        with self._lock.write():
+            self._flush(conn)
+
+    def _flush(self, conn: Optional[sqlite3.Connection]) -> None:
+        """`save_to_db` with the write lock already held."""
+        if conn is None:
+            with database_connection(self.db_path) as conn:
+                self._flush(conn)
+                conn.commit()
+            return
+
+        if self._full_save:
+            conn.execute("DELETE FROM face_cluster_assignments")
+            # The single-row JSON state it replaces
+            conn.execute("DROP TABLE IF EXISTS face_clusters")
+            rows = self.store.rows_for_keys(self.store.keys)
+            assignments = [
+                (image_id, face_index, label)
+                for (image_id, face_index), label in zip(
+                    self.store.face_ids(rows), self.store.labels.tolist()
+                )
+            ]
+        else:
+            conn.executemany(
+                "DELETE FROM face_cluster_assignments WHERE image_id = ?",
+                [(image_id,) for image_id in self._removed],
+            )
+            assignments = [
+                (image_id, face_index, label)
+                for (image_id, face_index), label in self._pending.items()
+            ]
+
+        conn.executemany(
+            """INSERT INTO face_cluster_assignments (image_id, face_index, label)
+               VALUES (?, ?, ?)
+               ON CONFLICT (image_id, face_index)
+               DO UPDATE SET label = excluded.label""",
+            assignments,
+        )
+        self._pending.clear()
+        self._removed.clear()
+        self._full_save = False
 
     @classmethod
-    def load_from_db(cls, db_path: Union[str, Path] = DATABASE_PATH) -> "FaceCluster":
+    def load_from_db(
+        cls, db_path: Union[str, Path] = DATABASE_PATH, **kwargs: Any
+    ) -> "FaceCluster":
         """
         Load clustering state from database.
 
+        The state is read from the memory-mapped snapshot when it matches the
+        database, and otherwise rebuilt with one query joining the cluster
+        assignments to the face embeddings, then saved as the new snapshot.
+        With incremental clustering, the engine's neighbor graph is not part
+        of the snapshot; `build_engine` starts in the background right away,
+        so it is ready before most ingests instead of built by the first.
+
         Args:
             db_path: Path to the database
+            **kwargs: Other FaceCluster arguments
 
         Returns:
             Initialized FaceCluster instance
         """
-        instance = cls(db_path=db_path)
+        instance = cls(db_path=db_path, **kwargs)
+        snapshot, rows = None, []
 
         try:
             with database_connection(db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT image_ids, labels FROM face_clusters")
-                row = cursor.fetchone()
-
-                if row:
-                    image_ids, labels = row
-                    instance.image_ids = json.loads(image_ids)
-                    instance.labels = np.array(json.loads(labels)) if labels else None
-
-                    # Load embeddings efficiently
-                    embeddings = []
-                    for emb in get_all_face_embeddings():
-                        if get_id_from_path(emb["image_path"]) in instance.image_ids:
-                            embeddings.extend(emb["embeddings"])
-                    instance.embeddings = np.array(embeddings)
-
+                instance._migrate_legacy_assignments(conn)
+                fingerprint = database_fingerprint(conn)
+                if instance.snapshot_dir is not None:
+                    snapshot = load_snapshot(instance.snapshot_dir, fingerprint)
+                if snapshot is not None and not instance._matches_snapshot(*snapshot):
+                    logger.info("Face cluster snapshot has other settings, rebuilding")
+                    snapshot = None
+                if snapshot is None:
+                    rows = conn.execute(
+                        """SELECT a.image_id, a.label, f.embedding
+                           FROM face_cluster_assignments a
+                           JOIN faces f
+                             ON f.image_id = a.image_id
+                            AND f.face_index = a.face_index
+                           ORDER BY a.seq"""
+                    ).fetchall()
         except sqlite3.OperationalError as e:
             logger.error(f"Database error: {e}")
+            return instance
 
+        if snapshot is not None:
+            embeddings, image_ids, labels, components = snapshot
+            if components is not None:
+                instance.projection = EmbeddingProjection(components)
+        else:
+            image_ids = [row[0] for row in rows]
+            labels = np.array([row[1] for row in rows], dtype=np.int64)
+            embeddings = np.array([blob_to_embedding(row[2]) for row in rows])
+        if instance.projection is None:
+            # The embeddings are whole, so the library may be projected now
+            instance.projection = instance._fit_projection(embeddings)
+            if instance.projection is not None:
+                embeddings = instance._prepare(embeddings)
+                snapshot = None
+
+        # A snapshot's memory map is kept as the storage until faces are added
+        instance.store.adopt(embeddings, image_ids, labels)
+        instance._reset_index()
+        instance.centroids.rebuild(instance.store.embeddings, instance.store.labels)
+        instance._publish()
+        if snapshot is None:
+            instance.save_snapshot(fingerprint)
+        if instance.incremental and len(instance.store):
+            instance.start_engine_build()
         return instance
+
+    def save_snapshot(self, fingerprint: Optional[str] = None) -> None:
+        """
+        Write the current state as the on-disk snapshot `load_from_db` reads.
+
+        Call after `save_to_db`, so the state matches the database.
+
+        Args:
+            fingerprint: `database_fingerprint` of the database, read if not
+                given
+        """
+        if self.snapshot_dir is None:
+            return
+        with self._lock.read():
+            if fingerprint is None:
+                with database_connection(self.db_path) as conn:
+                    fingerprint = database_fingerprint(conn)
+            try:
+                save_snapshot(
+                    self.snapshot_dir,
+                    fingerprint,
+                    self.store.embeddings,
+                    self.store.image_ids,
+                    self.store.labels,
+                    None if self.projection is None else self.projection.components,
+                )
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not save face cluster snapshot: {e}")
+
+    def _matches_snapshot(
+        self,
+        embeddings: NDArray,
+        image_ids: List,
+        labels: NDArray,
+        projection: Optional[NDArray],
+    ) -> bool:
+        """Whether a snapshot was saved with this storage type and projection."""
+        if len(embeddings) and embeddings.dtype != self.store.dtype:
+            return False
+        return projection is None or projection.shape[1] == self.projection_dim
+
+    def _migrate_legacy_assignments(self, conn: sqlite3.Connection) -> None:
+        """
+        Move the assignments of the old single-row `face_clusters` table, if
+        there is one, to the per-face table.
+        """
+        try:
+            row = conn.execute("SELECT image_ids, labels FROM face_clusters").fetchone()
+        except sqlite3.OperationalError:
+            return
+        if row:
+            image_ids = json.loads(row[0])
+            labels = json.loads(row[1]) if row[1] else [-1] * len(image_ids)
+            face_counts: Dict[Any, int] = defaultdict(int)
+            assignments = []
+            for image_id, label in zip(image_ids, labels):
+                assignments.append((image_id, face_counts[image_id], label))
+                face_counts[image_id] += 1
+
+            conn.execute("DELETE FROM face_cluster_assignments")
+            conn.executemany(
+                """INSERT INTO face_cluster_assignments (image_id, face_index, label)
+                   VALUES (?, ?, ?)""",
+                assignments,
+            )
+            logger.info(f"Migrated {len(assignments)} face cluster assignments")
+        conn.execute("DROP TABLE face_clusters")
+        conn.commit()
@@ -0,0 +1,367 @@
+from __future__ import annotations
+
+import logging
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+from numpy.typing import NDArray
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_rows(embeddings: NDArray) -> NDArray:
+    """
+    Scale every row to unit length as float32, leaving zero rows untouched.
+
+    Args:
+        embeddings: (N, D) array of embeddings
+
+    Returns:
+        (N, D) float32 array of unit-length rows
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return embeddings / norms
+
+
+def cosine_radius_neighbors(
+    queries: NDArray, points: NDArray, eps: float, chunk_size: int = 1024
+) -> List[NDArray]:
+    """
+    Find, for every query, the points within cosine distance `eps`.
+
+    Distances are computed the way `sklearn.metrics.pairwise.cosine_distances`
+    does, in chunks of `chunk_size` queries so memory stays bounded.
+
+    Args:
+        queries: (M, D) unit-length query rows
+        points: (N, D) unit-length point rows
+        eps: Maximum cosine distance, inclusive
+        chunk_size: Number of queries compared at once
+
+    Returns:
+        List of M arrays with the indices of the matching points
+    """
+    neighbors: List[NDArray] = []
+    for start in range(0, len(queries), chunk_size):
+        chunk = queries[start : start + chunk_size]
+        distances = chunk @ points.T
+        distances *= -1
+        distances += 1
+        np.clip(distances, 0, 2, out=distances)
+        rows, cols = np.nonzero(distances <= eps)
+        neighbors.extend(np.split(cols, np.searchsorted(rows, range(1, len(chunk)))))
+    return neighbors
+
+
+class IncrementalDBSCAN:
+    """
+    DBSCAN over cosine distance that is updated in place as points come and go.
+
+    The eps-neighbor graph, neighbor counts and core-point status are kept
+    between updates. Adding or removing points only changes the neighborhoods
+    of those points, so only the clusters containing them or their neighbors
+    are rebuilt; every other cluster is left as is.
+
+    Labels match `sklearn.cluster.DBSCAN(eps, min_samples, metric="cosine")`
+    fitted on the current points in insertion order, including the cluster
+    numbering and the assignment of border points reachable from several
+    clusters (they join the cluster whose first core point comes first).
+
+    Points are addressed by their position among the current points, in
+    insertion order, like the rows of the array a fresh fit would get.
+
+    Attributes:
+        eps: Maximum cosine distance between neighbors
+        min_samples: Neighbors (including the point itself) a core point needs
+        chunk_size: Number of rows compared at once when building neighbors
+        radius_search: Optional callable returning, for (M, D) points that are
+            already indexed, the positions of all points within `eps` of each
+            among the current points followed by the points being added. Lets
+            an external index answer the neighbor queries of `fit` and `add`,
+            `chunk_size` points at a time; the vectors are then not stored
+            here.
+    """
+
+    def __init__(
+        self,
+        eps: float = 0.3,
+        min_samples: int = 2,
+        chunk_size: int = 1024,
+        radius_search: Optional[Callable[[NDArray], List[NDArray]]] = None,
+    ) -> None:
+        self.eps = eps
+        self.min_samples = min_samples
+        self.chunk_size = chunk_size
+        self.radius_search = radius_search
+        self._reset(0)
+
+    def _reset(self, dim: int) -> None:
+        # Internal rows are never reused: removed points are only marked dead,
+        # so row order stays insertion order
+        self._size = 0
+        self._vectors = np.empty((0, dim), dtype=np.float32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._is_core = np.zeros(0, dtype=bool)
+        self._counts = np.zeros(0, dtype=np.int64)
+        # Cluster of a core row, or the cluster that claims a border row
+        self._component = np.full(0, -1, dtype=np.int64)
+        self._neighbors: List[NDArray] = []
+        # Cluster -> its core rows, and the first of them (sets the order)
+        self._members: Dict[int, NDArray] = {}
+        self._first: Dict[int, int] = {}
+        self._next_component = 0
+
+    def __len__(self) -> int:
+        return int(self._alive[: self._size].sum())
+
+    def _grow(self, count: int, dim: int) -> None:
+        needed = self._size + count
+        if self._vectors.shape[1] != dim and self._size == 0:
+            self._vectors = np.empty((0, dim), dtype=np.float32)
+        capacity = len(self._vectors)
+        if needed <= capacity:
+            return
+
+        capacity = max(needed, 2 * capacity, 16)
+        vectors = np.empty((capacity, dim), dtype=np.float32)
+        vectors[: self._size] = self._vectors[: self._size]
+        self._vectors = vectors
+        for name, fill in (
+            ("_alive", False),
+            ("_is_core", False),
+            ("_counts", 0),
+            ("_component", -1),
+        ):
+            old = getattr(self, name)
+            new = np.full(capacity, fill, dtype=old.dtype)
+            new[: self._size] = old[: self._size]
+            setattr(self, name, new)
+
+    def _alive_rows(self) -> NDArray:
+        return np.flatnonzero(self._alive[: self._size])
+
+    def fit(self, embeddings: NDArray) -> NDArray:
+        """
+        Cluster `embeddings` from scratch.
+
+        Args:
+            embeddings: (N, D) array of embeddings
+
+        Returns:
+            (N,) array of cluster labels, -1 for noise
+        """
+        embeddings = np.asarray(embeddings)
+        self._reset(embeddings.shape[1] if embeddings.ndim == 2 else 0)
+        if len(embeddings):
+            vectors = normalize_rows(embeddings)
+            if self.radius_search is not None:
+                neighbors = self._search(vectors)
+            else:
+                neighbors = cosine_radius_neighbors(
+                    vectors, vectors, self.eps, self.chunk_size
+                )
+            self._insert(vectors, neighbors)
+        return self.labels
+
+    def add(self, embeddings: NDArray) -> NDArray:
+        """
+        Append points and update the clusters they touch.
+
+        Args:
+            embeddings: (M, D) array of new embeddings
+
+        Returns:
+            (N,) array of cluster labels of all current points
+        """
+        vectors = normalize_rows(np.atleast_2d(embeddings))
+        if len(vectors) == 0:
+            return self.labels
+
+        if self.radius_search is not None:
+            # Positions of the current points, then of the new ones, to rows
+            rows = np.concatenate(
+                [self._alive_rows(), np.arange(self._size, self._size + len(vectors))]
+            )
+            self._insert(vectors, [rows[found] for found in self._search(vectors)])
+        else:
+            self._insert(vectors)
+        return self.labels
+
+    def _search(self, vectors: NDArray) -> List[NDArray]:
+        neighbors: List[NDArray] = []
+        for start in range(0, len(vectors), self.chunk_size):
+            neighbors.extend(
+                self.radius_search(vectors[start : start + self.chunk_size])
+            )
+        return neighbors
+
+    def _insert(
+        self, vectors: NDArray, neighbors: Optional[List[NDArray]] = None
+    ) -> None:
+        # `neighbors` holds the rows within eps of each new point, counting
+        # the new points themselves; they are searched here if not given
+        count, dim = vectors.shape
+        store = self.radius_search is None
+        self._grow(count, dim if store else 0)
+        start = self._size
+        rows = np.arange(start, start + count)
+        if store:
+            self._vectors[rows] = vectors
+        self._alive[rows] = True
+        self._size += count
+
+        if neighbors is None:
+            neighbors = cosine_radius_neighbors(
+                vectors, self._vectors[: self._size], self.eps, self.chunk_size
+            )
+        linked_old, linked_new = [], []
+        for row, found in zip(rows, neighbors):
+            found = found[self._alive[found]]
+            self._neighbors.append(found)
+            self._counts[row] = len(found)
+            previous = found[found < start]
+            linked_old.append(previous)
+            linked_new.append(np.full(len(previous), row))
+
+        # Link the new rows into the neighborhoods of existing ones
+        linked_old = np.concatenate(linked_old)
+        linked_new = np.concatenate(linked_new)
+        order = np.argsort(linked_old, kind="stable")
+        old_rows, splits = np.unique(linked_old[order], return_index=True)
+        for old_row, new_rows in zip(old_rows, np.split(linked_new[order], splits[1:])):
+            self._neighbors[old_row] = np.concatenate(
+                [self._neighbors[old_row], new_rows]
+            )
+            self._counts[old_row] += len(new_rows)
+
+        self._update(rows)
+
+    def remove(self, positions: Iterable[int]) -> NDArray:
+        """
+        Remove points and update the clusters they touch.
+
+        Args:
+            positions: Positions of the points among the current points
+
+        Returns:
+            (N,) array of cluster labels of the remaining points
+        """
+        positions = np.asarray(list(positions), dtype=np.int64)
+        if len(positions) == 0:
+            return self.labels
+
+        rows = np.unique(self._alive_rows()[positions])
+        self._alive[rows] = False
+        neighbors = np.concatenate([self._neighbors[row] for row in rows])
+        np.subtract.at(self._counts, neighbors[self._alive[neighbors]], 1)
+
+        self._update(rows)
+        for row in rows:
+            self._neighbors[row] = np.empty(0, dtype=np.int64)
+        return self.labels
+
+    def _update(self, changed: NDArray) -> None:
+        """
+        Rebuild the clusters affected by added or removed rows.
+
+        Only rows in `changed` or next to them can change neighbor count and
+        core status. The clusters those rows belonged to may split, and core
+        rows they reach may merge clusters, so those clusters are rebuilt by
+        traversing the core graph from them. Border rows next to rebuilt
+        clusters are then reassigned.
+        """
+        touched = np.unique(
+            np.concatenate([changed] + [self._neighbors[row] for row in changed])
+        )
+        old_components = {
+            int(c) for c in self._component[touched[self._is_core[touched]]]
+        }
+
+        alive = self._alive
+        was_core = self._is_core[touched].copy()
+        self._is_core[touched] = alive[touched] & (
+            self._counts[touched] >= self.min_samples
+        )
+        is_core = self._is_core
+
+        starts = [touched[is_core[touched]]]
+        for component in old_components:
+            starts.append(self._members.pop(component))
+            del self._first[component]
+        starts = np.concatenate(starts)
+        starts = starts[is_core[starts]]
+
+        visited = set()
+        rebuilt = []
+        for start in starts.tolist():
+            if start in visited:
+                continue
+            component = self._next_component
+            self._next_component += 1
+
+            visited.add(start)
+            stack, members = [start], []
+            while stack:
+                row = stack.pop()
+                members.append(row)
+                previous = int(self._component[row])
+                if previous in self._members:
+                    # Merged with a cluster that was not affected directly
+                    del self._members[previous]
+                    del self._first[previous]
+                self._component[row] = component
+
+                neighbors = self._neighbors[row]
+                for neighbor in neighbors[is_core[neighbors]].tolist():
+                    if neighbor not in visited:
+                        visited.add(neighbor)
+                        stack.append(neighbor)
+
+            members = np.array(members, dtype=np.int64)
+            self._members[component] = members
+            self._first[component] = int(members.min())
+            rebuilt.append(members)
+
+        # Border rows next to a rebuilt cluster, a changed row or a row that
+        # stopped being core (its border rows may now belong to no cluster)
+        demoted = touched[was_core & ~is_core[touched]]
+        candidates = (
+            [touched]
+            + [self._neighbors[row] for members in rebuilt for row in members]
+            + [self._neighbors[row] for row in demoted]
+        )
+        candidates = np.unique(np.concatenate(candidates))
+        candidates = candidates[alive[candidates] & ~is_core[candidates]]
+        for row in candidates:
+            neighbors = self._neighbors[row]
+            components = self._component[
+                neighbors[alive[neighbors] & is_core[neighbors]]
+            ]
+            if len(components) == 0:
+                self._component[row] = -1
+            else:
+                firsts = [self._first[int(c)] for c in components]
+                self._component[row] = components[int(np.argmin(firsts))]
+
+    @property
+    def labels(self) -> NDArray:
+        """Cluster label of every current point, numbered like DBSCAN."""
+        rows = self._alive_rows()
+        labels = np.full(len(rows), -1, dtype=np.int64)
+        if not self._first:
+            return labels
+
+        # Clusters are numbered in the order of their first core row
+        components = np.fromiter(self._first.keys(), dtype=np.int64)
+        firsts = np.fromiter(self._first.values(), dtype=np.int64)
+        order = np.argsort(components)
+        components = components[order]
+        rank = np.empty(len(firsts), dtype=np.int64)
+        rank[np.argsort(firsts[order])] = np.arange(len(firsts))
+
+        assigned = self._component[rows]
+        clustered = assigned >= 0
+        labels[clustered] = rank[np.searchsorted(components, assigned[clustered])]
+        return labels
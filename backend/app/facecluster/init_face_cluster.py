@@ -2,6 +2,7 @@ import os
 from app.config.settings import DATABASE_PATH
 from app.database.faces import get_all_face_embeddings
 from app.facecluster.facecluster import FaceCluster
+from app.facecluster.recluster import start_reclusterer
 
 # Global instance to store the face cluster model
 face_cluster = None
@@ -40,6 +41,10 @@ def init_face_cluster(db_path=DATABASE_PATH):
         # Save the initialized model to DB
         face_cluster.save_to_db()
 
+    if not face_cluster.incremental:
+        # Keep refitting the clusters off the request path
+        start_reclusterer(face_cluster)
+
     return face_cluster
 
 
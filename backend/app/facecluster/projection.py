@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import logging
+from typing import Optional, Tuple
+
+import numpy as np
+from numpy.typing import NDArray
+
+from app.facecluster.incremental_dbscan import normalize_rows
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingProjection:
+    """
+    Linear map of face embeddings to fewer dimensions that keeps their cosine
+    similarities.
+
+    The components are the top principal directions of the library's
+    unit-length embeddings, without centering: the dot product of two
+    projected faces then differs from their cosine similarity only by the
+    part of the faces in the dropped directions, which this choice keeps
+    smallest on the library.
+
+    Attributes:
+        components: (D, K) orthonormal float32 columns
+    """
+
+    def __init__(self, components: NDArray) -> None:
+        self.components = np.ascontiguousarray(components, dtype=np.float32)
+
+    @property
+    def input_dim(self) -> int:
+        return self.components.shape[0]
+
+    @property
+    def dim(self) -> int:
+        return self.components.shape[1]
+
+    @classmethod
+    def fit(cls, embeddings: NDArray, dim: int) -> "EmbeddingProjection":
+        """
+        Fit the projection on a library of embeddings.
+
+        Args:
+            embeddings: (N, D) face embeddings
+            dim: Number of dimensions to keep, at most D
+
+        Returns:
+            The fitted projection
+        """
+        vectors = normalize_rows(embeddings).astype(np.float64)
+        # The D x D second-moment matrix is cheap even for large libraries
+        _, eigenvectors = np.linalg.eigh(vectors.T @ vectors)
+        return cls(eigenvectors[:, ::-1][:, :dim])
+
+    def transform(self, embeddings: NDArray) -> NDArray:
+        """Project (M, D) embeddings to (M, K) float32 vectors."""
+        return normalize_rows(np.atleast_2d(embeddings)) @ self.components
+
+    def inverse_transform(self, projected: NDArray) -> NDArray:
+        """
+        Map (M, K) projected vectors back to (M, D) unit-length vectors in the
+        space of the original embeddings.
+        """
+        return normalize_rows(np.atleast_2d(projected) @ self.components.T)
+
+
+def neighbor_recall(
+    embeddings: NDArray,
+    projected: NDArray,
+    eps: float,
+    sample_size: int = 1000,
+    block_size: int = 128,
+    seed: int = 0,
+) -> Tuple[float, float]:
+    """
+    Compare the eps-neighbors of a sample of faces before and after a
+    projection.
+
+    Args:
+        embeddings: (N, D) original face embeddings
+        projected: (N, K) the same faces projected
+        eps: Maximum cosine distance between neighbors
+        sample_size: Faces whose neighbors are compared
+        block_size: Sample faces compared per matrix product
+        seed: Seed of the sample
+
+    Returns:
+        Tuple of (recall, precision): the fraction of the original neighbor
+        pairs that are still neighbors after the projection, and of the
+        projected neighbor pairs that were neighbors before
+    """
+    vectors, reduced = normalize_rows(embeddings), normalize_rows(projected)
+    rng = np.random.default_rng(seed)
+    sample = rng.choice(len(vectors), min(sample_size, len(vectors)), replace=False)
+
+    kept = true = found = 0
+    for start in range(0, len(sample), block_size):
+        rows = sample[start : start + block_size]
+        before = vectors[rows] @ vectors.T >= 1 - eps
+        after = reduced[rows] @ reduced.T >= 1 - eps
+        # A face is not its own neighbor
+        before[np.arange(len(rows)), rows] = False
+        after[np.arange(len(rows)), rows] = False
+        kept += int(np.count_nonzero(before & after))
+        true += int(np.count_nonzero(before))
+        found += int(np.count_nonzero(after))
+    return kept / true if true else 1.0, kept / found if found else 1.0
+
+
+def fit_projection(
+    embeddings: NDArray,
+    dim: int,
+    eps: float,
+    min_recall: float,
+    min_faces: int,
+) -> Optional[EmbeddingProjection]:
+    """
+    Fit a projection of the library to `dim` dimensions, if it keeps the
+    faces' eps-neighbors.
+
+    Args:
+        embeddings: (N, D) face embeddings of the library
+        dim: Number of dimensions to keep; 0 disables the projection
+        eps: Maximum cosine distance between neighbors
+        min_recall: Lowest neighbor recall and precision (see
+            `neighbor_recall`) the projection must reach on the library
+        min_faces: Fewest faces to fit a projection on
+
+    Returns:
+        The projection, or None if disabled, if the library is too small or
+        the projection loses too many neighbors
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    if dim <= 0 or len(embeddings) < max(min_faces, 1):
+        return None
+    if dim >= embeddings.shape[1]:
+        return None
+
+    projection = EmbeddingProjection.fit(embeddings, dim)
+    recall, precision = neighbor_recall(
+        embeddings, projection.transform(embeddings), eps
+    )
+    if min(recall, precision) < min_recall:
+        logger.warning(
+            f"Not projecting face embeddings to {dim} dimensions: neighbor "
+            f"recall {recall:.3f}, precision {precision:.3f}"
+        )
+        return None
+    logger.info(
+        f"Projecting face embeddings from {embeddings.shape[1]} to {dim} "
+        f"dimensions (neighbor recall {recall:.3f}, precision {precision:.3f})"
+    )
+    return projection
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Optional
+
+from app.config.settings import FACE_RECLUSTER_INTERVAL, FACE_RECLUSTER_THRESHOLD
+from app.facecluster.facecluster import FaceCluster
+
+logger = logging.getLogger(__name__)
+
+
+class Reclusterer:
+    """
+    Background thread running `FaceCluster.recluster` once `dirty_threshold`
+    faces changed, and every `interval` seconds while any did.
+
+    Attributes:
+        cluster: Face clusters to refit
+        dirty_threshold: Changed faces that trigger a run right away
+        interval: Seconds between runs while fewer faces changed
+    """
+
+    def __init__(
+        self,
+        cluster: FaceCluster,
+        dirty_threshold: int = FACE_RECLUSTER_THRESHOLD,
+        interval: float = FACE_RECLUSTER_INTERVAL,
+    ) -> None:
+        self.cluster = cluster
+        self.dirty_threshold = dirty_threshold
+        self.interval = interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Attach to the clusters and start the thread."""
+        self.cluster.reclusterer = self
+        self._thread = threading.Thread(
+            target=self._run, name="face-recluster", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the thread, waiting up to `timeout` for a running refit."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self.cluster.reclusterer is self:
+            self.cluster.reclusterer = None
+
+    def notify(self, dirty_faces: int) -> None:
+        """Called by the clusters when faces change."""
+        if dirty_faces >= self.dirty_threshold:
+            self._wake.set()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            if self.cluster.dirty_faces == 0:
+                continue
+            try:
+                self.cluster.recluster()
+            except Exception as e:
+                logger.error(f"Background face reclustering failed: {e}")
+
+
+_reclusterer: Optional[Reclusterer] = None
+
+
+def start_reclusterer(cluster: FaceCluster) -> Reclusterer:
+    """Start the background reclusterer of `cluster`, once."""
+    global _reclusterer
+    if _reclusterer is None:
+        _reclusterer = Reclusterer(cluster)
+        _reclusterer.start()
+    return _reclusterer
+
+
+def stop_reclusterer() -> None:
+    """Stop the background reclusterer, if it was started."""
+    global _reclusterer
+    if _reclusterer is not None:
+        _reclusterer.stop()
+        _reclusterer = None
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+from numpy.typing import NDArray
+
+from app.facecluster.incremental_dbscan import normalize_rows
+
+
+def image_blocks(image_index: NDArray, block_size: int) -> List[Tuple[int, int]]:
+    """
+    Split face rows, grouped by image, into blocks of about `block_size` rows
+    that never split an image.
+
+    Args:
+        image_index: (N,) non-decreasing image number of every face
+        block_size: Target rows per block
+
+    Returns:
+        List of (start, end) row ranges
+    """
+    # Rows where a new image starts, plus the end
+    starts = np.flatnonzero(np.diff(image_index, prepend=-1))
+    bounds = np.append(starts, len(image_index))
+    blocks, start = [], 0
+    while start < len(image_index):
+        # First image start at or after start + block_size
+        position = np.searchsorted(bounds, start + block_size)
+        end = int(bounds[min(position, len(bounds) - 1)])
+        blocks.append((start, end))
+        start = end
+    return blocks
+
+
+def _join_block(
+    vectors: NDArray,
+    image_index: NDArray,
+    start: int,
+    end: int,
+    threshold: float,
+    column_block: int,
+) -> List[Tuple[int, int, float]]:
+    # Pairs of the images starting in rows [start, end) with later images;
+    # the block holds all faces of its images, so every pair is complete
+    rows = vectors[start:end]
+    row_images = image_index[start:end]
+    # Image pairs are encoded as first * stride + second
+    stride = int(image_index[-1]) + 1
+    pair_keys, similarities = [], []
+    for column in range(start, len(vectors), column_block):
+        similarity = rows @ vectors[column : column + column_block].T
+        column_images = image_index[column : column + column_block]
+        mask = similarity >= threshold
+        if column < end:
+            # Same-image faces and pairs seen from the other side
+            mask &= column_images[None, :] > row_images[:, None]
+        tile_rows, tile_columns = np.nonzero(mask)
+        if len(tile_rows) == 0:
+            continue
+        pair_keys.append(row_images[tile_rows] * stride + column_images[tile_columns])
+        similarities.append(similarity[tile_rows, tile_columns])
+    if not pair_keys:
+        return []
+
+    # Best face pair of every image pair
+    keys = np.concatenate(pair_keys)
+    values = np.concatenate(similarities)
+    order = np.argsort(keys, kind="stable")
+    keys, values = keys[order], values[order]
+    firsts = np.flatnonzero(np.diff(keys, prepend=-1))
+    best = np.maximum.reduceat(values, firsts)
+    first_images, second_images = np.divmod(keys[firsts], stride)
+    return list(
+        zip(first_images.tolist(), second_images.tolist(), best.astype(float).tolist())
+    )
+
+
+def similar_image_pairs(
+    embeddings: NDArray,
+    image_index: NDArray,
+    threshold: float,
+    limit: Optional[int] = None,
+    block_size: int = 512,
+    column_block: int = 4096,
+    workers: Optional[int] = None,
+) -> Iterator[Tuple[int, int, float]]:
+    """
+    Find all pairs of images with a pair of faces at least `threshold`
+    cosine-similar.
+
+    The normalized embeddings are compared one `block_size` x
+    `column_block` tile at a time with a matrix product and thresholded,
+    covering only the upper triangle. Row blocks run in parallel threads
+    and their pairs are yielded in order as they finish, so only a few
+    blocks' results are held at once.
+
+    Args:
+        embeddings: (N, D) face embeddings, grouped by image
+        image_index: (N,) non-decreasing image number of every face
+        threshold: Lowest cosine similarity of a matching face pair
+        limit: Stop after this many pairs, all if None
+        block_size: Face rows per block, rounded to whole images
+        column_block: Face columns per matrix product
+        workers: Threads, the number of CPUs if None
+
+    Yields:
+        (first image, second image, best similarity) with first < second,
+        ordered by first image then second
+    """
+    if len(embeddings) == 0 or limit == 0:
+        return
+    vectors = normalize_rows(np.asarray(embeddings, dtype=np.float32))
+    image_index = np.asarray(image_index, dtype=np.int64)
+    workers = workers or os.cpu_count() or 1
+
+    blocks = image_blocks(image_index, block_size)
+    pending: deque = deque()
+
+    def block_pairs(pool: ThreadPoolExecutor) -> Iterator[List]:
+        # Keeps 2 * workers blocks in flight, handing them out in order
+        for start, end in blocks:
+            pending.append(
+                pool.submit(
+                    _join_block,
+                    vectors,
+                    image_index,
+                    start,
+                    end,
+                    threshold,
+                    column_block,
+                )
+            )
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    count = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        try:
+            for pairs in block_pairs(pool):
+                for pair in pairs:
+                    yield pair
+                    count += 1
+                    if count == limit:
+                        return
+        finally:
+            for future in pending:
+                future.cancel()
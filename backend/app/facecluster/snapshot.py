@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+from numpy.typing import NDArray
+
+logger = logging.getLogger(__name__)
+
+# Bump when the snapshot layout changes, older snapshots are then rebuilt
+SNAPSHOT_VERSION = 2
+
+SNAPSHOT_ARRAYS = ("embeddings", "image_ids", "labels")
+PROJECTION_FILE = "projection.npy"
+META_FILE = "meta.json"
+
+
+def database_fingerprint(conn: sqlite3.Connection) -> str:
+    """
+    Checksum of the face and cluster assignment tables.
+
+    Faces are only ever inserted or deleted, so their count and id range
+    change with every write; assignments are also upserted in place, so
+    their labels are summed in as well.
+
+    Args:
+        conn: Connection to the database holding both tables
+
+    Returns:
+        str: Hex digest that changes whenever either table does
+    """
+    faces = conn.execute(
+        "SELECT COUNT(*), COALESCE(MAX(id), 0), TOTAL(id) FROM faces"
+    ).fetchone()
+    assignments = conn.execute(
+        """SELECT COUNT(*), COALESCE(MAX(seq), 0), TOTAL(seq * (label + 2))
+           FROM face_cluster_assignments"""
+    ).fetchone()
+    return hashlib.sha256(repr((faces, assignments)).encode()).hexdigest()
+
+
+def save_snapshot(
+    directory: Union[str, Path],
+    fingerprint: str,
+    embeddings: NDArray,
+    image_ids: List,
+    labels: NDArray,
+    projection: Optional[NDArray] = None,
+) -> None:
+    """
+    Write the face cluster state as `.npy` files.
+
+    The metadata file is removed first and written last, so an interrupted
+    write leaves a snapshot that is rejected as stale. Arrays are written to
+    temporary files and moved in place, so memory maps of the previous
+    snapshot keep reading its data.
+
+    Args:
+        directory: Snapshot directory, created if needed
+        fingerprint: `database_fingerprint` of the state being saved
+        embeddings: (N, D) face embeddings
+        image_ids: Image ID of every face
+        labels: Cluster label of every face
+        projection: (D, K) components of the projection the embeddings were
+            reduced with, if any
+
+    Raises:
+        ValueError: If the image IDs are not all integers or all strings,
+            e.g. None for a path without an ID, which `.npy` cannot hold
+            without pickling
+    """
+    ids = np.asarray(image_ids)
+    if len(ids) and ids.dtype.kind not in "iuU":
+        raise ValueError(f"Image IDs of type {ids.dtype} cannot be saved")
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    meta_path = directory / META_FILE
+    if meta_path.exists():
+        meta_path.unlink()
+
+    arrays = {
+        # float16 embeddings stay float16
+        "embeddings": np.ascontiguousarray(
+            embeddings,
+            dtype=np.float16 if embeddings.dtype == np.float16 else np.float32,
+        ),
+        "image_ids": ids,
+        "labels": np.asarray(labels, dtype=np.int64),
+    }
+    files = {f"{name}.npy": array for name, array in arrays.items()}
+    if projection is not None:
+        files[PROJECTION_FILE] = projection
+    for file_name, array in files.items():
+        tmp_path = directory / f"{file_name}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, array, allow_pickle=False)
+        os.replace(tmp_path, directory / file_name)
+
+    meta = {
+        "version": SNAPSHOT_VERSION,
+        "fingerprint": fingerprint,
+        "count": len(image_ids),
+        "dim": int(arrays["embeddings"].shape[1]) if len(image_ids) else 0,
+        "projection": projection is not None,
+    }
+    tmp_path = directory / f"{META_FILE}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, meta_path)
+    logger.info(f"Saved face cluster snapshot of {meta['count']} faces")
+
+
+def load_snapshot(
+    directory: Union[str, Path], fingerprint: str
+) -> Optional[Tuple[NDArray, List, NDArray, Optional[NDArray]]]:
+    """
+    Open a snapshot written by `save_snapshot`, memory-mapped.
+
+    Args:
+        directory: Snapshot directory
+        fingerprint: Current `database_fingerprint`
+
+    Returns:
+        Tuple of (embeddings, image_ids, labels, projection), with the
+        embeddings a read-only memory map and projection None if the
+        embeddings are not projected, or None if the snapshot is missing or
+        stale
+    """
+    directory = Path(directory)
+    try:
+        with open(directory / META_FILE) as f:
+            meta = json.load(f)
+        if meta.get("version") != SNAPSHOT_VERSION:
+            logger.info("Face cluster snapshot has an old version, rebuilding")
+            return None
+        if meta.get("fingerprint") != fingerprint:
+            logger.info("Face cluster snapshot is stale, rebuilding")
+            return None
+
+        arrays = {
+            name: np.load(directory / f"{name}.npy", mmap_mode="r")
+            for name in SNAPSHOT_ARRAYS
+        }
+        projection = (
+            np.load(directory / PROJECTION_FILE) if meta.get("projection") else None
+        )
+    except (OSError, ValueError) as e:
+        logger.info(f"No usable face cluster snapshot: {e}")
+        return None
+
+    if not all(len(array) == meta["count"] for array in arrays.values()):
+        logger.warning("Face cluster snapshot is inconsistent, rebuilding")
+        return None
+    return (
+        arrays["embeddings"],
+        arrays["image_ids"].tolist(),
+        arrays["labels"],
+        projection,
+    )
@@ -1,11 +1,23 @@
 from app.facecluster.init_face_cluster import get_face_cluster
+from functools import lru_cache
+import sqlite3
 import cv2
+import numpy as np
 import onnxruntime
-from app.config.settings import DEFAULT_FACE_DETECTION_MODEL, DEFAULT_FACENET_MODEL
+from app.config.settings import (
+    DATABASE_PATH,
+    DEFAULT_FACE_DETECTION_MODEL,
+    DEFAULT_FACENET_MODEL,
+)
 from app.utils.classification import get_classes
-from app.facenet.preprocess import normalize_embedding, preprocess_image
-from app.yolov8.YOLOv8 import YOLOv8
-from app.database.faces import insert_face_embeddings
+from app.facenet.preprocess import normalize_embeddings, preprocess_images
+from app.yolov8.YOLOv8 import get_detector
+from app.database.faces import insert_face_embeddings, insert_skipped_faces
+from app.facenet.quality import box_skip_reason, count_reasons, crop_skip_reason
+from app.utils.batching import get_batcher
+from app.utils.image_loader import NO_SCALE, crop_region, load_detection_image
+from app.utils.path_id_mapping import get_id_from_path
+from app.utils.quantization import resolve_model_path
 
 providers = (
     ["CUDAExecutionProvider", "CPUExecutionProvider"]
@@ -13,84 +25,173 @@ providers = (
     else ["CPUExecutionProvider"]
 )
 
-session = onnxruntime.InferenceSession(DEFAULT_FACENET_MODEL, providers=providers)
 
-input_tensor_name = session.get_inputs()[0].name
-output_tensor_name = session.get_outputs()[0].name
+@lru_cache(maxsize=None)
+def get_facenet_batcher():
+    """
+    Return the shared FaceNet batcher, loading the model on first use.
+
+    Face crops from concurrently ingested images share FaceNet runs.
+    """
+    return get_batcher(resolve_model_path(DEFAULT_FACENET_MODEL), providers=providers)
+
+
+# Faces narrower than the FaceNet input in a reduced-resolution decode are
+# cropped from the full-resolution image instead
+MIN_FACE_CROP_SIZE = 160
 
 
 def get_face_embedding(image):
-    result = session.run([output_tensor_name], {input_tensor_name: image})[0]
-    embedding = result[0]
-    return normalize_embedding(embedding)
+    return embed_face_batch(image)[0]
+
+
+def embed_face_batch(batch):
+    """
+    Run FaceNet once on a preprocessed (N, 3, 160, 160) batch.
+
+    Returns an (N, 512) array of unit-length embeddings.
+    """
+    result = get_facenet_batcher().run(batch)[0]
+    return normalize_embeddings(result)
+
+
+def get_face_embeddings(face_images):
+    """
+    Embed a list of BGR face crops with a single FaceNet run.
+    """
+    if not face_images:
+        return np.empty((0, 0), dtype=np.float32)
+    return embed_face_batch(preprocess_images(face_images))
 
 
-def extract_face_embeddings(img_path):
+def extract_face_embeddings(img_path, img=None, class_ids=None):
     # Return face embeddings from the image but do not add them to the db.
-    yolov8_detector = YOLOv8(
+    # `img` and `class_ids` let callers reuse an already decoded image and
+    # its object detection result.
+    yolov8_detector = get_detector(
         DEFAULT_FACE_DETECTION_MODEL, conf_thres=0.2, iou_thres=0.3
     )
 
-    img = cv2.imread(img_path)
+    if img is None:
+        img = cv2.imread(img_path)
     if img is None:
         print(f"Failed to load image: {img_path}")
         return None
 
     # If "person" `class_id` is not found in the image, return early
-    class_ids = get_classes(img_path)
+    if class_ids is None:
+        class_ids = get_classes(img_path, img=img)
     if not class_ids or "0" not in class_ids.split(","):
         print(f"No person detected in image: {img_path}")
         return "no_person"
 
     boxes, scores, class_ids = yolov8_detector(img)
 
-    embeddings = []
+    face_images = []
     for box, score in zip(boxes, scores):
         if score > 0.5:
             x1, y1, x2, y2 = map(int, box)
-            face_img = img[y1:y2, x1:x2]
-            processed_face = preprocess_image(face_img)
-            embedding = get_face_embedding(processed_face)
-            embeddings.append(embedding)
+            face_images.append(img[y1:y2, x1:x2])
+
+    return list(get_face_embeddings(face_images))
+
 
-    return embeddings
+def select_faces(img_path, img, scale, boxes, scores, full_image=None):
+    """
+    Crop the detected faces worth embedding, skipping those with a low
+    score, a small box or a blurred crop (see `app.facenet.quality`).
 
+    Small faces of a reduced-resolution `img` are cropped from the
+    full-resolution image, which `full_image` returns.
 
-def detect_faces(img_path):
-    yolov8_detector = YOLOv8(
+    Returns:
+        Tuple of (face crops, their boxes, their scores, skipped faces as
+        (box, score, reason) tuples)
+    """
+    full_img = None
+    face_images, face_boxes, face_scores, skipped = [], [], [], []
+    for box, score in zip(boxes, scores):
+        reason = box_skip_reason(box, score)
+        if reason is not None:
+            skipped.append((box, score, reason))
+            continue
+
+        padding = 20
+        source, source_scale = img, scale
+        x1, y1, x2, y2 = box
+        reduced_size = min((x2 - x1) / scale[0], (y2 - y1) / scale[1])
+        if scale != NO_SCALE and reduced_size < MIN_FACE_CROP_SIZE:
+            if full_img is None:
+                full_img = full_image() if full_image else cv2.imread(img_path)
+            if full_img is not None:
+                source, source_scale = full_img, NO_SCALE
+        face_image = crop_region(source, box, padding, source_scale)
+
+        reason = crop_skip_reason(face_image)
+        if reason is not None:
+            skipped.append((box, score, reason))
+            continue
+        face_images.append(face_image)
+        face_boxes.append(box)
+        face_scores.append(score)
+    return face_images, face_boxes, face_scores, skipped
+
+
+def detect_faces(img_path, img=None, scale=None, full_image=None):
+    # `img` may be a reduced-resolution decode with (x, y) factor `scale`;
+    # `full_image` returns the full-resolution image and is only called when
+    # a face is too small to crop from `img`
+    yolov8_detector = get_detector(
         DEFAULT_FACE_DETECTION_MODEL, conf_thres=0.35, iou_thres=0.45
     )
-    img = cv2.imread(img_path)
+    if img is None:
+        img, scale = load_detection_image(img_path)
     if img is None:
         print(f"Failed to load image: {img_path}")
         return None
+    scale = scale or NO_SCALE
 
-    boxes, scores, class_ids = yolov8_detector(img)
+    # Boxes are in original image coordinates
+    boxes, scores, class_ids = yolov8_detector(img, scale=scale)
+    face_images, face_boxes, face_scores, skipped = select_faces(
+        img_path, img, scale, boxes, scores, full_image
+    )
 
     processed_faces, embeddings = [], []
-    for box, score in zip(boxes, scores):
-        if score > 0.3:
-            x1, y1, x2, y2 = map(int, box)
-            face_img = img[y1:y2, x1:x2]
-            padding = 20
-            h, w = face_img.shape[:2]
-            face_img = img[
-                max(0, y1 - padding) : min(img.shape[0], y2 + padding),
-                max(0, x1 - padding) : min(img.shape[1], x2 + padding),
-            ]
-            processed_face = preprocess_image(face_img)
-            processed_faces.append(processed_face)
-            embedding = get_face_embedding(processed_face)
-            embeddings.append(embedding)
-
-    if embeddings:
-        insert_face_embeddings(img_path, embeddings)
-        clusters = get_face_cluster()
-        for embedding in embeddings:
-            clusters.add_face(embedding, img_path)
+    if face_images:
+        batch = preprocess_images(face_images)
+        processed_faces = [batch[i : i + 1] for i in range(len(batch))]
+        embeddings = list(embed_face_batch(batch))
+
+    if embeddings or skipped:
+        image_id = get_id_from_path(img_path)
+        if image_id is None:
+            raise ValueError(f"Image '{img_path}' not found in the database")
+
+        # The faces are committed before they join the clusters, so the
+        # clusters never hold faces the database lost to a failed write.
+        # The transaction is closed by then, so the cluster lock is never
+        # waited for while holding the database's.
+        conn = sqlite3.connect(DATABASE_PATH)
+        try:
+            if embeddings:
+                insert_face_embeddings(
+                    img_path, embeddings, face_boxes, face_scores, conn=conn
+                )
+            insert_skipped_faces(image_id, skipped, conn)
+            conn.commit()
+        finally:
+            conn.close()
+        if embeddings:
+            # Re-processing an image replaces its faces, in the cluster as in
+            # the faces table
+            get_face_cluster().add_faces(
+                embeddings, [image_id] * len(embeddings), replace=True
+            )
 
     return {
         "ids": f"{class_ids}",
         "processed_faces": processed_faces,
         "num_faces": len(embeddings),
+        "skipped_faces": count_reasons(skipped),
     }
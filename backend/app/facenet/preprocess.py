@@ -19,6 +19,21 @@ def preprocess_image(image):
     return image
 
 
+def preprocess_images(images):
+    """
+    Preprocess a list of face crops into a single FaceNet input batch.
+    - Same steps as `preprocess_image`, applied to every crop
+    - Returns a float32 array of shape (N, 3, 160, 160)
+    """
+    batch = np.empty((len(images), 3, 160, 160), dtype=np.float32)
+    for i, image in enumerate(images):
+        image = cv2.resize(image, (160, 160))
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        np.subtract(image.transpose((2, 0, 1)), 127.5, out=batch[i])
+    batch /= 128.0  # Normalize
+    return batch
+
+
 def normalize_embedding(embedding):
     """
     Normalize the embedding vector to unit length.
@@ -26,6 +41,13 @@ def normalize_embedding(embedding):
     return embedding / np.linalg.norm(embedding)
 
 
+def normalize_embeddings(embeddings):
+    """
+    Normalize every row of an (N, D) embedding matrix to unit length.
+    """
+    return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+
 def cosine_similarity(embedding1, embedding2):
     """
     Compute cosine similarity between two embedding vectors.
@@ -0,0 +1,65 @@
+from collections import Counter
+
+import cv2
+
+from app.config.settings import FACE_MIN_SCORE, FACE_MIN_SHARPNESS, FACE_MIN_SIZE
+
+# Reasons a detected face is not embedded
+SKIPPED_LOW_SCORE = "low_score"
+SKIPPED_TOO_SMALL = "too_small"
+SKIPPED_BLURRED = "blurred"
+
+# Side of the FaceNet input; larger crops are shrunk to it to measure sharpness
+SHARPNESS_SIZE = 160
+
+
+def sharpness(face_image):
+    """
+    Variance of the Laplacian of a face crop, low for blurred faces.
+
+    Crops larger than the FaceNet input are first shrunk to it, which is the
+    detail FaceNet gets to see; smaller crops are measured as they are, since
+    upscaling would make every small face look blurred.
+    """
+    gray = cv2.cvtColor(face_image, cv2.COLOR_BGR2GRAY)
+    height, width = gray.shape
+    if max(height, width) > SHARPNESS_SIZE:
+        factor = SHARPNESS_SIZE / max(height, width)
+        size = (max(1, round(width * factor)), max(1, round(height * factor)))
+        gray = cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+
+def box_skip_reason(box, score, min_score=FACE_MIN_SCORE, min_size=FACE_MIN_SIZE):
+    """
+    Reason to skip a detected face from its box alone, before it is cropped.
+
+    Args:
+        box: (x1, y1, x2, y2) in original image pixels
+        score: Detection score
+
+    Returns:
+        SKIPPED_LOW_SCORE, SKIPPED_TOO_SMALL, or None to keep the face
+    """
+    if score <= min_score:
+        return SKIPPED_LOW_SCORE
+    x1, y1, x2, y2 = box
+    if min(x2 - x1, y2 - y1) < min_size:
+        return SKIPPED_TOO_SMALL
+    return None
+
+
+def crop_skip_reason(face_image, min_sharpness=FACE_MIN_SHARPNESS):
+    """
+    Reason to skip a face from its crop: SKIPPED_BLURRED, or None to keep it.
+    """
+    if min_sharpness > 0 and (
+        face_image.size == 0 or sharpness(face_image) < min_sharpness
+    ):
+        return SKIPPED_BLURRED
+    return None
+
+
+def count_reasons(skipped):
+    """Number of skipped faces per reason, from (box, score, reason) tuples."""
+    return dict(Counter(reason for _, _, reason in skipped))
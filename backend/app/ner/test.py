@@ -1,15 +1,33 @@
+from functools import lru_cache
 import numpy as np
 import onnxruntime
 from transformers import AutoTokenizer, AutoConfig
 import cv2
 import time
 
+# change the paths if required
+NER_MODEL_PATH = r"""C:\Users\sanid\Downloads\gsoc_@pictopy\PictoPy\backend\app\models\bert-base-NER.onnx"""
+FACENET_MODEL_PATH = (
+    r"C:\Users\sanid\Downloads\gsoc_@pictopy\PictoPy\backend\app\models\facenet.onnx"
+)
+
+
+@lru_cache(maxsize=None)
+def get_ner_session():
+    # Created on first use, importing this module does not load any model
+    return onnxruntime.InferenceSession(NER_MODEL_PATH)
+
+
+@lru_cache(maxsize=None)
+def get_facenet_session():
+    return onnxruntime.InferenceSession(
+        FACENET_MODEL_PATH, providers=["CPUExecutionProvider"]
+    )
+
 
 # Run the ner_onnx.py to create the onnx model in the models folder
 def ner_marking(text1):
-    # change the path is required
-    model_path = r"""C:\Users\sanid\Downloads\gsoc_@pictopy\PictoPy\backend\app\models\bert-base-NER.onnx"""
-    session = onnxruntime.InferenceSession(model_path)
+    session = get_ner_session()
 
     tokenizer = AutoTokenizer.from_pretrained("dslim/bert-base-NER")
     config = AutoConfig.from_pretrained("dslim/bert-base-NER")
@@ -122,21 +140,14 @@ def preprocess_face_for_onnx(face_image):
     return preprocessed_face
 
 
-# change the path if required
-session = onnxruntime.InferenceSession(
-    r"C:\Users\sanid\Downloads\gsoc_@pictopy\PictoPy\backend\app\models\facenet.onnx",
-    providers=["CPUExecutionProvider"],
-)
-
-input_tensor_name = session.get_inputs()[0].name
-output_tensor_name = session.get_outputs()[0].name
-
-
 def normalize_embedding(embedding):
     return embedding / np.linalg.norm(embedding)
 
 
 def get_face_embeddings(image):
+    session = get_facenet_session()
+    input_tensor_name = session.get_inputs()[0].name
+    output_tensor_name = session.get_outputs()[0].name
     result = session.run([output_tensor_name], {input_tensor_name: image})[0]
     embedding = result[0]
     return normalize_embedding(embedding)
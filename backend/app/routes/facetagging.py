@@ -1,8 +1,13 @@
+import logging
+from typing import Optional
+
+import numpy as np
 from fastapi import APIRouter, Query, HTTPException, status
-from app.database.faces import get_all_face_embeddings
+from fastapi.responses import StreamingResponse
+from app.database.faces import get_all_face_embeddings, get_face_embeddings
 from app.database.images import get_path_from_id
 from app.facecluster.init_face_cluster import get_face_cluster
-from app.facenet.preprocess import cosine_similarity
+from app.facecluster.similarity_join import similar_image_pairs
 from app.utils.path_id_mapping import get_id_from_path
 from app.utils.wrappers import exception_handler_wrapper
 from app.schemas.facetagging import (
@@ -11,8 +16,16 @@ from app.schemas.facetagging import (
     FaceMatchingResponse,
     FaceClustersResponse,
     GetRelatedImagesResponse,
+    RelatedImage,
+    ClusterCentroid,
+    ClusterCentroidsResponse,
+    ClusterSnapshotInfo,
+    IdentifiedFace,
+    IdentifyFacesResponse,
 )
 
+logger = logging.getLogger(__name__)
+
 webcam_locks = {}
 
 router = APIRouter()
@@ -20,45 +33,33 @@ router = APIRouter()
 
 @router.get(
     "/match",
-    response_model=FaceMatchingResponse,
-    responses={code: {"model": ErrorResponse} for code in [500]},
+    # Streamed, so the model only documents the body
+    responses={
+        200: {"model": FaceMatchingResponse},
+        500: {"model": ErrorResponse},
+    },
 )
 @exception_handler_wrapper
-def face_matching():
+def face_matching(
+    threshold: float = Query(
+        0.7, ge=-1, le=1, description="lowest cosine similarity of matching faces"
+    ),
+    limit: Optional[int] = Query(
+        None, ge=1, description="maximum number of image pairs returned"
+    ),
+):
     try:
         all_embeddings = get_all_face_embeddings()
-        similar_pairs = []
-
-        for i, img1_data in enumerate(all_embeddings):
-            for j, img2_data in enumerate(all_embeddings):
-                if i >= j:
-                    continue
-
-                for embedding1 in img1_data["embeddings"]:
-                    for embedding2 in img2_data["embeddings"]:
-                        similarity = cosine_similarity(embedding1, embedding2)
-
-                        if similarity >= 0.7:
-                            img1_data["image_path"].split("/")[-1]
-                            img2_data["image_path"].split("/")[-1]
-                            similar_pairs.append(
-                                SimilarPair(
-                                    image1=img1_data["image_path"].split("/")[-1],
-                                    image2=img2_data["image_path"].split("/")[-1],
-                                    similarity=float(similarity),
-                                )
-                            )
-                            break
-                    else:
-                        continue
-                    break
-
-        return FaceMatchingResponse(
-            success=True,
-            message="Successfully matched face embeddings",
-            similar_pairs=similar_pairs,
+        image_names = [
+            img_data["image_path"].split("/")[-1] for img_data in all_embeddings
+        ]
+        counts = [len(img_data["embeddings"]) for img_data in all_embeddings]
+        embeddings = (
+            np.stack([e for img_data in all_embeddings for e in img_data["embeddings"]])
+            if all_embeddings
+            else np.empty((0, 0), dtype=np.float32)
         )
-
+        image_index = np.repeat(np.arange(len(all_embeddings)), counts)
     except Exception:
 
         raise HTTPException(
@@ -70,6 +71,57 @@ def face_matching():
             ),
         )
 
+    def pair_chunks():
+        # JSON of the pairs, 1000 at a time
+        chunk = []
+        pairs = similar_image_pairs(embeddings, image_index, threshold, limit)
+        for image1, image2, similarity in pairs:
+            pair = SimilarPair(
+                image1=image_names[image1],
+                image2=image_names[image2],
+                similarity=similarity,
+            )
+            chunk.append(pair.model_dump_json())
+            if len(chunk) == 1000:
+                yield ",".join(chunk)
+                chunk = []
+        if chunk:
+            yield ",".join(chunk)
+
+    chunks = pair_chunks()
+    try:
+        # Found before answering, so a join that fails from the start still
+        # gets a 500
+        first = next(chunks, None)
+    except Exception:
+
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=ErrorResponse(
+                success=False,
+                error="Internal server error",
+                message="Unable to match face embeddings",
+            ),
+        )
+
+    def stream_pairs():
+        # Same fields as FaceMatchingResponse, the pairs written as they are
+        # found; a later failure still ends the document, with success false
+        yield '{"similar_pairs":['
+        if first is not None:
+            yield first
+        try:
+            for chunk in chunks:
+                yield "," + chunk
+        except Exception:
+            logger.exception("Face matching failed while streaming")
+            yield '],"success":false,"error":"Internal server error",'
+            yield '"message":"Unable to match face embeddings"}'
+            return
+        yield '],"success":true,"message":"Successfully matched face embeddings"}'
+
+    return StreamingResponse(stream_pairs(), media_type="application/json")
+
 
 @router.get(
     "/clusters",
@@ -79,8 +131,9 @@ def face_matching():
 @exception_handler_wrapper
 def face_clusters():
     try:
-        cluster = get_face_cluster()
-        raw_clusters = cluster.get_clusters()
+        # Clusters and their version come from the same published snapshot
+        view = get_face_cluster().view
+        raw_clusters = view.clusters()
 
         # Convert image IDs to paths
 
@@ -93,6 +146,12 @@ def face_clusters():
             success=True,
             message="Successfully retrieved face clusters",
             clusters=formatted_clusters,
+            snapshot=ClusterSnapshotInfo(
+                version=view.version,
+                age_seconds=view.age(),
+                dirty_faces=view.dirty_faces,
+                reclustered_at=view.reclustered_at,
+            ),
         )
 
     except Exception:
@@ -113,17 +172,31 @@ def face_clusters():
     responses={code: {"model": ErrorResponse} for code in [500]},
 )
 @exception_handler_wrapper
-def get_related_images(path: str = Query(..., description="full path to the image")):
+def get_related_images(
+    path: str = Query(..., description="full path to the image"),
+    limit: Optional[int] = Query(
+        None, ge=1, description="maximum number of images returned"
+    ),
+    min_similarity: Optional[float] = Query(
+        None,
+        ge=-1,
+        le=1,
+        description="lowest cosine similarity between faces of related images",
+    ),
+):
     try:
         cluster = get_face_cluster()
         image_id = get_id_from_path(path)
-        related_image_ids = cluster.get_related_images(image_id)
-        related_image_paths = [get_path_from_id(id) for id in related_image_ids]
+        related = cluster.get_related_images(image_id, limit, min_similarity)
+        related_images = [
+            RelatedImage(path=get_path_from_id(id), similarity=similarity)
+            for id, similarity in related
+        ]
 
         return GetRelatedImagesResponse(
             success=True,
             message=f"Successfully retrieved related images for {path}",
-            data={"related_images": related_image_paths},  # Wrapped inside "data"
+            data={"related_images": related_images},  # Wrapped inside "data"
         )
     except Exception:
 
@@ -135,3 +208,82 @@ def get_related_images(path: str = Query(..., description="full path to the imag
                 message="Uanble to get related images",
             ).model_dump(),
         )
+
+
+@router.get(
+    "/cluster-centroids",
+    response_model=ClusterCentroidsResponse,
+    responses={code: {"model": ErrorResponse} for code in [500]},
+)
+@exception_handler_wrapper
+def cluster_centroids():
+    try:
+        cluster = get_face_cluster()
+        centroids = [
+            ClusterCentroid(cluster_id=label, count=count, centroid=centroid.tolist())
+            for label, (centroid, count) in sorted(cluster.get_centroids().items())
+        ]
+
+        return ClusterCentroidsResponse(
+            success=True,
+            message="Successfully retrieved cluster centroids",
+            centroids=centroids,
+        )
+    except Exception:
+
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=ErrorResponse(
+                success=False,
+                error="Internal server error",
+                message="Unable to get cluster centroids",
+            ).model_dump(),
+        )
+
+
+@router.get(
+    "/identify",
+    response_model=IdentifyFacesResponse,
+    responses={code: {"model": ErrorResponse} for code in [404, 500]},
+)
+@exception_handler_wrapper
+def identify_faces(path: str = Query(..., description="full path to the image")):
+    embeddings = get_face_embeddings(path)
+    if embeddings is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=ErrorResponse(
+                success=False,
+                error="Image not found",
+                message=f"No faces found for {path}",
+            ).model_dump(),
+        )
+
+    try:
+        cluster = get_face_cluster()
+        faces = []
+        for face_index, embedding in enumerate(embeddings):
+            match = cluster.identify(embedding)
+            faces.append(
+                IdentifiedFace(
+                    face_index=face_index,
+                    cluster_id=match[0] if match else None,
+                    distance=match[1] if match else None,
+                )
+            )
+
+        return IdentifyFacesResponse(
+            success=True,
+            message=f"Successfully identified faces in {path}",
+            faces=faces,
+        )
+    except Exception:
+
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=ErrorResponse(
+                success=False,
+                error="Internal server error",
+                message="Unable to identify faces",
+            ).model_dump(),
+        )
@@ -6,8 +6,7 @@ from fastapi.responses import JSONResponse
 
 from app.config.settings import IMAGES_PATH
 
-from app.facenet.facenet import detect_faces
-from app.utils.classification import get_classes
+from app.utils.image_analysis import analyze_image
 from app.utils.wrappers import exception_handler_wrapper
 from app.utils.generateThumbnails import (
     generate_thumbnails_for_folders,
@@ -17,13 +16,11 @@ from app.config.settings import THUMBNAIL_IMAGES_PATH
 from app.database.images import (
     get_all_image_ids_from_db,
     get_path_from_id,
-    insert_image_db,
     delete_image_db,
     get_objects_db,
     get_all_image_paths,
     get_all_images_from_folder_id,
 )
-from app.utils.metadata import extract_metadata
 from app.database.folders import (
     insert_folder,
     get_folder_id_from_path,
@@ -56,12 +53,7 @@ progress_status = {}
 
 async def run_get_classes(img_path, folder_id=None):
     loop = asyncio.get_event_loop()
-    result = await loop.run_in_executor(None, get_classes, img_path)
-    insert_image_db(img_path, result, extract_metadata(img_path), folder_id)
-    if result:
-        classes = result.split(",")
-        if "0" in classes and classes.count("0") < 8:
-            detect_faces(img_path)
+    await loop.run_in_executor(None, analyze_image, img_path, folder_id)
 
 
 @router.get(
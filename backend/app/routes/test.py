@@ -4,7 +4,7 @@ import shutil
 import asyncio
 from fastapi import APIRouter, status, HTTPException
 from app.config.settings import DEFAULT_FACE_DETECTION_MODEL, IMAGES_PATH
-from app.yolov8 import YOLOv8
+from app.yolov8.YOLOv8 import get_detector
 from app.yolov8.utils import class_names
 from app.utils.classification import get_classes
 from app.utils.wrappers import exception_handler_wrapper
@@ -38,7 +38,7 @@ async def run_get_classes(img_path):
 async def test_route(payload: TestRouteRequest):
     try:
         model_path = DEFAULT_FACE_DETECTION_MODEL
-        yolov8_detector = YOLOv8(model_path, conf_thres=0.2, iou_thres=0.3)
+        yolov8_detector = get_detector(model_path, conf_thres=0.2, iou_thres=0.3)
 
         img_path = payload.path
         img = cv2.imread(img_path)
@@ -2,14 +2,10 @@ from apscheduler.schedulers.background import BackgroundScheduler
 import time
 import os
 import asyncio
-from PIL import Image
-from app.utils.classification import get_classes
+from app.utils.image_analysis import analyze_image
 from app.routes.images import get_all_image_paths, delete_image_db
 from app.database.folders import get_all_folders, get_folder_id_from_path
 from app.config.settings import THUMBNAIL_IMAGES_PATH
-from app.facenet.facenet import detect_faces
-from app.database.images import insert_image_db
-from app.utils.metadata import extract_metadata
 from app.database.folders import delete_folder
 
 
@@ -18,13 +14,9 @@ async def process_images(tasks):
 
 
 async def run_get_classes(img_path, folder_id=None):
+    # Thumbnail creation happens inside `analyze_image`, from the same decode
     loop = asyncio.get_event_loop()
-    result = await loop.run_in_executor(None, get_classes, img_path)
-    insert_image_db(img_path, result, extract_metadata(img_path), folder_id)
-    if result:
-        classes = result.split(",")
-        if "0" in classes and classes.count("0") < 8:
-            detect_faces(img_path)
+    await loop.run_in_executor(None, analyze_image, img_path, folder_id)
 
 
 async def my_scheduled_task():
@@ -59,17 +51,11 @@ async def my_scheduled_task():
 
         for file_path in need_to_add_files:
             folder_path = os.path.dirname(file_path)
-            file_name = os.path.basename(file_path)
             file_extension = str(file_path).split(".").pop()
 
             if file_extension not in image_extensions:  # Checking Image or not
                 continue
 
-            thumbnail_path = f"{THUMBNAIL_IMAGES_PATH}/PictoPy.thumbnails/{file_name}"
-            img = Image.open(file_path)
-            img.thumbnail((400, 400))
-            img.save(thumbnail_path)
-
             folder_id = file_dict[folder_path]
             if file_extension in image_extensions:
                 tasks.append(
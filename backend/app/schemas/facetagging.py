@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 
 # Response Model
@@ -15,16 +15,53 @@ class FaceMatchingResponse(BaseModel):
     similar_pairs: List[SimilarPair]
 
 
+class ClusterSnapshotInfo(BaseModel):
+    version: int
+    age_seconds: float
+    dirty_faces: int
+    reclustered_at: Optional[float]
+
+
 class FaceClustersResponse(BaseModel):
     success: bool
     message: str
     clusters: Dict[int, List[str]]
+    snapshot: ClusterSnapshotInfo
+
+
+class RelatedImage(BaseModel):
+    path: str
+    similarity: float
 
 
 class GetRelatedImagesResponse(BaseModel):
     success: bool
     message: str
-    data: Dict[str, List[str]]
+    data: Dict[str, List[RelatedImage]]
+
+
+class ClusterCentroid(BaseModel):
+    cluster_id: int
+    count: int
+    centroid: List[float]
+
+
+class ClusterCentroidsResponse(BaseModel):
+    success: bool
+    message: str
+    centroids: List[ClusterCentroid]
+
+
+class IdentifiedFace(BaseModel):
+    face_index: int
+    cluster_id: Optional[int]
+    distance: Optional[float]
+
+
+class IdentifyFacesResponse(BaseModel):
+    success: bool
+    message: str
+    faces: List[IdentifiedFace]
 
 
 class ErrorResponse(BaseModel):
@@ -0,0 +1,10 @@
+"""
+Start time of the server process, for the startup timings.
+
+main.py imports this module before anything else, so the recorded time
+precedes the loading of every other module.
+"""
+
+import time
+
+STARTUP_START = time.perf_counter()
@@ -0,0 +1,183 @@
+from concurrent.futures import Future
+import logging
+import queue
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.config.settings import INFERENCE_BATCH_SIZE, INFERENCE_BATCH_WAIT_MS
+from app.utils.onnx_manager import get_session
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceBatcher:
+    """
+    Dynamic micro-batching front end for a single-input ONNX runtime session.
+
+    Concurrent callers submit tensors with a leading batch dimension. A worker
+    thread collects requests until `max_batch_size` items are queued or
+    `max_wait_ms` has passed since the first one arrived, concatenates them
+    along the batch axis, runs the session once and hands every caller its
+    own slice of each output.
+
+    Only models with a dynamic batch dimension, or a fixed one above 1, gain
+    from this. Models exported with a batch size of 1 are run in the caller's
+    thread instead, so concurrent callers are not serialized behind one
+    worker.
+
+    Attributes:
+        session: ONNX runtime session used for inference
+        max_batch_size: Maximum number of items merged into one run
+        max_wait_ms: Maximum time the first queued request waits for company
+        input_name: Name of the model input
+        output_names: Names of the model outputs
+        static_batch: Fixed batch size of the model, or None if it is dynamic
+    """
+
+    def __init__(
+        self,
+        session,
+        max_batch_size: int = INFERENCE_BATCH_SIZE,
+        max_wait_ms: float = INFERENCE_BATCH_WAIT_MS,
+        name: Optional[str] = None,
+    ) -> None:
+        self.session = session
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_ms = max(0.0, float(max_wait_ms))
+        self.name = name or "inference-batcher"
+
+        model_input = session.get_inputs()[0]
+        self.input_name = model_input.name
+        batch_dim = model_input.shape[0] if model_input.shape else None
+        self.static_batch = batch_dim if isinstance(batch_dim, int) else None
+        self.output_names = [output.name for output in session.get_outputs()]
+
+        self._queue: "queue.Queue[Tuple[np.ndarray, Future]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+
+    def submit(self, input_tensor: np.ndarray) -> Future:
+        """
+        Queue a tensor of shape (n, ...) for batched inference.
+
+        Args:
+            input_tensor: Input with a leading batch dimension
+
+        Returns:
+            Future resolving to the list of outputs for this tensor only
+        """
+        future: Future = Future()
+        if self.max_batch_size == 1 or self.static_batch == 1:
+            # Batching disabled or useless, run in the caller's thread
+            try:
+                future.set_result(self._run(input_tensor))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        self._ensure_worker()
+        self._queue.put((input_tensor, future))
+        return future
+
+    def run(self, input_tensor: np.ndarray) -> List[np.ndarray]:
+        """Submit a tensor and block until its outputs are ready."""
+        return self.submit(input_tensor).result()
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None:
+            return
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._serve, name=self.name, daemon=True
+                )
+                self._worker.start()
+
+    def _collect(self) -> List[Tuple[np.ndarray, Future]]:
+        requests = [self._queue.get()]
+        count = len(requests[0][0])
+        deadline = time.perf_counter() + self.max_wait_ms / 1000
+
+        while count < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            requests.append(request)
+            count += len(request[0])
+
+        return requests
+
+    def _serve(self) -> None:
+        while True:
+            requests = self._collect()
+            futures = [future for _, future in requests]
+            try:
+                sizes = [len(tensor) for tensor, _ in requests]
+                batch = (
+                    requests[0][0]
+                    if len(requests) == 1
+                    else np.concatenate([tensor for tensor, _ in requests], axis=0)
+                )
+                outputs = self._run(batch)
+
+                offset = 0
+                for size, future in zip(sizes, futures):
+                    future.set_result(
+                        [output[offset : offset + size] for output in outputs]
+                    )
+                    offset += size
+            except Exception as e:
+                logger.error(f"Batched inference failed in {self.name}: {str(e)}")
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _run(self, batch: np.ndarray) -> List[np.ndarray]:
+        if self.static_batch is None or len(batch) == self.static_batch:
+            return self.session.run(self.output_names, {self.input_name: batch})
+
+        # Models exported with a fixed batch size are fed fixed-size chunks,
+        # zero-padding the last one
+        chunks = []
+        for start in range(0, len(batch), self.static_batch):
+            chunk = batch[start : start + self.static_batch]
+            valid = len(chunk)
+            if valid < self.static_batch:
+                padding = np.zeros(
+                    (self.static_batch - valid,) + chunk.shape[1:], dtype=chunk.dtype
+                )
+                chunk = np.concatenate([chunk, padding], axis=0)
+            outputs = self.session.run(self.output_names, {self.input_name: chunk})
+            chunks.append([output[:valid] for output in outputs])
+
+        if len(chunks) == 1:
+            return chunks[0]
+        return [np.concatenate(parts, axis=0) for parts in zip(*chunks)]
+
+
+_batchers: Dict[tuple, InferenceBatcher] = {}
+_batchers_lock = threading.Lock()
+
+
+def get_batcher(model_path: str, providers=None) -> InferenceBatcher:
+    """
+    Return the shared batcher for a model, creating it on first use.
+
+    Every detector or embedder using the same model shares one batcher, so
+    their requests are merged into the same batches.
+    """
+    key = (model_path, tuple(providers) if providers else None)
+    session = get_session(model_path, providers)
+    with _batchers_lock:
+        batcher = _batchers.get(key)
+        if batcher is None:
+            batcher = InferenceBatcher(session, name=model_path)
+            _batchers[key] = batcher
+        return batcher
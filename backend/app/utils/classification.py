@@ -1,16 +1,21 @@
-import cv2
 from app.config.settings import DEFAULT_OBJ_DETECTION_MODEL
-from app.yolov8.YOLOv8 import YOLOv8
+from app.utils.image_loader import load_detection_image
+from app.yolov8.YOLOv8 import get_detector
 
 
-def get_classes(img_path):
-    yolov8_detector = YOLOv8(DEFAULT_OBJ_DETECTION_MODEL, conf_thres=0.4, iou_thres=0.5)
-    img = cv2.imread(img_path)
+def get_classes(img_path, img=None, scale=None):
+    # `img` lets callers that already decoded the image skip reading it again;
+    # `scale` is its (x, y) factor when it was decoded at reduced resolution
+    yolov8_detector = get_detector(
+        DEFAULT_OBJ_DETECTION_MODEL, conf_thres=0.4, iou_thres=0.5
+    )
+    if img is None:
+        img, scale = load_detection_image(img_path)
     if img is None:
         print(f"Failed to load image: {img_path}")
         return None
 
-    _, _, class_ids = yolov8_detector(img)
+    _, _, class_ids = yolov8_detector(img, scale=scale)
     id_str = [str(x) for x in class_ids]
     id_str = ",".join(id_str)
     print(id_str, flush=True)
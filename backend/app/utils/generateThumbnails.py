@@ -1,8 +1,8 @@
 import os
-from PIL import Image
 from app.database.folders import get_all_folder_ids
 from app.database.images import get_all_images_from_folder_id
 from app.config.settings import THUMBNAIL_IMAGES_PATH
+from app.utils.image_analysis import ImageAnalysis
 
 
 def generate_thumbnails_for_folders(folder_paths: list):
@@ -42,9 +42,7 @@ def generate_thumbnails_for_folders(folder_paths: list):
                             continue
 
                         # Generate the thumbnail
-                        img = Image.open(file_path)
-                        img.thumbnail((400, 400))
-                        img.save(thumbnail_path)
+                        ImageAnalysis(file_path).save_thumbnail(thumbnail_path)
                     except Exception as e:
                         failed_paths.append(
                             {
@@ -76,9 +74,7 @@ def generate_thumbnails_for_existing_folders():
                     if os.path.exists(thumbnail_path):
                         continue
 
-                    img = Image.open(image_path)
-                    img.thumbnail((400, 400))
-                    img.save(thumbnail_path)
+                    ImageAnalysis(image_path).save_thumbnail(thumbnail_path)
             except Exception:
                 failed_paths.append(image_path)
 
@@ -0,0 +1,142 @@
+import io
+import os
+import cv2
+import numpy as np
+from PIL import Image, ImageOps
+
+from app.config.settings import THUMBNAIL_IMAGES_PATH
+from app.database.images import insert_image_db
+from app.facenet.facenet import detect_faces
+from app.utils.classification import get_classes
+from app.utils.image_loader import NO_SCALE, decode_for_detection
+from app.utils.metadata import extract_metadata
+
+THUMBNAIL_SIZE = (400, 400)
+
+
+class ImageAnalysis:
+    """
+    Decode-once view of an image shared by every ingestion stage.
+
+    The file is read once. Object detection, face detection and embedding
+    share one decoded pixel buffer, and EXIF parsing and thumbnail creation
+    work from the same bytes, instead of opening the file themselves. Large
+    JPEGs are decoded at reduced resolution for detection; the
+    full-resolution image is only decoded when something needs it.
+
+    Attributes:
+        img_path: Path to the image file
+    """
+
+    def __init__(self, img_path):
+        self.img_path = img_path
+        self._data = None
+        self._image = None
+        self._detection_image = None
+        self._classes = None
+
+    @property
+    def data(self):
+        """Raw file contents, read on first access."""
+        if self._data is None:
+            with open(self.img_path, "rb") as f:
+                self._data = f.read()
+        return self._data
+
+    @property
+    def image(self):
+        """BGR pixel buffer, decoded on first access (None if undecodable)."""
+        if self._image is None:
+            self._image = self._decode()
+        return self._image
+
+    @property
+    def detection_image(self):
+        """
+        (image, scale) used for detection, where scale is the (x, y) factor
+        mapping its pixels back to the original image. Large JPEGs are
+        decoded at the lowest resolution still covering the model input,
+        anything else is the full-resolution image.
+        """
+        if self._detection_image is None:
+            try:
+                image, scale = decode_for_detection(self.data)
+            except OSError:
+                image, scale = None, NO_SCALE
+            if image is None:
+                image = self.image
+            self._detection_image = (image, scale)
+        return self._detection_image
+
+    def _decode(self):
+        try:
+            buffer = np.frombuffer(self.data, dtype=np.uint8)
+        except OSError:
+            return None
+
+        image = cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+        if image is not None:
+            return image
+
+        # OpenCV cannot decode some formats (e.g. GIF), fall back to Pillow
+        try:
+            with Image.open(io.BytesIO(self.data)) as pil_image:
+                rgb = ImageOps.exif_transpose(pil_image).convert("RGB")
+                return cv2.cvtColor(np.asarray(rgb), cv2.COLOR_RGB2BGR)
+        except Exception:
+            return None
+
+    def metadata(self):
+        return extract_metadata(self.img_path, image_data=self.data)
+
+    def classes(self):
+        if self._classes is None:
+            image, scale = self.detection_image
+            self._classes = get_classes(self.img_path, img=image, scale=scale)
+        return self._classes
+
+    def faces(self):
+        image, scale = self.detection_image
+        return detect_faces(
+            self.img_path, img=image, scale=scale, full_image=lambda: self.image
+        )
+
+    def save_thumbnail(self, thumbnail_path, size=THUMBNAIL_SIZE):
+        """
+        Save a thumbnail fitting inside `size`, made by Pillow from the bytes
+        already read. Like the thumbnails made before, it is neither rotated
+        by its EXIF orientation nor stripped of its alpha channel. Pillow
+        decodes JPEGs at reduced resolution for it by itself.
+        """
+        with Image.open(io.BytesIO(self.data)) as image:
+            image.thumbnail(size)
+            image.save(thumbnail_path)
+
+
+def thumbnail_path_for(img_path):
+    return os.path.join(
+        THUMBNAIL_IMAGES_PATH, "PictoPy.thumbnails", os.path.basename(img_path)
+    )
+
+
+def analyze_image(img_path, folder_id=None):
+    """
+    Ingest one image: detect objects, store it with its metadata, create its
+    thumbnail and detect faces, decoding the file only once.
+    """
+    analysis = ImageAnalysis(img_path)
+    result = analysis.classes()
+    insert_image_db(img_path, result, analysis.metadata(), folder_id)
+
+    thumbnail_path = thumbnail_path_for(img_path)
+    if analysis.detection_image[0] is not None and not os.path.exists(thumbnail_path):
+        try:
+            analysis.save_thumbnail(thumbnail_path)
+        except Exception as e:
+            print(f"Failed to create thumbnail for {img_path}: {e}")
+
+    if result:
+        classes = result.split(",")
+        if "0" in classes and classes.count("0") < 8:
+            analysis.faces()
+    return result
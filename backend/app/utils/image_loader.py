@@ -0,0 +1,131 @@
+import io
+import math
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# YOLOv8 input size, the smallest resolution worth decoding for detection
+DETECTION_INPUT_SIZE = (640, 640)
+
+# Scale factor (x, y) of an image decoded at full resolution
+NO_SCALE = (1.0, 1.0)
+
+# JPEG DCT scaling, largest scale-down first
+REDUCED_DECODE_FLAGS = {
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+}
+
+JPEG_MAGIC = b"\xff\xd8\xff"
+
+
+def reduced_decode_factor(width, height, min_size=DETECTION_INPUT_SIZE):
+    """
+    Pick the largest JPEG scale-down whose output still covers `min_size`.
+
+    The shortest side is compared with the largest model dimension, so the
+    choice does not depend on EXIF orientation.
+
+    Args:
+        width: Width of the encoded image
+        height: Height of the encoded image
+        min_size: (width, height) the decoded image must cover
+
+    Returns:
+        8, 4 or 2, or 1 if the image cannot be reduced
+    """
+    shortest_side = min(width, height)
+    for factor in REDUCED_DECODE_FLAGS:
+        if math.ceil(shortest_side / factor) >= max(min_size):
+            return factor
+    return 1
+
+
+def decode_for_detection(data, min_size=DETECTION_INPUT_SIZE):
+    """
+    Decode JPEG bytes at the lowest resolution that still covers `min_size`.
+
+    Args:
+        data: Encoded image bytes
+        min_size: (width, height) the decoded image must cover
+
+    Returns:
+        Tuple of (image, scale) where scale is the (x, y) factor mapping
+        decoded pixel coordinates back to the original image. The image is
+        None when the data is not a JPEG large enough to benefit, in which
+        case the caller should decode it at full resolution.
+    """
+    if not data.startswith(JPEG_MAGIC):
+        return None, NO_SCALE
+
+    # Only the header is parsed here
+    try:
+        with Image.open(io.BytesIO(data)) as header:
+            width, height = header.size
+    except Exception:
+        return None, NO_SCALE
+
+    factor = reduced_decode_factor(width, height, min_size)
+    if factor == 1:
+        return None, NO_SCALE
+
+    image = cv2.imdecode(
+        np.frombuffer(data, dtype=np.uint8), REDUCED_DECODE_FLAGS[factor]
+    )
+    if image is None:
+        return None, NO_SCALE
+
+    decoded_height, decoded_width = image.shape[:2]
+    if math.ceil(width / factor) != decoded_width:
+        # OpenCV applied an EXIF rotation that swapped the axes
+        width, height = height, width
+    return image, (width / decoded_width, height / decoded_height)
+
+
+def load_detection_image(img_path, min_size=DETECTION_INPUT_SIZE):
+    """
+    Read an image for object or face detection, decoding large JPEGs at
+    reduced resolution.
+
+    Returns:
+        Tuple of (image, scale) as in `decode_for_detection`; the image is
+        None if the file cannot be read
+    """
+    try:
+        with open(img_path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None, NO_SCALE
+
+    image, scale = decode_for_detection(data, min_size)
+    if image is None:
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    return image, scale
+
+
+def crop_region(image, box, padding=0, scale=NO_SCALE):
+    """
+    Crop a box given in original image coordinates from a possibly reduced
+    image.
+
+    Args:
+        image: Image the box is cropped from
+        box: (x1, y1, x2, y2) in original image coordinates
+        padding: Margin added around the box, in original pixels
+        scale: (x, y) factor of `image` as returned by `decode_for_detection`
+
+    Returns:
+        View of the cropped region, clipped to the image
+    """
+    scale_x, scale_y = scale
+    x1, y1, x2, y2 = map(int, box)
+    return image[
+        max(0, int((y1 - padding) / scale_y)) : min(
+            image.shape[0], int((y2 + padding) / scale_y)
+        ),
+        max(0, int((x1 - padding) / scale_x)) : min(
+            image.shape[1], int((x2 + padding) / scale_x)
+        ),
+    ]
@@ -1,3 +1,4 @@
+import io
 import os
 from PIL import Image, UnidentifiedImageError
 from PIL.ExifTags import TAGS
@@ -5,15 +6,17 @@ from datetime import datetime
 from PIL.TiffImagePlugin import IFDRational
 
 
-def extract_metadata(image_path):
+def extract_metadata(image_path, image_data=None):
+    # `image_data` holds the file contents when the caller already read them
     metadata = {}
 
     # Check if file exists
     if not os.path.exists(image_path):
         raise FileNotFoundError(f"File not found: {image_path}")
 
+    source = io.BytesIO(image_data) if image_data is not None else image_path
     try:
-        with Image.open(image_path) as image:
+        with Image.open(source) as image:
             try:
                 # Basic image info
                 info_dict = {
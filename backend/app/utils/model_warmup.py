@@ -0,0 +1,89 @@
+import logging
+import threading
+import time
+
+import numpy as np
+
+from app.config.settings import (
+    DEFAULT_FACE_DETECTION_MODEL,
+    DEFAULT_OBJ_DETECTION_MODEL,
+)
+from app.facenet.facenet import get_facenet_batcher
+from app.utils.onnx_manager import get_session_stats
+from app.yolov8.YOLOv8 import get_detector
+
+logger = logging.getLogger(__name__)
+
+# Warm-up states: "not_started", "running", "done", "failed" or "disabled"
+_status = {"warmup": "not_started", "error": None}
+_timings_ms = {}
+_lock = threading.Lock()
+
+
+def record_timing(name, start):
+    """
+    Record the milliseconds elapsed since `start` (a `time.perf_counter()`
+    value) under `name`, reported by `readiness`.
+    """
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    with _lock:
+        _timings_ms[name] = round(elapsed_ms, 2)
+    logger.info(f"Startup timing {name}: {elapsed_ms:.2f}ms")
+    return elapsed_ms
+
+
+def set_warmup_status(status, error=None):
+    with _lock:
+        _status["warmup"] = status
+        _status["error"] = error
+
+
+def warm_up_models():
+    """
+    Load the detection and FaceNet models and run one dummy inference on each,
+    so the first ingested image does not pay for model loading.
+    """
+    set_warmup_status("running")
+    start = time.perf_counter()
+    try:
+        # Same thresholds as the ingestion pipeline, so the cached detectors
+        # are the ones it uses
+        blank = np.zeros((640, 640, 3), dtype=np.uint8)
+        get_detector(DEFAULT_OBJ_DETECTION_MODEL, conf_thres=0.4, iou_thres=0.5)(blank)
+        get_detector(DEFAULT_FACE_DETECTION_MODEL, conf_thres=0.35, iou_thres=0.45)(
+            blank
+        )
+        get_facenet_batcher().run(np.zeros((1, 3, 160, 160), dtype=np.float32))
+    except Exception as e:
+        logger.error(f"Model warm-up failed: {str(e)}")
+        set_warmup_status("failed", str(e))
+    else:
+        set_warmup_status("done")
+    finally:
+        record_timing("warmup", start)
+
+
+def start_warm_up():
+    """Run `warm_up_models` in a background thread and return the thread."""
+    thread = threading.Thread(target=warm_up_models, name="model-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def readiness():
+    """
+    Report whether the server is ready to ingest images.
+
+    The server is ready once warm-up finished, or right away when warm-up is
+    disabled and models load on first use.
+    """
+    with _lock:
+        status = dict(_status)
+        timings = dict(_timings_ms)
+    return {
+        "ready": status["warmup"] in ("done", "disabled"),
+        "warmup": status["warmup"],
+        "error": status["error"],
+        "timings_ms": timings,
+        "models": get_session_stats(),
+    }
@@ -1,30 +1,357 @@
 from contextlib import contextmanager
+from dataclasses import dataclass
+import hashlib
 import logging
+import os
+import platform
+import threading
+import time
+from typing import Dict, Hashable, Optional, Sequence, Tuple
+
 import onnxruntime
 
+from app.config.settings import (
+    ONNX_EXECUTION_MODE,
+    ONNX_GRAPH_OPTIMIZATION_LEVEL,
+    ONNX_INTER_OP_THREADS,
+    ONNX_INTRA_OP_THREADS,
+    ONNX_OPTIMIZED_MODEL_DIR,
+)
+
 logger = logging.getLogger(__name__)
 
+GRAPH_OPTIMIZATION_LEVELS = {
+    "disabled": onnxruntime.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": onnxruntime.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": onnxruntime.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+EXECUTION_MODES = {
+    "sequential": onnxruntime.ExecutionMode.ORT_SEQUENTIAL,
+    "parallel": onnxruntime.ExecutionMode.ORT_PARALLEL,
+}
+
+
+@dataclass(frozen=True)
+class PerformanceProfile:
+    """
+    ONNX runtime tuning applied to every session.
+
+    Attributes:
+        intra_op_threads: Threads used inside an operator, 0 for the default
+        inter_op_threads: Threads running operators concurrently in parallel
+            execution mode, 0 for the default
+        execution_mode: "sequential" or "parallel"
+        graph_optimization_level: "disabled", "basic", "extended" or "all"
+        optimized_model_dir: Directory where optimized graphs are cached, or
+            None to always optimize at load time
+    """
+
+    intra_op_threads: int = ONNX_INTRA_OP_THREADS
+    inter_op_threads: int = ONNX_INTER_OP_THREADS
+    execution_mode: str = ONNX_EXECUTION_MODE
+    graph_optimization_level: str = ONNX_GRAPH_OPTIMIZATION_LEVEL
+    optimized_model_dir: Optional[str] = ONNX_OPTIMIZED_MODEL_DIR or None
+
+    def __post_init__(self) -> None:
+        if self.execution_mode not in EXECUTION_MODES:
+            raise ValueError(f"Unknown ONNX execution mode: {self.execution_mode}")
+        if self.graph_optimization_level not in GRAPH_OPTIMIZATION_LEVELS:
+            raise ValueError(
+                "Unknown ONNX graph optimization level: "
+                f"{self.graph_optimization_level}"
+            )
+
+    def session_options(
+        self, graph_optimization_level: Optional[str] = None
+    ) -> onnxruntime.SessionOptions:
+        """
+        Build session options for this profile.
+
+        Args:
+            graph_optimization_level: Overrides the profile's level, used when
+                loading a graph that is already optimized
+
+        Returns:
+            onnxruntime.SessionOptions: Options to create a session with
+        """
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = self.intra_op_threads
+        options.inter_op_num_threads = self.inter_op_threads
+        options.execution_mode = EXECUTION_MODES[self.execution_mode]
+        options.graph_optimization_level = GRAPH_OPTIMIZATION_LEVELS[
+            graph_optimization_level or self.graph_optimization_level
+        ]
+        return options
+
+    def optimized_model_path(
+        self, model_path: str, providers: Tuple[str, ...]
+    ) -> Optional[str]:
+        """
+        Cache location of the optimized graph of a model, or None if caching
+        is disabled.
+
+        Optimized graphs can contain provider and hardware specific kernels,
+        so the file name covers the model file, optimization level, providers,
+        ONNX runtime version and machine.
+        """
+        if not self.optimized_model_dir or self.graph_optimization_level == "disabled":
+            return None
+        stat = os.stat(model_path)
+        fingerprint = "|".join(
+            [
+                os.path.abspath(model_path),
+                str(stat.st_size),
+                str(stat.st_mtime_ns),
+                self.graph_optimization_level,
+                ",".join(providers),
+                onnxruntime.__version__,
+                platform.machine(),
+            ]
+        )
+        digest = hashlib.sha256(fingerprint.encode()).hexdigest()[:16]
+        name = os.path.splitext(os.path.basename(model_path))[0]
+        return os.path.join(self.optimized_model_dir, f"{name}.{digest}.onnx")
+
+
+default_profile = PerformanceProfile()
+
+
+@dataclass
+class SessionStats:
+    """
+    Bookkeeping for a single cached ONNX runtime session.
+
+    Attributes:
+        model_path: Absolute path of the loaded model
+        providers: Execution providers the session was created with
+        load_time_ms: Time spent building the session, in milliseconds
+        hits: Number of times the cached session was handed out again
+        optimized_model_path: Cached optimized graph, if one is used
+        from_optimized_cache: Whether the session loaded the cached graph
+    """
+
+    model_path: str
+    providers: Tuple[str, ...]
+    load_time_ms: float
+    hits: int = 0
+    optimized_model_path: Optional[str] = None
+    from_optimized_cache: bool = False
+
+
+class OnnxSessionRegistry:
+    """
+    Process-wide, thread-safe cache of ONNX runtime inference sessions.
+
+    Each model is loaded once per (model path, providers, provider options,
+    performance profile) key and the same session is shared by every caller.
+    `InferenceSession.run` is safe to call concurrently, so callers do not
+    need extra locking.
+
+    The first load of a model writes its optimized graph to the profile's
+    cache directory; later loads, including in new processes, read that graph
+    with graph optimizations disabled instead of transforming it again.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Hashable, threading.Lock] = {}
+        self._sessions: Dict[Hashable, onnxruntime.InferenceSession] = {}
+        self._stats: Dict[Hashable, SessionStats] = {}
+
+    @staticmethod
+    def _make_key(
+        model_path: str,
+        providers: Tuple[str, ...],
+        provider_options: Optional[Sequence[dict]],
+        profile: PerformanceProfile,
+    ) -> Hashable:
+        options = tuple(
+            tuple(sorted((str(k), str(v)) for k, v in opts.items()))
+            for opts in (provider_options or [])
+        )
+        return (os.path.abspath(model_path), providers, options, profile)
+
+    @staticmethod
+    def _create_session(
+        model_path: str,
+        providers: Tuple[str, ...],
+        provider_options: Optional[Sequence[dict]],
+        profile: PerformanceProfile,
+    ) -> Tuple[onnxruntime.InferenceSession, Optional[str], bool]:
+        """
+        Create a session, going through the optimized model cache.
+
+        Returns:
+            The session, the optimized graph path (None if caching is off)
+            and whether the session was loaded from that cached graph
+        """
+        provider_options = list(provider_options) if provider_options else None
+        optimized_path = profile.optimized_model_path(model_path, providers)
+
+        if optimized_path and os.path.exists(optimized_path):
+            try:
+                session = onnxruntime.InferenceSession(
+                    optimized_path,
+                    sess_options=profile.session_options("disabled"),
+                    providers=list(providers),
+                    provider_options=provider_options,
+                )
+                return session, optimized_path, True
+            except Exception as e:
+                logger.warning(
+                    f"Discarding unusable optimized model {optimized_path}: {str(e)}"
+                )
+                try:
+                    os.remove(optimized_path)
+                except OSError:
+                    pass
+
+        options = profile.session_options()
+        tmp_path = None
+        if optimized_path:
+            try:
+                os.makedirs(os.path.dirname(optimized_path), exist_ok=True)
+                # Written under a temporary name so other processes never
+                # load a partially written graph
+                tmp_path = f"{optimized_path}.{os.getpid()}.tmp"
+                options.optimized_model_filepath = tmp_path
+            except OSError as e:
+                logger.warning(f"Cannot cache optimized model: {str(e)}")
+                optimized_path = None
+
+        session = onnxruntime.InferenceSession(
+            model_path,
+            sess_options=options,
+            providers=list(providers),
+            provider_options=provider_options,
+        )
+        if tmp_path and os.path.exists(tmp_path):
+            os.replace(tmp_path, optimized_path)
+            logger.info(f"Saved optimized ONNX model to {optimized_path}")
+        return session, optimized_path, False
+
+    def get_session(
+        self,
+        model_path: str,
+        providers: Optional[Sequence[str]] = None,
+        provider_options: Optional[Sequence[dict]] = None,
+        profile: Optional[PerformanceProfile] = None,
+    ) -> onnxruntime.InferenceSession:
+        """
+        Return the shared session for a model, loading it on first use.
+
+        Args:
+            model_path: Path to the ONNX model file
+            providers: Execution providers, defaults to all available providers
+            provider_options: Optional per-provider option dicts
+            profile: Performance profile, defaults to the one from settings
+
+        Returns:
+            onnxruntime.InferenceSession: The cached ONNX runtime session
+        """
+        providers = tuple(providers or onnxruntime.get_available_providers())
+        profile = profile or default_profile
+        key = self._make_key(model_path, providers, provider_options, profile)
+
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is not None:
+                self._stats[key].hits += 1
+                return session
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Load outside the registry lock so different models can load in parallel,
+        # while concurrent callers of the same model wait for a single load.
+        with key_lock:
+            with self._lock:
+                session = self._sessions.get(key)
+                if session is not None:
+                    self._stats[key].hits += 1
+                    return session
+
+            start = time.perf_counter()
+            try:
+                session, optimized_path, from_cache = self._create_session(
+                    model_path, providers, provider_options, profile
+                )
+            except Exception as e:
+                logger.error(f"Error loading ONNX model {model_path}: {str(e)}")
+                raise
+            load_time_ms = (time.perf_counter() - start) * 1000
+
+            with self._lock:
+                self._sessions[key] = session
+                self._stats[key] = SessionStats(
+                    model_path=key[0],
+                    providers=providers,
+                    load_time_ms=load_time_ms,
+                    optimized_model_path=optimized_path,
+                    from_optimized_cache=from_cache,
+                )
+            logger.info(f"Loaded ONNX model {model_path} in {load_time_ms:.2f}ms")
+            return session
+
+    def stats(self) -> list:
+        """Return load time and hit counts for every cached session."""
+        with self._lock:
+            return [
+                {
+                    "model_path": s.model_path,
+                    "providers": list(s.providers),
+                    "load_time_ms": round(s.load_time_ms, 2),
+                    "hits": s.hits,
+                    "optimized_model_path": s.optimized_model_path,
+                    "from_optimized_cache": s.from_optimized_cache,
+                }
+                for s in self._stats.values()
+            ]
+
+    def clear(self) -> None:
+        """Drop every cached session, releasing the underlying models."""
+        with self._lock:
+            self._sessions.clear()
+            self._stats.clear()
+            self._key_locks.clear()
+
+
+session_registry = OnnxSessionRegistry()
+
+
+def get_session(
+    model_path: str,
+    providers: Optional[Sequence[str]] = None,
+    provider_options: Optional[Sequence[dict]] = None,
+    profile: Optional[PerformanceProfile] = None,
+) -> onnxruntime.InferenceSession:
+    """Return the process-wide shared session for `model_path`."""
+    return session_registry.get_session(
+        model_path, providers, provider_options, profile
+    )
+
+
+def get_session_stats() -> list:
+    """Return load time and hit counts of the shared sessions."""
+    return session_registry.stats()
+
 
 @contextmanager
 def onnx_session(model_path: str):
     """
     Context manager for ONNX runtime sessions to ensure proper resource management.
 
+    The session comes from the shared registry, so entering the context
+    repeatedly for the same model does not reload it.
+
     Args:
         model_path (str): Path to the ONNX model file
 
     Yields:
         onnxruntime.InferenceSession: The ONNX runtime session
     """
-    session = None
     try:
-        session = onnxruntime.InferenceSession(
-            model_path, providers=onnxruntime.get_available_providers()
-        )
-        yield session
+        yield get_session(model_path)
     except Exception as e:
         logger.error(f"Error in ONNX session: {str(e)}")
         raise
-    finally:
-        if session:
-            del session
@@ -0,0 +1,157 @@
+import json
+import logging
+import os
+from typing import Iterable, Optional
+
+import numpy as np
+
+from app.config.settings import ONNX_QUANTIZATION, QUANTIZATION_REPORT_PATH
+
+logger = logging.getLogger(__name__)
+
+QUANTIZATION_MODES = ("dynamic", "static")
+
+
+def quantized_model_path(model_path: str, mode: str) -> str:
+    """
+    Location of the INT8 variant of a model, next to the float model.
+
+    Args:
+        model_path: Path to the float ONNX model
+        mode: "dynamic" or "static"
+
+    Returns:
+        str: Path such as `app/models/yolov8n.int8-dynamic.onnx`
+    """
+    if mode not in QUANTIZATION_MODES:
+        raise ValueError(f"Unknown quantization mode: {mode}")
+    root, ext = os.path.splitext(model_path)
+    return f"{root}.int8-{mode}{ext}"
+
+
+class TensorCalibrationReader:
+    """
+    Calibration data reader feeding preprocessed tensors, one at a time, to
+    `onnxruntime.quantization.quantize_static`.
+    """
+
+    def __init__(self, input_name: str, tensors: Iterable[np.ndarray]) -> None:
+        self.input_name = input_name
+        self._tensors = iter(tensors)
+
+    def get_next(self) -> Optional[dict]:
+        tensor = next(self._tensors, None)
+        return None if tensor is None else {self.input_name: tensor}
+
+
+def quantize_model(
+    model_path: str,
+    mode: str = "dynamic",
+    calibration_tensors: Optional[Iterable[np.ndarray]] = None,
+    output_path: Optional[str] = None,
+) -> str:
+    """
+    Write an INT8 version of an ONNX model.
+
+    Dynamic quantization stores INT8 weights and quantizes activations at run
+    time. Static quantization also fixes activation ranges, calibrated on
+    `calibration_tensors`, and writes a QDQ model. Requires the `onnx`
+    package, which the runtime itself does not need.
+
+    Args:
+        model_path: Path to the float ONNX model
+        mode: "dynamic" or "static"
+        calibration_tensors: Preprocessed model inputs, required for "static"
+        output_path: Destination, defaults to `quantized_model_path`
+
+    Returns:
+        str: Path of the quantized model
+    """
+    from onnxruntime.quantization import (
+        QuantFormat,
+        QuantType,
+        quantize_dynamic,
+        quantize_static,
+    )
+    import onnxruntime
+
+    output_path = output_path or quantized_model_path(model_path, mode)
+    if mode == "dynamic":
+        quantize_dynamic(model_path, output_path, weight_type=QuantType.QUInt8)
+    elif mode == "static":
+        if calibration_tensors is None:
+            raise ValueError("Static quantization needs calibration tensors")
+        input_name = (
+            onnxruntime.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+            .get_inputs()[0]
+            .name
+        )
+        quantize_static(
+            model_path,
+            output_path,
+            TensorCalibrationReader(input_name, calibration_tensors),
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=True,
+        )
+    else:
+        raise ValueError(f"Unknown quantization mode: {mode}")
+
+    logger.info(f"Wrote {mode} INT8 model {output_path}")
+    return output_path
+
+
+def load_report(report_path: str = QUANTIZATION_REPORT_PATH) -> dict:
+    """Return the benchmark gate report, or an empty one if there is none."""
+    try:
+        with open(report_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_report(report: dict, report_path: str = QUANTIZATION_REPORT_PATH) -> None:
+    os.makedirs(os.path.dirname(report_path) or ".", exist_ok=True)
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+
+
+def resolve_model_path(
+    model_path: str,
+    mode: str = ONNX_QUANTIZATION,
+    report_path: str = QUANTIZATION_REPORT_PATH,
+) -> str:
+    """
+    Return the model to load for `model_path` under the configured
+    quantization mode.
+
+    The INT8 variant is only used if it exists and the quantization benchmark
+    recorded that this exact file passed the accuracy gate; otherwise the
+    float model is kept.
+
+    Args:
+        model_path: Path to the float ONNX model
+        mode: "" to disable quantization, "dynamic" or "static"
+        report_path: Gate report written by `benchmarks.bench_quantization`
+
+    Returns:
+        str: Path of the model to load
+    """
+    if not mode:
+        return model_path
+
+    candidate = quantized_model_path(model_path, mode)
+    entry = load_report(report_path).get(os.path.basename(candidate))
+    if not os.path.exists(candidate) or not entry:
+        logger.warning(f"No benchmarked {mode} INT8 model for {model_path}")
+        return model_path
+    if entry.get("mtime_ns") != os.stat(candidate).st_mtime_ns:
+        logger.warning(
+            f"{candidate} changed since it was benchmarked, using float model"
+        )
+        return model_path
+    if not entry.get("passed"):
+        logger.warning(f"{candidate} failed the quantization gate, using float model")
+        return model_path
+    return candidate
@@ -1,38 +1,101 @@
 import time
+from functools import lru_cache
 import cv2
 import numpy as np
-from app.utils.onnx_manager import onnx_session
-from app.yolov8.utils import xywh2xyxy, draw_detections, multiclass_nms
+from app.config.settings import YOLO_USE_IO_BINDING
+from app.utils.batching import get_batcher
+from app.utils.onnx_manager import get_session
+from app.utils.quantization import resolve_model_path
+from app.yolov8.utils import (
+    xywh2xyxy,
+    draw_detections,
+    multiclass_nms,
+    prepare_input_tensor,
+)
 from app.utils.memory_monitor import log_memory_usage
 
 
 class YOLOv8:
-    def __init__(self, path, conf_thres=0.7, iou_thres=0.5):
+    def __init__(
+        self,
+        path,
+        conf_thres=0.7,
+        iou_thres=0.5,
+        top_k=3000,
+        max_det=300,
+        use_io_binding=YOLO_USE_IO_BINDING,
+    ):
         self.model_path = path
         self.conf_threshold = conf_thres
         self.iou_threshold = iou_thres
-
-        # Initialize model info
-        with onnx_session(self.model_path) as session:
-            self.get_input_details(session)
-            self.get_output_details(session)
-
-    def __call__(self, image):
-        return self.detect_objects(image)
+        # Candidates entering NMS and detections returned per image
+        self.top_k = top_k
+        self.max_det = max_det
+
+        # The session is shared process-wide and loaded on first use, so
+        # creating detectors is cheap
+        self._session = None
+        self._batcher = None
+        # Bind the reused input buffer to the session instead of feeding it,
+        # which bypasses micro-batching
+        self.use_io_binding = use_io_binding
+
+    @property
+    def session(self):
+        if self._session is None:
+            self.load()
+        return self._session
+
+    @property
+    def batcher(self):
+        if self._batcher is None:
+            self.load()
+        return self._batcher
+
+    def load(self):
+        session = get_session(self.model_path)
+        self.get_input_details(session)
+        self.get_output_details(session)
+
+        # Concurrent detections on the same model are merged into one run
+        self._batcher = get_batcher(self.model_path)
+        # Set last, other threads only use the details once the session is set
+        self._session = session
+
+    def __call__(self, image, scale=None):
+        return self.detect_objects(image, scale=scale)
 
     @log_memory_usage
-    def detect_objects(self, image):
-        with onnx_session(self.model_path) as session:
-            input_tensor = self.prepare_input(image)
-            outputs = self.inference(session, input_tensor)
-            self.boxes, self.scores, self.class_ids = self.process_output(outputs)
-            return self.boxes, self.scores, self.class_ids
+    def detect_objects(self, image, scale=None):
+        # Per-image state stays local so one detector can serve several threads
+        session = self.session
+        img_shape = image.shape[:2]
+        if scale is not None:
+            # `image` was decoded at reduced resolution, boxes are mapped back
+            # to the original image
+            img_shape = (img_shape[0] * scale[1], img_shape[1] * scale[0])
+        input_tensor = self.prepare_input(image)
+        if self.use_io_binding:
+            outputs = self.inference_io_binding(session, input_tensor)
+        else:
+            outputs = self.batcher.run(input_tensor)
+        return self.process_output(outputs, img_shape)
 
     def inference(self, session, input_tensor):
         time.perf_counter()
         outputs = session.run(self.output_names, {self.input_names[0]: input_tensor})
         return outputs
 
+    def inference_io_binding(self, session, input_tensor):
+        # The input is bound in place, so ONNX Runtime reads the preallocated
+        # buffer directly rather than copying it into its own tensor
+        binding = session.io_binding()
+        binding.bind_cpu_input(self.input_names[0], input_tensor)
+        for name in self.output_names:
+            binding.bind_output(name)
+        session.run_with_iobinding(binding)
+        return binding.copy_outputs_to_cpu()
+
     def get_input_details(self, session):
         model_inputs = session.get_inputs()
         self.input_names = [model_inputs[i].name for i in range(len(model_inputs))]
@@ -45,27 +108,21 @@ class YOLOv8:
         self.output_names = [model_outputs[i].name for i in range(len(model_outputs))]
 
     def prepare_input(self, image):
-        self.img_height, self.img_width = image.shape[:2]
-
-        input_img = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-
-        # Resize input image
-        input_img = cv2.resize(input_img, (self.input_width, self.input_height))
-
-        # Scale input pixel values to 0 to 1
-        input_img = input_img / 255.0
-        input_img = input_img.transpose(2, 0, 1)
-        input_tensor = input_img[np.newaxis, :, :, :].astype(np.float32)
+        # Color swap, resize, scaling and HWC -> CHW in one pass into a float32
+        # buffer reused by the calling thread; the returned tensor is
+        # overwritten by the next call on the same thread
+        return prepare_input_tensor(image, self.input_width, self.input_height)
 
-        return input_tensor
-
-    def process_output(self, output):
-        predictions = np.squeeze(output[0]).T
+    def process_output(self, output, img_shape):
+        # (4 + num_classes, num_anchors); only the anchors passing the
+        # confidence threshold are copied and transposed
+        predictions = np.squeeze(output[0])
 
         # Filter out object confidence scores below threshold
-        scores = np.max(predictions[:, 4:], axis=1)
-        predictions = predictions[scores > self.conf_threshold, :]
-        scores = scores[scores > self.conf_threshold]
+        scores = np.max(predictions[4:], axis=0)
+        mask = scores > self.conf_threshold
+        predictions = predictions[:, mask].T
+        scores = scores[mask]
 
         if len(scores) == 0:
             return [], [], []
@@ -74,43 +131,63 @@ class YOLOv8:
         class_ids = np.argmax(predictions[:, 4:], axis=1)
 
         # Get bounding boxes for each object
-        boxes = self.extract_boxes(predictions)
+        boxes = self.extract_boxes(predictions, img_shape)
 
         # Apply non-maxima suppression to suppress weak, overlapping bounding boxes
         # indices = nms(boxes, scores, self.iou_threshold)
-        indices = multiclass_nms(boxes, scores, class_ids, self.iou_threshold)
+        indices = multiclass_nms(
+            boxes,
+            scores,
+            class_ids,
+            self.iou_threshold,
+            top_k=self.top_k,
+            max_det=self.max_det,
+        )
 
         return boxes[indices], scores[indices], class_ids[indices]
 
-    def extract_boxes(self, predictions):
+    def extract_boxes(self, predictions, img_shape):
         # Extract boxes from predictions
         boxes = predictions[:, :4]
 
         # Scale boxes to original image dimensions
-        boxes = self.rescale_boxes(boxes)
+        boxes = self.rescale_boxes(boxes, img_shape)
 
         # Convert boxes to xyxy format
         boxes = xywh2xyxy(boxes)
 
         return boxes
 
-    def rescale_boxes(self, boxes):
+    def rescale_boxes(self, boxes, img_shape):
+        img_height, img_width = img_shape
 
         # Rescale boxes to original image dimensions
         input_shape = np.array(
             [self.input_width, self.input_height, self.input_width, self.input_height]
         )
         boxes = np.divide(boxes, input_shape, dtype=np.float32)
-        boxes *= np.array(
-            [self.img_width, self.img_height, self.img_width, self.img_height]
-        )
+        boxes *= np.array([img_width, img_height, img_width, img_height])
         return boxes
 
-    def draw_detections(self, image, draw_scores=True, mask_alpha=0.4):
+    def draw_detections(
+        self, image, boxes, scores, class_ids, draw_scores=True, mask_alpha=0.4
+    ):
+        # Takes the detections of `detect_objects`, which keeps no state
+        return draw_detections(image, boxes, scores, class_ids, mask_alpha)
 
-        return draw_detections(
-            image, self.boxes, self.scores, self.class_ids, mask_alpha
-        )
+
+@lru_cache(maxsize=None)
+def get_detector(model_path, conf_thres=0.7, iou_thres=0.5):
+    """
+    Return a shared YOLOv8 detector for the given model and thresholds.
+
+    Detectors only hold read-only model details, so one instance per
+    configuration is reused across images and threads. The INT8 variant of
+    the model is used when quantization is enabled and it passed the gate.
+    """
+    return YOLOv8(
+        resolve_model_path(model_path), conf_thres=conf_thres, iou_thres=iou_thres
+    )
 
 
 if __name__ == "__main__":
@@ -125,10 +202,10 @@ if __name__ == "__main__":
     img = imread_from_url(img_url)
 
     # Detect Objects
-    yolov8_detector(img)
+    boxes, scores, class_ids = yolov8_detector(img)
 
     # Draw detections
-    combined_img = yolov8_detector.draw_detections(img)
+    combined_img = yolov8_detector.draw_detections(img, boxes, scores, class_ids)
     cv2.namedWindow("Output", cv2.WINDOW_NORMAL)
     cv2.imshow("Output", combined_img)
     cv2.waitKey(0)
@@ -1,3 +1,5 @@
+import threading
+
 import numpy as np
 import cv2
 
@@ -89,42 +91,133 @@ rng = np.random.default_rng(3)
 colors = rng.uniform(0, 255, size=(len(class_names), 3))
 
 
-def nms(boxes, scores, iou_threshold):
+def nms(boxes, scores, iou_threshold, class_ids=None, top_k=None, max_det=None):
     # Sort by score
     sorted_indices = np.argsort(scores)[::-1]
+    if top_k is not None:
+        # Only the best `top_k` candidates take part in suppression
+        sorted_indices = sorted_indices[:top_k]
+
+    # Edges (i, j): higher-scored box i would remove box j
+    src, dst = suppression_pairs(
+        boxes[sorted_indices],
+        iou_threshold,
+        None if class_ids is None else class_ids[sorted_indices],
+    )
 
-    keep_boxes = []
-    while sorted_indices.size > 0:
-        # Pick the last box
-        box_id = sorted_indices[0]
-        keep_boxes.append(box_id)
-
-        # Compute IoU of the picked box with the rest
-        ious = compute_iou(boxes[box_id, :], boxes[sorted_indices[1:], :])
-
-        # Remove boxes with IoU over the threshold
-        keep_indices = np.where(ious < iou_threshold)[0]
-
-        # print(keep_indices.shape, sorted_indices.shape)
-        sorted_indices = sorted_indices[keep_indices + 1]
-
+    # Greedy NMS keeps a box iff no kept, higher-scored box suppresses it. The
+    # status of box j only depends on boxes before it, so iterating this rule
+    # from "keep everything" fixes at least one more box per round and settles
+    # on exactly the greedy result, usually after a handful of rounds.
+    keep = np.ones(len(sorted_indices), dtype=bool)
+    while True:
+        new_keep = np.ones_like(keep)
+        new_keep[dst[keep[src]]] = False
+        if np.array_equal(new_keep, keep):
+            break
+        keep = new_keep
+
+    keep_boxes = sorted_indices[keep]
+    if max_det is not None:
+        keep_boxes = keep_boxes[:max_det]
     return keep_boxes
 
 
-def multiclass_nms(boxes, scores, class_ids, iou_threshold):
-
-    unique_class_ids = np.unique(class_ids)
-
-    keep_boxes = []
-    for class_id in unique_class_ids:
-        class_indices = np.where(class_ids == class_id)[0]
-        class_boxes = boxes[class_indices, :]
-        class_scores = scores[class_indices]
-
-        class_keep_boxes = nms(class_boxes, class_scores, iou_threshold)
-        keep_boxes.extend(class_indices[class_keep_boxes])
-
-    return keep_boxes
+def suppression_pairs(boxes, iou_threshold, class_ids=None):
+    """
+    Return index arrays (src, dst) with src < dst of all box pairs whose IoU
+    is not below `iou_threshold`, including pairs with an undefined IoU as
+    the sequential NMS did. With `class_ids`, only same-class pairs count.
+
+    IoU >= t needs an intersection width of at least t times the width of
+    either box, so candidates come from a sweep over boxes sorted by their
+    left edge instead of the full N x N matrix. Each class is shifted to its
+    own x-range (the per-class offset trick) so the sweep never mixes them.
+    """
+    n = len(boxes)
+    if n == 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+
+    x1, y1, x2, y2 = (np.ascontiguousarray(boxes[:, k]) for k in range(4))
+    areas = (x2 - x1) * (y2 - y1)
+    if iou_threshold <= 0 or not np.all(areas > 0):
+        # Disjoint boxes can still suppress each other here, use every pair
+        suppress = np.triu(~(compute_iou_matrix(boxes) < iou_threshold), k=1)
+        if class_ids is not None:
+            suppress &= class_ids[:, None] == class_ids[None, :]
+        return np.nonzero(suppress)
+
+    # Offset coordinates are only used to find candidates, IoUs are computed
+    # on the original boxes
+    offset = 0.0
+    if class_ids is not None:
+        offset = class_ids * (2.0 * (x2.max() - x1.min()) + 1.0)
+    left, right = x1 + offset, x2 + offset
+
+    by_left = np.argsort(left, kind="stable")
+    left = left[by_left]
+    # Slightly loosened so float rounding in the IoU never drops a pair
+    min_overlap = iou_threshold * (1 - 1e-3) * (x2 - x1)[by_left]
+    ends = np.searchsorted(left, right[by_left] - min_overlap, side="right")
+    counts = np.maximum(ends - np.arange(n) - 1, 0)
+
+    # Every box paired with the boxes starting inside its x-window
+    first = np.repeat(np.arange(n), counts)
+    offsets = np.arange(len(first)) - np.repeat(np.cumsum(counts) - counts, counts)
+    second = by_left[first + 1 + offsets]
+    first = by_left[first]
+
+    # Same arithmetic as `compute_iou`, on the candidate pairs only
+    width = np.minimum(x2[first], x2[second])
+    width -= np.maximum(x1[first], x1[second])
+    np.maximum(width, 0, out=width)
+    height = np.minimum(y2[first], y2[second])
+    height -= np.maximum(y1[first], y1[second])
+    np.maximum(height, 0, out=height)
+    intersection = np.multiply(width, height, out=width)
+    union = areas[first] + areas[second]
+    union -= intersection
+
+    suppress = ~(intersection / union < iou_threshold)
+    first, second = first[suppress], second[suppress]
+    return np.minimum(first, second), np.maximum(first, second)
+
+
+def multiclass_nms(boxes, scores, class_ids, iou_threshold, top_k=None, max_det=None):
+    keep_boxes = nms(boxes, scores, iou_threshold, class_ids, top_k, max_det)
+
+    # Group the result by class id, highest score first within each class
+    order = np.argsort(class_ids[keep_boxes], kind="stable")
+    return keep_boxes[order]
+
+
+def compute_iou_matrix(boxes, chunk_size=64):
+    """
+    Pairwise IoU of an (N, 4) xyxy box array. Rows are computed in small
+    chunks, reusing the temporaries in place to stay cache friendly.
+    """
+    x1, y1, x2, y2 = (np.ascontiguousarray(boxes[:, k]) for k in range(4))
+    areas = (x2 - x1) * (y2 - y1)
+    ious = np.empty((len(boxes), len(boxes)), dtype=np.result_type(boxes, np.float32))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for start in range(0, len(boxes), chunk_size):
+            rows = slice(start, start + chunk_size)
+
+            # Intersection width and height, clipped at zero
+            width = np.minimum(x2[rows, None], x2[None, :])
+            width -= np.maximum(x1[rows, None], x1[None, :])
+            np.maximum(width, 0, out=width)
+            height = np.minimum(y2[rows, None], y2[None, :])
+            height -= np.maximum(y1[rows, None], y1[None, :])
+            np.maximum(height, 0, out=height)
+            intersection = np.multiply(width, height, out=width)
+
+            union = areas[rows, None] + areas[None, :]
+            union -= intersection
+            np.divide(intersection, union, out=ious[rows])
+
+    return ious
 
 
 def compute_iou(box, boxes):
@@ -158,6 +251,44 @@ def xywh2xyxy(x):
     return y
 
 
+_input_buffers = threading.local()
+
+
+def input_buffers(width, height):
+    """
+    Return this thread's (resized uint8 image, float32 NCHW tensor) buffers
+    for the given model input size, allocating them on first use.
+    """
+    buffers = getattr(_input_buffers, "buffers", None)
+    if buffers is None:
+        buffers = _input_buffers.buffers = {}
+    key = (width, height)
+    if key not in buffers:
+        buffers[key] = (
+            np.empty((height, width, 3), dtype=np.uint8),
+            np.empty((1, 3, height, width), dtype=np.float32),
+        )
+    return buffers[key]
+
+
+def prepare_input_tensor(image, width, height, out=None):
+    # BGR uint8 image -> (1, 3, height, width) RGB float32 tensor in [0, 1].
+    # The resize writes into a reused uint8 buffer and every channel is
+    # scaled straight into its CHW plane, so no full-size float64 or
+    # transposed temporaries are created. Resizing is per channel, so doing
+    # the color swap afterwards gives the same result as before.
+    resized, tensor = input_buffers(width, height)
+    if out is not None:
+        tensor = out
+    resized = cv2.resize(image, (width, height), dst=resized)
+    scale = np.float32(255.0)
+    for channel in range(3):
+        np.divide(
+            resized[:, :, 2 - channel], scale, out=tensor[0, channel], dtype=np.float32
+        )
+    return tensor
+
+
 def draw_detections(
     image, boxes, scores, class_ids, mask_alpha=0.3, confidence_threshold=0.3
 ):
@@ -0,0 +1 @@
+# Micro-benchmarks, run from the backend directory with `python -m benchmarks.<name>`
@@ -0,0 +1,103 @@
+"""
+Recall and latency of the face embedding indexes against the brute-force
+`cosine_distances` scan FaceCluster used before.
+
+Builds a synthetic library of clustered 512-d embeddings (several faces per
+person) and reports, per index, the mean query time, recall@k of k-NN
+queries and recall of eps radius queries.
+
+Usage:
+    python -m benchmarks.bench_ann [--faces 200000] [--nprobe 8 16 32]
+"""
+
+import argparse
+import time
+
+import numpy as np
+from sklearn.metrics.pairwise import cosine_distances
+
+from app.facecluster.ann_index import IVFFlatIndex, make_index
+
+
+def synthetic_embeddings(count, dim, faces_per_person, spread, seed):
+    rng = np.random.default_rng(seed)
+    num_people = max(1, count // faces_per_person)
+    centers = rng.normal(size=(num_people, dim))
+    owners = rng.integers(0, num_people, size=count)
+    noise = rng.normal(scale=spread, size=(count, dim))
+    return (centers[owners] + noise).astype(np.float32)
+
+
+def brute_force(queries, embeddings, k, eps):
+    knn, radius = [], []
+    start = time.perf_counter()
+    for query in queries:
+        distances = cosine_distances(query.reshape(1, -1), embeddings)[0]
+        knn.append(np.argsort(distances)[:k])
+        radius.append(np.flatnonzero(distances <= eps))
+    elapsed_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    return knn, radius, elapsed_ms
+
+
+def evaluate(index, queries, k, eps, truth_knn, truth_radius):
+    knn_hits = radius_hits = radius_total = 0
+    start = time.perf_counter()
+    results = [(index.knn(q, k)[0], index.radius(q, eps)[0]) for q in queries]
+    elapsed_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    for (knn, radius), expected_knn, expected_radius in zip(
+        results, truth_knn, truth_radius
+    ):
+        knn_hits += len(np.intersect1d(knn, expected_knn))
+        radius_hits += len(np.intersect1d(radius, expected_radius))
+        radius_total += len(expected_radius)
+
+    return {
+        "ms_per_query": elapsed_ms,
+        f"recall@{k}": knn_hits / (k * len(queries)),
+        "radius_recall": radius_hits / max(radius_total, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--faces", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--faces-per-person", type=int, default=20)
+    parser.add_argument("--spread", type=float, default=0.04)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--eps", type=float, default=0.3)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    embeddings = synthetic_embeddings(
+        args.faces, args.dim, args.faces_per_person, args.spread, args.seed
+    )
+    rng = np.random.default_rng(args.seed + 1)
+    queries = embeddings[rng.choice(args.faces, size=args.queries, replace=False)]
+    keys = np.arange(args.faces)
+
+    truth_knn, truth_radius, brute_ms = brute_force(
+        queries, embeddings, args.k, args.eps
+    )
+    print(f"brute force: {brute_ms:.2f}ms/query")
+
+    exact = make_index("exact")
+    exact.add(keys, embeddings)
+    metrics = evaluate(exact, queries, args.k, args.eps, truth_knn, truth_radius)
+    print("exact: " + ", ".join(f"{k}={v:.4f}" for k, v in metrics.items()))
+
+    for nprobe in args.nprobe:
+        start = time.perf_counter()
+        index = IVFFlatIndex(nprobe=nprobe)
+        index.add(keys, embeddings)
+        build_s = time.perf_counter() - start
+        metrics = evaluate(index, queries, args.k, args.eps, truth_knn, truth_radius)
+        summary = ", ".join(f"{k}={v:.4f}" for k, v in metrics.items())
+        print(f"ivf nprobe={nprobe} (built in {build_s:.1f}s): {summary}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Time and peak memory of the face clustering backends on synthetic
+clustered 512-d embeddings.
+
+The scikit-learn backend needs O(N^2) memory with the cosine metric and is
+skipped above --max-sklearn faces. The sharded backend runs once per
+--workers count and reports its speedup over the single-process sparse
+backend. Label agreement with the sparse backend is reported for every
+other backend. 1M faces takes hours on a few cores; pass
+--sizes 10000 100000 1000000 to include it. Peak memory is that of this
+process only, so it leaves out the sharded backend's workers.
+
+Usage:
+    python -m benchmarks.bench_clustering [--sizes 10000 100000] [--workers 1 2 4]
+"""
+
+import argparse
+import os
+import time
+import tracemalloc
+
+import numpy as np
+
+from app.facecluster.clustering import ShardedDBSCANBackend, make_backend
+from benchmarks.bench_ann import synthetic_embeddings
+
+
+def measure(backend, embeddings):
+    tracemalloc.start()
+    start = time.perf_counter()
+    labels = backend.fit_predict(embeddings)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return labels, elapsed, peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--faces-per-person", type=int, default=20)
+    parser.add_argument("--spread", type=float, default=0.04)
+    parser.add_argument("--eps", type=float, default=0.3)
+    parser.add_argument("--min-samples", type=int, default=2)
+    parser.add_argument("--max-sklearn", type=int, default=20000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+    print(f"{os.cpu_count()} CPUs")
+
+    for size in args.sizes:
+        embeddings = synthetic_embeddings(
+            size, args.dim, args.faces_per_person, args.spread, seed=0
+        )
+        # Warm up BLAS and the graph code before timing
+        make_backend("sparse", args.eps, args.min_samples).fit_predict(
+            embeddings[:1000]
+        )
+        backends = [("sparse", make_backend("sparse", args.eps, args.min_samples))]
+        if size <= args.max_sklearn:
+            backends.append(
+                ("sklearn", make_backend("sklearn", args.eps, args.min_samples))
+            )
+        else:
+            print(f"{size} faces, sklearn: skipped (O(N^2) memory)")
+        for workers in args.workers:
+            backend = ShardedDBSCANBackend(args.eps, args.min_samples, workers=workers)
+            backends.append((f"sharded x{workers}", backend))
+
+        for name, backend in backends:
+            labels, elapsed, peak_mb = measure(backend, embeddings)
+            clusters = len(set(labels.tolist()) - {-1})
+            line = (
+                f"{size} faces, {name}: {elapsed:.2f}s, peak {peak_mb:.0f}MB, "
+                f"{clusters} clusters"
+            )
+            if name == "sparse":
+                reference, reference_time = labels, elapsed
+            else:
+                agreement = np.mean(labels == reference)
+                line += f", label agreement {agreement:.4f}"
+                line += f", speedup {reference_time / elapsed:.2f}x"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
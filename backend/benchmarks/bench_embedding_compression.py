@@ -0,0 +1,132 @@
+"""
+Clustering and matching agreement of compact face embeddings on the labeled
+people in tests/inputs (Aaron_Peirsol_0001.jpg, Abdullah_0002.jpg, ...).
+
+Every image named <person>_<number> is run through the face detector and
+FaceNet, keeping its highest-scoring face. The embeddings are then stored
+as float16 and/or projected by a PCA fitted on them, and each variant is
+compared with the float32 512-d embeddings:
+
+- cluster ARI: adjusted Rand index of the DBSCAN labels
+- match agreement: face pairs whose same-person decision
+  (cosine distance <= eps) is unchanged
+- recall/precision: eps-neighbor pairs kept, as checked by the projection
+  guard (FACE_PROJECTION_MIN_RECALL)
+- person ARI and 1-NN accuracy against the names
+
+A PCA to at least as many dimensions as there are faces keeps them exactly;
+pass --input-dir with a larger labeled folder to measure a real library.
+
+Usage:
+    python -m benchmarks.bench_embedding_compression [--dims 128 64 8]
+"""
+
+import argparse
+import os
+import re
+
+import cv2
+import numpy as np
+from sklearn.metrics import adjusted_rand_score
+
+from app.config.settings import (
+    DEFAULT_FACE_DETECTION_MODEL,
+    FACE_PROJECTION_MIN_RECALL,
+    TEST_INPUT_PATH,
+)
+from app.facecluster.clustering import make_backend
+from app.facecluster.incremental_dbscan import normalize_rows
+from app.facecluster.projection import EmbeddingProjection, neighbor_recall
+from app.facenet.facenet import get_face_embeddings
+from app.utils.image_loader import crop_region
+from app.yolov8.YOLOv8 import get_detector
+
+PERSON_IMAGE = re.compile(r"^(?P<person>.+)_\d+\.(jpg|jpeg|png)$", re.IGNORECASE)
+
+
+def labeled_faces(input_dir):
+    detector = get_detector(
+        DEFAULT_FACE_DETECTION_MODEL, conf_thres=0.35, iou_thres=0.45
+    )
+    crops, people = [], []
+    for name in sorted(os.listdir(input_dir)):
+        match = PERSON_IMAGE.match(name)
+        image = cv2.imread(os.path.join(input_dir, name)) if match else None
+        if image is None:
+            continue
+        boxes, scores, _ = detector(image)
+        if len(boxes) == 0:
+            print(f"No face found in {name}")
+            continue
+        crops.append(crop_region(image, boxes[int(np.argmax(scores))], 20))
+        people.append(match.group("person"))
+    return get_face_embeddings(crops), people
+
+
+def same_person(vectors, eps):
+    unit = normalize_rows(vectors)
+    similarity = unit @ unit.T
+    upper = np.triu_indices(len(unit), k=1)
+    return similarity[upper] >= 1 - eps, similarity
+
+
+def nearest_neighbor_accuracy(similarity, people):
+    similarity = similarity.copy()
+    np.fill_diagonal(similarity, -np.inf)
+    nearest = similarity.argmax(axis=1)
+    return np.mean([people[i] == people[j] for i, j in enumerate(nearest)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--input-dir", default=TEST_INPUT_PATH)
+    parser.add_argument("--dims", type=int, nargs="+", default=[128, 64, 8])
+    parser.add_argument("--eps", type=float, default=0.3)
+    parser.add_argument("--min-samples", type=int, default=2)
+    args = parser.parse_args()
+
+    embeddings, people = labeled_faces(args.input_dir)
+    print(f"{len(people)} faces of {len(set(people))} people")
+    if len(people) < 2:
+        return
+    backend = make_backend("sparse", args.eps, args.min_samples)
+
+    full_labels = backend.fit_predict(embeddings)
+    full_pairs, _ = same_person(embeddings, args.eps)
+    variants = [("float32", None), ("float16", None)]
+    variants += [
+        (dtype, dim)
+        for dim in args.dims
+        if dim < embeddings.shape[1]
+        for dtype in ("float32", "float16")
+    ]
+
+    print(
+        f"{'variant':>14} {'bytes/face':>10} {'cluster ARI':>11} "
+        f"{'match agr':>9} {'recall':>6} {'precision':>9} {'guard':>5} "
+        f"{'person ARI':>10} {'1-NN acc':>8}"
+    )
+    for dtype, dim in variants:
+        vectors = embeddings
+        if dim is not None:
+            vectors = EmbeddingProjection.fit(embeddings, dim).transform(embeddings)
+        stored = vectors.astype(dtype)
+        vectors = stored.astype(np.float32)
+
+        labels = backend.fit_predict(vectors)
+        pairs, similarity = same_person(vectors, args.eps)
+        recall, precision = neighbor_recall(embeddings, vectors, args.eps)
+        passes = min(recall, precision) >= FACE_PROJECTION_MIN_RECALL
+        name = f"{dtype}/{dim or embeddings.shape[1]}"
+        print(
+            f"{name:>14} {stored.nbytes // len(stored):>10} "
+            f"{adjusted_rand_score(full_labels, labels):>11.3f} "
+            f"{np.mean(pairs == full_pairs):>9.3f} {recall:>6.3f} "
+            f"{precision:>9.3f} {'pass' if passes else 'fail':>5} "
+            f"{adjusted_rand_score(people, labels):>10.3f} "
+            f"{nearest_neighbor_accuracy(similarity, people):>8.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
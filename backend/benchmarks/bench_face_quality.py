@@ -0,0 +1,119 @@
+"""
+Embedding count and latency saved by the face quality filter on group
+images.
+
+Every image is run through the face detector with the thresholds of
+`detect_faces`, then the faces are cropped and embedded twice: all faces
+scoring above 0.3, as before the filter, and only those `select_faces`
+keeps with the FACE_MIN_* settings. Detection time is the same for both and
+left out.
+
+Usage:
+    python -m benchmarks.bench_face_quality [--images three_khans.png ...]
+"""
+
+import argparse
+import os
+import time
+
+import cv2
+
+from app.config.settings import (
+    DEFAULT_FACE_DETECTION_MODEL,
+    FACE_MIN_SCORE,
+    FACE_MIN_SHARPNESS,
+    FACE_MIN_SIZE,
+    TEST_INPUT_PATH,
+)
+from app.facenet.facenet import get_face_embeddings, select_faces
+from app.facenet.quality import count_reasons
+from app.utils.image_loader import NO_SCALE, crop_region
+from app.yolov8.YOLOv8 import get_detector
+
+GROUP_IMAGES = [
+    "three_khans.png",
+    "test_2_faces.png",
+    "zidane.jpg",
+    "000000000009.jpg",
+    "000000000025.jpg",
+    "000000000030.jpg",
+    "000000000034.jpg",
+]
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def embed_all(image, boxes, scores):
+    crops = [
+        crop_region(image, box, 20) for box, score in zip(boxes, scores) if score > 0.3
+    ]
+    return len(get_face_embeddings(crops))
+
+
+def embed_selected(path, image, boxes, scores):
+    crops, _, _, skipped = select_faces(path, image, NO_SCALE, boxes, scores)
+    return len(get_face_embeddings(crops)), skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--input-dir", default=TEST_INPUT_PATH)
+    parser.add_argument("--images", nargs="+", default=GROUP_IMAGES)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    detector = get_detector(
+        DEFAULT_FACE_DETECTION_MODEL, conf_thres=0.35, iou_thres=0.45
+    )
+    print(
+        f"min score {FACE_MIN_SCORE}, min size {FACE_MIN_SIZE}px, "
+        f"min sharpness {FACE_MIN_SHARPNESS}"
+    )
+    print(
+        f"{'image':>20} {'faces':>5} {'embedded':>8} {'before ms':>9} "
+        f"{'after ms':>8}  skipped"
+    )
+    totals = [0, 0, 0.0, 0.0]
+    skipped_total = []
+    for name in args.images:
+        path = os.path.join(args.input_dir, name)
+        image = cv2.imread(path)
+        if image is None:
+            print(f"Failed to load image: {path}")
+            continue
+        boxes, scores, _ = detector(image)
+        # Warm-up, so model loading is not timed
+        embed_all(image, boxes, scores)
+
+        before_ms = after_ms = 0.0
+        for _ in range(args.repeats):
+            before, elapsed = timed(embed_all, image, boxes, scores)
+            before_ms += elapsed / args.repeats
+            (after, skipped), elapsed = timed(
+                embed_selected, path, image, boxes, scores
+            )
+            after_ms += elapsed / args.repeats
+
+        print(
+            f"{name:>20} {before:>5} {after:>8} {before_ms:>9.1f} "
+            f"{after_ms:>8.1f}  {count_reasons(skipped) or '-'}"
+        )
+        for i, value in enumerate((before, after, before_ms, after_ms)):
+            totals[i] += value
+        skipped_total.extend(skipped)
+
+    before, after, before_ms, after_ms = totals
+    if before:
+        print(
+            f"embedded {after}/{before} faces ({1 - after / before:.0%} fewer), "
+            f"{after_ms:.1f}/{before_ms:.1f}ms ({1 - after_ms / before_ms:.0%} "
+            f"faster); skipped {count_reasons(skipped_total)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
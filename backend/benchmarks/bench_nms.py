@@ -0,0 +1,104 @@
+"""
+Micro-benchmark of the vectorized YOLOv8 NMS against the previous
+sequential implementation.
+
+Usage:
+    python -m benchmarks.bench_nms [--candidates 50 200 800] [--repeat 20]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from app.yolov8.utils import compute_iou, multiclass_nms
+
+
+def nms_reference(boxes, scores, iou_threshold):
+    # Sequential implementation the vectorized engine replaced
+    sorted_indices = np.argsort(scores)[::-1]
+
+    keep_boxes = []
+    while sorted_indices.size > 0:
+        box_id = sorted_indices[0]
+        keep_boxes.append(box_id)
+
+        ious = compute_iou(boxes[box_id, :], boxes[sorted_indices[1:], :])
+        keep_indices = np.where(ious < iou_threshold)[0]
+        sorted_indices = sorted_indices[keep_indices + 1]
+
+    return keep_boxes
+
+
+def multiclass_nms_reference(boxes, scores, class_ids, iou_threshold):
+    unique_class_ids = np.unique(class_ids)
+
+    keep_boxes = []
+    for class_id in unique_class_ids:
+        class_indices = np.where(class_ids == class_id)[0]
+        class_boxes = boxes[class_indices, :]
+        class_scores = scores[class_indices]
+
+        class_keep_boxes = nms_reference(class_boxes, class_scores, iou_threshold)
+        keep_boxes.extend(class_indices[class_keep_boxes])
+
+    return keep_boxes
+
+
+def crowded_scene(num_candidates, num_classes=5, seed=0):
+    """
+    Random candidates clustered around a few objects, like raw YOLOv8 output
+    of a crowded photo.
+    """
+    rng = np.random.default_rng(seed)
+    num_objects = max(1, num_candidates // 8)
+    centers = rng.uniform(0, 640, size=(num_objects, 2))
+    sizes = rng.uniform(20, 120, size=(num_objects, 2))
+
+    owner = rng.integers(0, num_objects, size=num_candidates)
+    xy = centers[owner] + rng.normal(0, 6, size=(num_candidates, 2))
+    wh = sizes[owner] * rng.uniform(0.85, 1.15, size=(num_candidates, 2))
+    boxes = np.concatenate([xy - wh / 2, xy + wh / 2], axis=1).astype(np.float32)
+
+    scores = rng.uniform(0.4, 1.0, size=num_candidates).astype(np.float32)
+    class_ids = rng.integers(0, num_classes, size=num_objects)[owner]
+    return boxes, scores, class_ids
+
+
+def time_call(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--candidates", type=int, nargs="+", default=[50, 200, 800])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--iou", type=float, default=0.5)
+    args = parser.parse_args()
+
+    print(f"{'candidates':>10} {'kept':>6} {'reference ms':>13} {'vectorized ms':>14}")
+    for num_candidates in args.candidates:
+        boxes, scores, class_ids = crowded_scene(num_candidates)
+
+        expected = multiclass_nms_reference(boxes, scores, class_ids, args.iou)
+        actual = multiclass_nms(boxes, scores, class_ids, args.iou)
+        assert list(actual) == list(expected), "vectorized NMS result differs"
+
+        reference_ms = time_call(
+            lambda: multiclass_nms_reference(boxes, scores, class_ids, args.iou),
+            args.repeat,
+        )
+        vectorized_ms = time_call(
+            lambda: multiclass_nms(boxes, scores, class_ids, args.iou), args.repeat
+        )
+        print(
+            f"{num_candidates:>10} {len(expected):>6} "
+            f"{reference_ms:>13.3f} {vectorized_ms:>14.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Micro-benchmark of the buffer-reusing YOLOv8 input preparation against the
+previous cvtColor / resize / divide / transpose / astype chain.
+
+Usage:
+    python -m benchmarks.bench_preprocess [--sizes 640x480 4000x3000] [--repeat 30]
+"""
+
+import argparse
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from app.yolov8.utils import prepare_input_tensor
+
+
+def prepare_input_reference(image, width, height):
+    # Previous YOLOv8.prepare_input
+    input_img = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    input_img = cv2.resize(input_img, (width, height))
+    input_img = input_img / 255.0
+    input_img = input_img.transpose(2, 0, 1)
+    return input_img[np.newaxis, :, :, :].astype(np.float32)
+
+
+def time_call(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def peak_numpy_allocation_mb(func):
+    # Only NumPy allocations are traced; OpenCV's own buffers are not counted
+    func()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", nargs="+", default=["640x480", "4000x3000"])
+    parser.add_argument("--input", type=int, default=640)
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(
+        f"{'image':>10} {'reference ms':>13} {'buffered ms':>12} "
+        f"{'reference MB':>13} {'buffered MB':>12}"
+    )
+    for size in args.sizes:
+        width, height = (int(v) for v in size.split("x"))
+        image = rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+
+        def reference():
+            return prepare_input_reference(image, args.input, args.input)
+
+        def buffered():
+            return prepare_input_tensor(image, args.input, args.input)
+
+        max_error = np.abs(reference() - buffered()).max()
+        assert max_error <= 1e-6, f"buffered preprocessing differs by {max_error}"
+
+        print(
+            f"{size:>10} {time_call(reference, args.repeat):>13.3f} "
+            f"{time_call(buffered, args.repeat):>12.3f} "
+            f"{peak_numpy_allocation_mb(reference):>13.2f} "
+            f"{peak_numpy_allocation_mb(buffered):>12.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
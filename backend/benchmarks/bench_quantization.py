@@ -0,0 +1,225 @@
+"""
+Accuracy/speed gate for the INT8 variants of the object detection, face
+detection and FaceNet models.
+
+Runs every image in tests/inputs through the float and the quantized model
+and reports latency, detection agreement (class sets and matched box IoU)
+and embedding cosine drift. The result is written to the quantization
+report; `ONNX_QUANTIZATION` only switches to variants recorded as passing.
+
+Usage:
+    python -m benchmarks.bench_quantization [--mode dynamic|static] [--quantize]
+"""
+
+import argparse
+import os
+import time
+
+import cv2
+import numpy as np
+
+from app.config.settings import (
+    DEFAULT_FACE_DETECTION_MODEL,
+    DEFAULT_FACENET_MODEL,
+    DEFAULT_OBJ_DETECTION_MODEL,
+    QUANTIZATION_MAX_EMBEDDING_DRIFT,
+    QUANTIZATION_MIN_BOX_IOU,
+    QUANTIZATION_MIN_CLASS_AGREEMENT,
+    QUANTIZATION_MIN_SPEEDUP,
+    QUANTIZATION_REPORT_PATH,
+    TEST_INPUT_PATH,
+)
+from app.facenet.preprocess import normalize_embeddings, preprocess_images
+from app.utils.onnx_manager import get_session
+from app.utils.quantization import (
+    load_report,
+    quantize_model,
+    quantized_model_path,
+    save_report,
+)
+from app.yolov8.YOLOv8 import YOLOv8
+from app.yolov8.utils import compute_iou, prepare_input_tensor
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+# Thresholds the ingestion pipeline uses for each detector
+DETECTORS = {
+    "objects": (DEFAULT_OBJ_DETECTION_MODEL, 0.4, 0.5),
+    "faces": (DEFAULT_FACE_DETECTION_MODEL, 0.35, 0.45),
+}
+
+
+def load_images(input_dir):
+    images = []
+    for name in sorted(os.listdir(input_dir)):
+        if name.lower().endswith(IMAGE_EXTENSIONS):
+            image = cv2.imread(os.path.join(input_dir, name))
+            if image is not None:
+                images.append(image)
+    return images
+
+
+def face_crops(images):
+    # Faces found by the float face detector, or the whole image if none
+    model_path, conf_thres, iou_thres = DETECTORS["faces"]
+    detector = YOLOv8(model_path, conf_thres=conf_thres, iou_thres=iou_thres)
+    crops = []
+    for image in images:
+        boxes, _, _ = detector(image)
+        found = [
+            image[max(0, int(y1)) : int(y2), max(0, int(x1)) : int(x2)]
+            for x1, y1, x2, y2 in boxes
+        ]
+        found = [crop for crop in found if crop.size]
+        crops.extend(found or [image])
+    return crops
+
+
+def calibration_tensors(model_path, images):
+    if model_path == DEFAULT_FACENET_MODEL:
+        return [preprocess_images([crop]) for crop in face_crops(images)]
+    shape = get_session(model_path).get_inputs()[0].shape
+    # Copies, the preprocessing buffer is reused on every call
+    return [prepare_input_tensor(image, shape[3], shape[2]).copy() for image in images]
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def match_iou(reference_boxes, reference_classes, boxes, classes):
+    # Best IoU of every reference detection with a same-class detection
+    ious = []
+    for box, class_id in zip(reference_boxes, reference_classes):
+        same_class = np.asarray(classes) == class_id
+        if not same_class.any():
+            ious.append(0.0)
+            continue
+        ious.append(float(compute_iou(box, np.asarray(boxes)[same_class]).max()))
+    return ious
+
+
+def compare_detectors(model_path, quantized_path, conf_thres, iou_thres, images):
+    reference = YOLOv8(model_path, conf_thres=conf_thres, iou_thres=iou_thres)
+    candidate = YOLOv8(quantized_path, conf_thres=conf_thres, iou_thres=iou_thres)
+
+    agreements, ious, reference_ms, candidate_ms = [], [], [], []
+    for image in images:
+        (ref_boxes, _, ref_classes), ms = timed(reference, image)
+        reference_ms.append(ms)
+        (boxes, _, classes), ms = timed(candidate, image)
+        candidate_ms.append(ms)
+
+        agreements.append(set(ref_classes) == set(classes))
+        ious.extend(match_iou(ref_boxes, ref_classes, boxes, classes))
+
+    return {
+        "reference_ms": float(np.mean(reference_ms)),
+        "quantized_ms": float(np.mean(candidate_ms)),
+        "class_agreement": float(np.mean(agreements)),
+        "mean_box_iou": float(np.mean(ious)) if ious else 1.0,
+    }
+
+
+def compare_embeddings(model_path, quantized_path, images):
+    crops = face_crops(images)
+    reference = get_session(model_path, ["CPUExecutionProvider"])
+    candidate = get_session(quantized_path, ["CPUExecutionProvider"])
+    input_name = reference.get_inputs()[0].name
+
+    drifts, reference_ms, candidate_ms = [], [], []
+    for crop in crops:
+        batch = preprocess_images([crop])
+        ref, ms = timed(reference.run, None, {input_name: batch})
+        reference_ms.append(ms)
+        out, ms = timed(candidate.run, None, {input_name: batch})
+        candidate_ms.append(ms)
+
+        cosine = np.sum(normalize_embeddings(ref[0]) * normalize_embeddings(out[0]))
+        drifts.append(1.0 - float(cosine))
+
+    return {
+        "reference_ms": float(np.mean(reference_ms)),
+        "quantized_ms": float(np.mean(candidate_ms)),
+        "mean_cosine_drift": float(np.mean(drifts)),
+        "max_cosine_drift": float(np.max(drifts)),
+    }
+
+
+def passes_gate(metrics, args):
+    speedup = metrics["reference_ms"] / max(metrics["quantized_ms"], 1e-9)
+    metrics["speedup"] = speedup
+    if speedup < args.min_speedup:
+        return False
+    if "mean_cosine_drift" in metrics:
+        return metrics["mean_cosine_drift"] <= args.max_embedding_drift
+    return (
+        metrics["class_agreement"] >= args.min_class_agreement
+        and metrics["mean_box_iou"] >= args.min_box_iou
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--mode", choices=["dynamic", "static"], default="dynamic")
+    parser.add_argument(
+        "--quantize", action="store_true", help="(re)create the INT8 models first"
+    )
+    parser.add_argument("--inputs", default=TEST_INPUT_PATH)
+    parser.add_argument("--report", default=QUANTIZATION_REPORT_PATH)
+    parser.add_argument(
+        "--min-class-agreement", type=float, default=QUANTIZATION_MIN_CLASS_AGREEMENT
+    )
+    parser.add_argument("--min-box-iou", type=float, default=QUANTIZATION_MIN_BOX_IOU)
+    parser.add_argument(
+        "--max-embedding-drift", type=float, default=QUANTIZATION_MAX_EMBEDDING_DRIFT
+    )
+    parser.add_argument("--min-speedup", type=float, default=QUANTIZATION_MIN_SPEEDUP)
+    args = parser.parse_args()
+
+    images = load_images(args.inputs)
+    models = [path for path, _, _ in DETECTORS.values()] + [DEFAULT_FACENET_MODEL]
+
+    if args.quantize:
+        for model_path in models:
+            tensors = None
+            if args.mode == "static":
+                tensors = calibration_tensors(model_path, images)
+            quantize_model(model_path, args.mode, calibration_tensors=tensors)
+
+    report = load_report(args.report)
+    for model_path in models:
+        quantized_path = quantized_model_path(model_path, args.mode)
+        if not os.path.exists(quantized_path):
+            print(f"{quantized_path} not found, run with --quantize")
+            continue
+
+        if model_path == DEFAULT_FACENET_MODEL:
+            metrics = compare_embeddings(model_path, quantized_path, images)
+        else:
+            _, conf_thres, iou_thres = next(
+                entry for entry in DETECTORS.values() if entry[0] == model_path
+            )
+            metrics = compare_detectors(
+                model_path, quantized_path, conf_thres, iou_thres, images
+            )
+
+        passed = passes_gate(metrics, args)
+        report[os.path.basename(quantized_path)] = {
+            "model": model_path,
+            "mode": args.mode,
+            "mtime_ns": os.stat(quantized_path).st_mtime_ns,
+            "passed": passed,
+            "metrics": metrics,
+        }
+        summary = ", ".join(f"{key}={value:.4f}" for key, value in metrics.items())
+        print(f"{quantized_path}: {'PASS' if passed else 'FAIL'} ({summary})")
+
+    save_report(report, args.report)
+    print(f"Wrote {args.report}")
+
+
+if __name__ == "__main__":
+    main()
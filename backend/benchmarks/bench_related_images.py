@@ -0,0 +1,62 @@
+"""
+Latency of related-image queries on synthetic 512-d face embeddings.
+
+Queries different images each time, so no result comes from the per-view
+cache. The first query of a view also indexes the faces by image and is
+reported separately.
+
+Usage:
+    python -m benchmarks.bench_related_images [--faces 100000] [--limit 20]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from app.facecluster.facecluster import ClusterView
+from benchmarks.bench_ann import synthetic_embeddings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--faces", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--faces-per-image", type=int, default=2)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--eps", type=float, default=0.3)
+    args = parser.parse_args()
+
+    embeddings = synthetic_embeddings(args.faces, args.dim, 20, 0.04, seed=0)
+    image_ids = [i // args.faces_per_image for i in range(args.faces)]
+    view = ClusterView(
+        embeddings,
+        np.linalg.norm(embeddings, axis=1),
+        image_ids,
+        np.full(args.faces, -1),
+        args.eps,
+    )
+    num_images = image_ids[-1] + 1
+
+    start = time.perf_counter()
+    view.related_images(0, args.limit)
+    first_ms = (time.perf_counter() - start) * 1000
+
+    rng = np.random.default_rng(1)
+    latencies = []
+    for image_id in rng.choice(num_images, size=args.queries, replace=False):
+        start = time.perf_counter()
+        related = view.related_images(int(image_id), args.limit)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    print(f"{args.faces} faces, {num_images} images, limit {args.limit}")
+    print(f"first query: {first_ms:.1f}ms")
+    print(
+        f"query: p50 {np.percentile(latencies, 50):.2f}ms, "
+        f"p95 {np.percentile(latencies, 95):.2f}ms, last returned {len(related)}"
+    )
+
+
+if __name__ == "__main__":
+    main()
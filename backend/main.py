@@ -2,8 +2,12 @@
 This module contains the main FastAPI application.
 """
 
+from app.startup_clock import STARTUP_START  # Imported first to time startup
+import time  # For startup timing
+
 from uvicorn import Config, Server  # Uvicorn used to run the ASGI server
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware  # Enables cross-origin requests
 
 from contextlib import (
@@ -19,6 +23,7 @@ from app.database.folders import create_folders_table
 
 # Face clustering init functions
 from app.facecluster.init_face_cluster import get_face_cluster, init_face_cluster
+from app.facecluster.recluster import stop_reclusterer
 
 # Routers (modular route handling)
 from app.routes.test import router as test_router
@@ -29,8 +34,17 @@ from app.routes.facetagging import router as tagging_router
 import multiprocessing  # For safe multiprocessing on Windows
 from app.scheduler import start_scheduler  # Background scheduler tasks
 from app.custom_logging import CustomizeLogger  # Custom logging setup
+from app.config.settings import WARM_UP_MODELS
+from app.utils.model_warmup import (
+    readiness,
+    record_timing,
+    set_warmup_status,
+    start_warm_up,
+)  # Background model loading and readiness reporting
 import os  # For directory handling
 
+record_timing("imports", STARTUP_START)
+
 # Create a thumbnails directory if it doesn't exist
 thumbnails_dir = os.path.join("images", "PictoPy.thumbnails")
 os.makedirs(thumbnails_dir, exist_ok=True)
@@ -39,6 +53,8 @@ os.makedirs(thumbnails_dir, exist_ok=True)
 # Define application lifespan: runs on startup and shutdown
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    lifespan_start = time.perf_counter()
+
     # Initialize DB tables and data
     create_YOLO_mappings()
     create_faces_table()
@@ -51,12 +67,23 @@ async def lifespan(app: FastAPI):
     cleanup_face_embeddings()
     init_face_cluster()
 
+    # Models load lazily; optionally warm them up without blocking startup
+    if WARM_UP_MODELS:
+        start_warm_up()
+    else:
+        set_warmup_status("disabled")
+
+    record_timing("lifespan", lifespan_start)
+    record_timing("startup", STARTUP_START)
+
     yield  # ⏸ Wait here until app is shutting down
 
     # On shutdown, save current face cluster state
+    stop_reclusterer()
     face_cluster = get_face_cluster()
     if face_cluster:
         face_cluster.save_to_db()
+        face_cluster.save_snapshot()
 
 
 # Create FastAPI app instance with lifecycle hooks
@@ -82,6 +109,13 @@ async def root():
     return {"message": "PictoPy Server is up and running!"}
 
 
+# Readiness route: loaded models, warm-up state and startup timings
+@app.get("/ready")
+async def ready():
+    report = readiness()
+    return JSONResponse(status_code=200 if report["ready"] else 503, content=report)
+
+
 # Include route modules with prefixes and tags
 app.include_router(test_router, prefix="/test", tags=["Test"])
 app.include_router(images_router, prefix="/images", tags=["Images"])
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from app.facecluster import facecluster as facecluster_module
+
+
+@pytest.fixture
+def clustered_embeddings():
+    """
+    Factory of (count, dim) float32 face embeddings of `num_people` random
+    people, each face its person's center plus noise of scale `spread`.
+    With `balanced`, the people take turns so all of them have faces.
+    """
+
+    def make(rng, count, dim=32, num_people=15, spread=0.45, balanced=False):
+        centers = rng.normal(size=(num_people, dim))
+        if balanced:
+            owners = np.arange(count) % num_people
+        else:
+            owners = rng.integers(0, num_people, size=count)
+        noise = rng.normal(scale=spread, size=(count, dim))
+        return (centers[owners] + noise).astype(np.float32)
+
+    return make
+
+
+@pytest.fixture
+def face_library():
+    """
+    Factory of face embeddings by image, {"img0": (faces, dim) array, ...},
+    with `faces_per_image` faces each or, if None, 1 to 4.
+    """
+
+    def make(rng, num_images, faces_per_image=2, dim=16, num_people=5, spread=0.1):
+        centers = rng.normal(size=(num_people, dim))
+        if faces_per_image is None:
+            counts = rng.integers(1, 5, size=num_images)
+        else:
+            counts = np.full(num_images, faces_per_image)
+        owners = rng.integers(0, num_people, size=counts.sum())
+        noise = rng.normal(scale=spread, size=(counts.sum(), dim))
+        embeddings = (centers[owners] + noise).astype(np.float32)
+        faces = np.split(embeddings, np.cumsum(counts)[:-1])
+        return {f"img{i}": image_faces for i, image_faces in enumerate(faces)}
+
+    return make
+
+
+@pytest.fixture
+def image_ids_as_paths(monkeypatch):
+    """Let FaceCluster use image paths as their image IDs."""
+    monkeypatch.setattr(facecluster_module, "get_id_from_path", lambda path: path)
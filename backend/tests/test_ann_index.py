@@ -0,0 +1,145 @@
+import numpy as np
+from sklearn.metrics.pairwise import cosine_distances
+
+from app.facecluster import facecluster as facecluster_module
+from app.facecluster.ann_index import ExactIndex, IVFFlatIndex, make_index
+from app.facecluster.facecluster import FaceCluster
+
+EPS = 0.3
+PEOPLE = dict(dim=64, num_people=40, spread=0.35)
+
+
+def brute_radius(query, embeddings, eps=EPS):
+    distances = cosine_distances(query.reshape(1, -1), embeddings)[0]
+    return np.flatnonzero(distances <= eps)
+
+
+def test_exact_index_matches_brute_force(clustered_embeddings):
+    rng = np.random.default_rng(0)
+    embeddings = clustered_embeddings(rng, 500, **PEOPLE)
+    index = ExactIndex()
+    index.add(np.arange(len(embeddings)), embeddings)
+
+    for query in embeddings[:20]:
+        keys, _ = index.radius(query, EPS)
+        np.testing.assert_array_equal(keys, brute_radius(query, embeddings))
+
+        keys, distances = index.knn(query, 5)
+        expected = np.argsort(cosine_distances(query.reshape(1, -1), embeddings)[0])
+        assert set(keys) == set(expected[:5])
+        assert np.all(np.diff(distances) >= 0)
+
+
+def test_removed_keys_are_not_returned(clustered_embeddings):
+    rng = np.random.default_rng(1)
+    embeddings = clustered_embeddings(rng, 200, **PEOPLE)
+    index = ExactIndex()
+    index.add(np.arange(200), embeddings)
+
+    # Removing most keys also compacts the storage
+    removed = np.arange(0, 200, 3).tolist() + list(range(100, 200))
+    index.remove(removed)
+    kept = np.setdiff1d(np.arange(200), removed)
+
+    assert len(index) == len(kept)
+    for query in embeddings[:10]:
+        keys, _ = index.radius(query, EPS)
+        expected = kept[brute_radius(query, embeddings[kept])]
+        np.testing.assert_array_equal(keys, expected)
+
+
+def test_trained_ivf_in_exact_mode_matches_brute_force(clustered_embeddings):
+    rng = np.random.default_rng(2)
+    embeddings = clustered_embeddings(rng, 1200, **PEOPLE)
+    index = IVFFlatIndex(nlist=16, nprobe=2, exact=True, min_train_size=256)
+    index.add(np.arange(800), embeddings[:800])
+    index.add(np.arange(800, 1200), embeddings[800:])
+    assert index.trained
+
+    for query in rng.choice(len(embeddings), size=30, replace=False):
+        keys, _ = index.radius(embeddings[query], EPS)
+        np.testing.assert_array_equal(keys, brute_radius(embeddings[query], embeddings))
+
+
+def test_batched_radius_matches_single_queries(clustered_embeddings):
+    rng = np.random.default_rng(6)
+    embeddings = clustered_embeddings(rng, 1200, **PEOPLE)
+    for index in (ExactIndex(), IVFFlatIndex(nlist=16, nprobe=2, min_train_size=256)):
+        index.add(np.arange(len(embeddings)), embeddings)
+        index.remove(range(0, len(embeddings), 5))
+
+        queries = embeddings[rng.choice(len(embeddings), size=100, replace=False)]
+        found = index.radius_batch(queries, EPS, exact=True)
+        for query, keys in zip(queries, found):
+            np.testing.assert_array_equal(keys, index.radius(query, EPS, exact=True)[0])
+
+
+def test_ivf_recall(clustered_embeddings):
+    rng = np.random.default_rng(3)
+    embeddings = clustered_embeddings(rng, 3000, **PEOPLE)
+    index = make_index("ivf", nprobe=8, min_train_size=1000)
+    index.add(np.arange(len(embeddings)), embeddings)
+
+    found = expected = 0
+    for query in embeddings[rng.choice(len(embeddings), size=50, replace=False)]:
+        keys, _ = index.radius(query, EPS)
+        truth = brute_radius(query, embeddings)
+        found += len(np.intersect1d(keys, truth))
+        expected += len(truth)
+
+    assert found / expected >= 0.95
+
+
+def test_face_cluster_related_images_match_radius_search(
+    tmp_path, clustered_embeddings, image_ids_as_paths
+):
+    rng = np.random.default_rng(4)
+    embeddings = clustered_embeddings(rng, 120, **PEOPLE)
+    paths = [f"img{i // 2}" for i in range(len(embeddings))]
+
+    cluster = FaceCluster(eps=EPS, db_path=tmp_path / "faces.db", index="exact")
+    cluster.fit(list(embeddings), paths)
+    cluster.remove_image("img3")
+    cluster.add_face(embeddings[6], "new")
+
+    current = [i for i, path in enumerate(paths) if path != "img3"] + [6]
+    current_paths = [paths[i] for i in current[:-1]] + ["new"]
+    related = set()
+    for row in brute_radius(embeddings[6], embeddings[current]):
+        if current_paths[row] != "new":
+            related.add(current_paths[row])
+
+    assert {image_id for image_id, _ in cluster.get_related_images("new")} == related
+
+
+def test_face_cluster_assigns_faces_next_to_an_emptied_bucket(
+    tmp_path, monkeypatch, clustered_embeddings, image_ids_as_paths
+):
+    # Always look up the nearest face, through a single probed bucket
+    monkeypatch.setattr(facecluster_module, "FACE_CENTROID_MARGIN", 2.0)
+    make = facecluster_module.make_index
+    monkeypatch.setattr(
+        facecluster_module,
+        "make_index",
+        lambda kind, nprobe: make(kind, nlist=4, nprobe=1, min_train_size=100),
+    )
+    embeddings = clustered_embeddings(np.random.default_rng(5), 300, **PEOPLE)
+    paths = [f"img{i}" for i in range(len(embeddings))]
+    cluster = FaceCluster(
+        eps=EPS, db_path=tmp_path / "faces.db", incremental=False, snapshot=False
+    )
+    cluster.fit(list(embeddings), paths)
+    index = cluster.index
+    assert index.trained
+
+    # Tombstone every face of the bucket the query probes
+    query = embeddings[0]
+    bucket = int(np.argmax(index._centroids @ (query / np.linalg.norm(query))))
+    emptied = index._keys[index._list(bucket)]
+    for row in cluster.store.rows_for_keys(emptied).tolist():
+        cluster.remove_image(paths[row])
+    assert len(index.knn(query, 1)[0]) == 0
+
+    cluster.add_faces(query.reshape(1, -1), ["new"])
+
+    assert cluster.image_ids[-1] == "new"
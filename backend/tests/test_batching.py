@@ -0,0 +1,106 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.utils.batching import InferenceBatcher
+
+
+class FakeSession:
+    """Minimal stand-in for an ONNX runtime session that doubles its input."""
+
+    def __init__(self, batch_dim="batch"):
+        self.batch_dim = batch_dim
+        self.batch_sizes = []
+        self.lock = threading.Lock()
+
+    def get_inputs(self):
+        return [SimpleNamespace(name="input", shape=[self.batch_dim, 3])]
+
+    def get_outputs(self):
+        return [SimpleNamespace(name="output")]
+
+    def run(self, output_names, feeds):
+        batch = feeds["input"]
+        if isinstance(self.batch_dim, int):
+            assert len(batch) == self.batch_dim
+        with self.lock:
+            self.batch_sizes.append(len(batch))
+        return [batch * 2]
+
+
+def run_concurrently(batcher, count):
+    inputs = [np.full((1, 3), i, dtype=np.float32) for i in range(count)]
+    with ThreadPoolExecutor(max_workers=count) as pool:
+        results = list(pool.map(batcher.run, inputs))
+    return inputs, results
+
+
+def test_concurrent_requests_are_merged():
+    session = FakeSession()
+    batcher = InferenceBatcher(session, max_batch_size=8, max_wait_ms=50)
+
+    inputs, results = run_concurrently(batcher, 16)
+
+    for tensor, outputs in zip(inputs, results):
+        np.testing.assert_array_equal(outputs[0], tensor * 2)
+    assert sum(session.batch_sizes) == 16
+    assert len(session.batch_sizes) < 16
+
+
+def test_multi_item_requests_are_split_back():
+    session = FakeSession()
+    batcher = InferenceBatcher(session, max_batch_size=8, max_wait_ms=5)
+
+    tensor = np.arange(12, dtype=np.float32).reshape(4, 3)
+    outputs = batcher.run(tensor)
+
+    assert outputs[0].shape == (4, 3)
+    np.testing.assert_array_equal(outputs[0], tensor * 2)
+
+
+def test_static_batch_models_are_padded():
+    session = FakeSession(batch_dim=4)
+    batcher = InferenceBatcher(session, max_batch_size=8, max_wait_ms=50)
+
+    inputs, results = run_concurrently(batcher, 6)
+
+    for tensor, outputs in zip(inputs, results):
+        np.testing.assert_array_equal(outputs[0], tensor * 2)
+    assert set(session.batch_sizes) == {4}
+
+
+def test_batch_of_one_models_run_in_the_callers_thread():
+    session = FakeSession(batch_dim=1)
+    batcher = InferenceBatcher(session, max_batch_size=8, max_wait_ms=50)
+
+    inputs, results = run_concurrently(batcher, 6)
+
+    for tensor, outputs in zip(inputs, results):
+        np.testing.assert_array_equal(outputs[0], tensor * 2)
+    # Requests of several items are fed to the model one item at a time
+    tensor = np.arange(12, dtype=np.float32).reshape(4, 3)
+    np.testing.assert_array_equal(batcher.run(tensor)[0], tensor * 2)
+    assert set(session.batch_sizes) == {1}
+    assert batcher._worker is None
+
+
+def test_batching_can_be_disabled():
+    session = FakeSession()
+    batcher = InferenceBatcher(session, max_batch_size=1)
+
+    outputs = batcher.run(np.ones((1, 3), dtype=np.float32))
+
+    np.testing.assert_array_equal(outputs[0], np.full((1, 3), 2))
+    assert batcher._worker is None
+
+
+def test_errors_reach_every_caller():
+    session = FakeSession()
+    session.run = lambda *args: (_ for _ in ()).throw(RuntimeError("boom"))
+    batcher = InferenceBatcher(session, max_batch_size=4, max_wait_ms=5)
+
+    with pytest.raises(RuntimeError, match="boom"):
+        batcher.run(np.ones((1, 3), dtype=np.float32))
@@ -0,0 +1,87 @@
+import numpy as np
+from fastapi.testclient import TestClient
+
+from app.facecluster.centroids import ClusterCentroids
+from app.facecluster.facecluster import FaceCluster
+from app.routes import facetagging
+from main import app
+
+PEOPLE = dict(dim=16, num_people=5, spread=0.1, balanced=True)
+
+
+def assert_same_centroids(actual, expected):
+    assert actual.keys() == expected.keys()
+    for label, (centroid, count) in expected.items():
+        np.testing.assert_allclose(actual[label][0], centroid, atol=1e-5)
+        assert actual[label][1] == count
+
+
+def test_updates_match_rebuild(clustered_embeddings):
+    rng = np.random.default_rng(0)
+    embeddings = clustered_embeddings(rng, 60, **PEOPLE)
+    labels = np.arange(60) % 5
+    labels[:6] = -1
+
+    centroids = ClusterCentroids()
+    centroids.rebuild(embeddings, labels)
+    moved = labels.copy()
+    moved[10:20] = 4
+    moved[20:25] = -1
+    centroids.update(embeddings, labels, moved)
+    centroids.update(embeddings[moved == 0], 0, -1)
+
+    moved[moved == 0] = -1
+    expected = ClusterCentroids()
+    expected.rebuild(embeddings, moved)
+    assert_same_centroids(centroids.centroids(), expected.centroids())
+    assert 0 not in centroids.centroids()
+
+
+def test_no_clusters_have_no_centroids(
+    tmp_path, monkeypatch, clustered_embeddings, image_ids_as_paths
+):
+    assert ClusterCentroids().centroids() == {}
+    noise = ClusterCentroids()
+    noise.rebuild(
+        clustered_embeddings(np.random.default_rng(3), 4, **PEOPLE), np.full(4, -1)
+    )
+    assert noise.centroids() == {}
+    assert noise.nearest(np.ones(16)) is None
+
+    cluster = FaceCluster(db_path=tmp_path / "faces.db")
+    monkeypatch.setattr(facetagging, "get_face_cluster", lambda: cluster)
+    response = TestClient(app).get("/tag/cluster-centroids")
+
+    assert response.status_code == 200
+    assert response.json()["centroids"] == []
+
+
+def test_face_cluster_keeps_centroids_current(
+    tmp_path, clustered_embeddings, image_ids_as_paths
+):
+    embeddings = clustered_embeddings(np.random.default_rng(1), 80, **PEOPLE)
+
+    for incremental in (True, False):
+        cluster = FaceCluster(db_path=tmp_path / "faces.db", incremental=incremental)
+        cluster.fit(list(embeddings[:40]), [f"img{i}" for i in range(40)])
+        for i in range(40, 80):
+            cluster.add_face(embeddings[i], f"img{i}", save=False)
+        for i in range(0, 80, 7):
+            cluster.remove_image(f"img{i}")
+
+        expected = ClusterCentroids()
+        expected.rebuild(cluster.embeddings, cluster.labels)
+        assert_same_centroids(cluster.get_centroids(), expected.centroids())
+
+
+def test_identify_returns_the_cluster_of_a_known_person(
+    tmp_path, clustered_embeddings, image_ids_as_paths
+):
+    embeddings = clustered_embeddings(np.random.default_rng(2), 50, **PEOPLE)
+    cluster = FaceCluster(db_path=tmp_path / "faces.db")
+    cluster.fit(list(embeddings), [f"img{i}" for i in range(50)])
+
+    label, distance = cluster.identify(embeddings[3])
+    assert label == cluster.labels[3]
+    assert distance <= cluster.eps
+    assert cluster.identify(-embeddings[3]) is None
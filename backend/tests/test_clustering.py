@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+from sklearn.cluster import DBSCAN
+
+from app.facecluster.clustering import (
+    ShardedDBSCANBackend,
+    SparseGraphDBSCANBackend,
+    coarse_cells,
+    eps_neighborhood_graph,
+    make_backend,
+    shard_rows,
+)
+from app.facecluster.incremental_dbscan import normalize_rows
+
+EPS = 0.3
+MIN_SAMPLES = 3
+
+
+@pytest.mark.parametrize("block_size", [64, 2048])
+def test_sparse_backend_matches_dbscan(block_size, clustered_embeddings):
+    embeddings = clustered_embeddings(np.random.default_rng(0), 900)
+    embeddings[10] = embeddings[20]  # duplicate faces are neighbors too
+
+    labels = SparseGraphDBSCANBackend(
+        EPS, MIN_SAMPLES, block_size=block_size
+    ).fit_predict(embeddings)
+
+    expected = DBSCAN(eps=EPS, min_samples=MIN_SAMPLES, metric="cosine")
+    np.testing.assert_array_equal(labels, expected.fit_predict(embeddings))
+
+
+def test_neighborhood_graph_is_symmetric_and_bounded_by_eps(clustered_embeddings):
+    embeddings = clustered_embeddings(np.random.default_rng(1), 300)
+
+    graph = eps_neighborhood_graph(embeddings, EPS, block_size=50)
+
+    assert (graph != graph.T).nnz == 0
+    assert graph.data.max() <= EPS
+
+
+@pytest.mark.parametrize("num_shards, workers", [(5, 1), (3, 2)])
+def test_sharded_backend_matches_dbscan(num_shards, workers, clustered_embeddings):
+    embeddings = clustered_embeddings(np.random.default_rng(2), 900)
+
+    labels = ShardedDBSCANBackend(
+        EPS, MIN_SAMPLES, num_shards=num_shards, workers=workers, block_size=128
+    ).fit_predict(embeddings)
+
+    expected = DBSCAN(eps=EPS, min_samples=MIN_SAMPLES, metric="cosine")
+    np.testing.assert_array_equal(labels, expected.fit_predict(embeddings))
+
+
+def test_shards_hold_every_neighbor_of_their_faces(clustered_embeddings):
+    embeddings = clustered_embeddings(np.random.default_rng(3), 600)
+    vectors = normalize_rows(embeddings)
+    graph = eps_neighborhood_graph(embeddings, EPS)
+
+    shards = shard_rows(vectors, coarse_cells(vectors, 6), EPS)
+
+    owners = np.concatenate([rows[:own_count] for rows, own_count in shards])
+    assert sorted(owners.tolist()) == list(range(600))
+    for rows, own_count in shards:
+        for face in rows[:own_count]:
+            assert set(graph[face].indices) <= set(rows.tolist())
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        make_backend("hdbscan", EPS, MIN_SAMPLES)
+    with pytest.raises(ValueError):
+        make_backend("sparse", EPS, MIN_SAMPLES, metric="euclidean")
@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+from app.database import faces as faces_module
+from app.database import images as images_module
+from app.facecluster import facecluster as facecluster_module
+from app.facecluster.facecluster import FaceCluster
+from app.facecluster.projection import fit_projection, neighbor_recall
+
+PEOPLE = dict(dim=64, num_people=8, spread=0.15)
+
+
+@pytest.fixture
+def small_projection_threshold(monkeypatch, image_ids_as_paths):
+    monkeypatch.setattr(facecluster_module, "FACE_PROJECTION_MIN_FACES", 100)
+
+
+def fitted(tmp_path, name, embeddings, **kwargs):
+    cluster = FaceCluster(db_path=tmp_path / f"{name}.db", **kwargs)
+    cluster.fit(list(embeddings), [f"img{i}" for i in range(len(embeddings))])
+    return cluster
+
+
+def test_projection_is_guarded_by_neighbor_recall(clustered_embeddings):
+    rng = np.random.default_rng(0)
+    embeddings = clustered_embeddings(rng, 400, **PEOPLE)
+
+    projection = fit_projection(embeddings, 16, 0.3, 0.95, 100)
+    assert projection is not None and projection.dim == 16
+    recall, precision = neighbor_recall(
+        embeddings, projection.transform(embeddings), 0.3
+    )
+    assert min(recall, precision) >= 0.95
+
+    # Too few faces, or no structure for the projection to keep
+    assert fit_projection(embeddings[:50], 16, 0.3, 0.95, 100) is None
+    noise = rng.normal(size=(400, 64)).astype(np.float32)
+    assert fit_projection(noise, 4, 0.9, 0.95, 100) is None
+
+
+@pytest.mark.parametrize("incremental", [False, True])
+def test_compact_embeddings_keep_the_clusters(
+    tmp_path, small_projection_threshold, incremental, clustered_embeddings
+):
+    embeddings = clustered_embeddings(np.random.default_rng(1), 300, **PEOPLE)
+    full = fitted(tmp_path, "full", embeddings[:250], incremental=incremental)
+    compact = fitted(
+        tmp_path,
+        "compact",
+        embeddings[:250],
+        incremental=incremental,
+        embedding_dtype="float16",
+        projection_dim=16,
+    )
+    for cluster in (full, compact):
+        cluster.add_faces(embeddings[250:], [f"img{i}" for i in range(250, 300)])
+
+    assert compact.embeddings.shape == (300, 16)
+    assert compact.embeddings.dtype == np.float16
+    np.testing.assert_array_equal(compact.labels, full.labels)
+    assert compact.identify(embeddings[7])[0] == full.identify(embeddings[7])[0]
+
+    # Centroids are reported in the space of the whole embeddings
+    full_centroids = full.get_centroids()
+    compact_centroids = compact.get_centroids()
+    assert compact_centroids.keys() == full_centroids.keys()
+    for label, (centroid, count) in compact_centroids.items():
+        assert centroid.shape == (64,)
+        assert count == full_centroids[label][1]
+        assert centroid @ full_centroids[label][0] > 0.99
+
+
+def test_snapshot_keeps_the_projection(
+    tmp_path, small_projection_threshold, monkeypatch, clustered_embeddings
+):
+    embeddings = clustered_embeddings(np.random.default_rng(2), 200, **PEOPLE)
+    db_path = tmp_path / "faces.db"
+    monkeypatch.setattr(images_module, "get_id_from_path", lambda path: path)
+    monkeypatch.setattr(faces_module, "DATABASE_PATH", str(db_path))
+    faces_module.create_faces_table()
+    for i, embedding in enumerate(embeddings):
+        faces_module.insert_face_embeddings(f"img{i}", [embedding])
+    cluster = fitted(tmp_path, "faces", embeddings, projection_dim=16)
+    cluster.save_to_db()
+    cluster.save_snapshot()
+
+    def fail(blob):
+        raise AssertionError("State was rebuilt from the database")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(facecluster_module, "blob_to_embedding", fail)
+        restored = FaceCluster.load_from_db(db_path, projection_dim=16)
+    np.testing.assert_array_equal(
+        restored.projection.components, cluster.projection.components
+    )
+    np.testing.assert_array_equal(restored.embeddings, cluster.embeddings)
+    assert restored.identify(embeddings[3]) == cluster.identify(embeddings[3])
+
+    # Without the projection the whole embeddings are read back
+    whole = FaceCluster.load_from_db(db_path, projection_dim=0)
+    assert whole.projection is None
+    np.testing.assert_array_equal(whole.embeddings, embeddings)
+    np.testing.assert_array_equal(whole.labels, cluster.labels)
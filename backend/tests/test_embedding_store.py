@@ -0,0 +1,68 @@
+import numpy as np
+from sklearn.metrics.pairwise import cosine_distances
+
+from app.facecluster.embedding_store import EmbeddingStore
+from app.facecluster.facecluster import FaceCluster
+
+
+def test_store_grows_and_keeps_insertion_order():
+    rng = np.random.default_rng(0)
+    embeddings = rng.normal(size=(300, 8)).astype(np.float32)
+    store = EmbeddingStore()
+
+    keys = [
+        store.add(embedding, [f"img{i % 7}"], [i])
+        for i, embedding in enumerate(embeddings)
+    ]
+
+    assert len(store) == 300
+    np.testing.assert_array_equal(np.concatenate(keys), np.arange(300))
+    np.testing.assert_array_equal(store.embeddings, embeddings)
+    np.testing.assert_array_equal(store.labels, np.arange(300))
+    assert store.rows("img3") == list(range(3, 300, 7))
+
+
+def test_removal_tombstones_then_compacts():
+    rng = np.random.default_rng(1)
+    embeddings = rng.normal(size=(100, 8)).astype(np.float32)
+    image_ids = [f"img{i % 10}" for i in range(100)]
+    store = EmbeddingStore()
+    store.reset(embeddings, image_ids, np.arange(100))
+
+    removed_keys = store.remove("img0")
+    np.testing.assert_array_equal(removed_keys, np.arange(0, 100, 10))
+    assert "img0" not in store
+    # Below the compaction threshold the rows stay in place
+    assert store.rows("img1") == list(range(1, 100, 10))
+
+    for image_id in ["img1", "img2", "img3", "img4", "img5"]:
+        store.remove(image_id)
+
+    kept = [i for i in range(100) if i % 10 >= 6]
+    assert len(store) == len(kept)
+    assert store.rows("img6") == list(range(0, len(kept), 4))
+    np.testing.assert_array_equal(store.embeddings, embeddings[kept])
+    np.testing.assert_array_equal(store.keys, kept)
+    np.testing.assert_array_equal(store.labels, kept)
+    assert store.image_ids == [image_ids[i] for i in kept]
+
+
+def test_face_cluster_add_and_remove_without_refit(tmp_path, image_ids_as_paths):
+    rng = np.random.default_rng(2)
+    centers = rng.normal(size=(5, 16))
+    embeddings = [
+        (centers[i % 5] + rng.normal(scale=0.1, size=16)).astype(np.float32)
+        for i in range(40)
+    ]
+
+    cluster = FaceCluster(db_path=tmp_path / "faces.db", incremental=False)
+    for i, embedding in enumerate(embeddings):
+        cluster.add_face(embedding, f"img{i}")
+    cluster.remove_image("img0")
+
+    assert cluster.image_ids == [f"img{i}" for i in range(1, 40)]
+    np.testing.assert_array_equal(cluster.embeddings, np.array(embeddings[1:]))
+    distances = cosine_distances(np.array(embeddings[1:2]), cluster.embeddings)[0]
+    expected = {f"img{i + 1}" for i in np.flatnonzero(distances <= cluster.eps)}
+    related = {image_id for image_id, _ in cluster.get_related_images("img1")}
+    assert related == expected - {"img1"}
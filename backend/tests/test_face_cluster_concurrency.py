@@ -0,0 +1,106 @@
+import sqlite3
+import threading
+
+import numpy as np
+
+from app.facecluster.facecluster import FaceCluster
+from app.utils.rwlock import ReadWriteLock
+
+PEOPLE = dict(dim=16, num_people=6, spread=0.1)
+
+
+def same_partition(a, b):
+    pairs = set(zip(a.tolist(), b.tolist()))
+    return len(pairs) == len(set(a.tolist())) == len(set(b.tolist()))
+
+
+def test_batch_add_matches_single_adds(
+    tmp_path, clustered_embeddings, image_ids_as_paths
+):
+    embeddings = clustered_embeddings(np.random.default_rng(0), 60, **PEOPLE)
+    image_ids = [f"img{i // 2}" for i in range(60)]
+
+    for incremental in (True, False):
+        single = FaceCluster(db_path=tmp_path / "single.db", incremental=incremental)
+        for embedding, image_id in zip(embeddings, image_ids):
+            single.add_face(embedding, image_id)
+        batch = FaceCluster(db_path=tmp_path / "batch.db", incremental=incremental)
+        labels = batch.add_faces(embeddings[:25], image_ids[:25])
+        labels = np.concatenate(
+            [labels, batch.add_faces(embeddings[25:], image_ids[25:])]
+        )
+
+        np.testing.assert_array_equal(batch.labels, single.labels)
+        np.testing.assert_array_equal(labels, single.labels)
+        assert batch.get_clusters() == single.get_clusters()
+
+
+def test_concurrent_batches_are_all_clustered_and_saved(
+    tmp_path, clustered_embeddings, image_ids_as_paths
+):
+    embeddings = clustered_embeddings(np.random.default_rng(1), 400, **PEOPLE)
+    cluster = FaceCluster(db_path=tmp_path / "faces.db")
+
+    def ingest(worker):
+        for start in range(worker * 50, (worker + 1) * 50, 5):
+            cluster.add_faces(embeddings[start : start + 5], [f"img{start}"] * 5)
+            cluster.get_clusters()
+            cluster.get_related_images(f"img{start}")
+
+    threads = [threading.Thread(target=ingest, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(cluster.labels) == 400
+    expected = FaceCluster(db_path=tmp_path / "expected.db")
+    expected.fit(list(cluster.embeddings), cluster.image_ids)
+    assert same_partition(cluster.labels, expected.labels)
+    with sqlite3.connect(tmp_path / "faces.db") as conn:
+        count = conn.execute("SELECT COUNT(*) FROM face_cluster_assignments")
+        assert count.fetchone()[0] == 400
+
+
+def test_reads_do_not_wait_for_writers(
+    tmp_path, clustered_embeddings, image_ids_as_paths
+):
+    embeddings = clustered_embeddings(np.random.default_rng(2), 20, **PEOPLE)
+    cluster = FaceCluster(db_path=tmp_path / "faces.db")
+    cluster.add_faces(embeddings, [f"img{i // 2}" for i in range(20)])
+    clusters = cluster.get_clusters()
+
+    held, release = threading.Event(), threading.Event()
+
+    def writer():
+        with cluster._lock.write():
+            held.set()
+            release.wait()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    held.wait()
+    try:
+        assert cluster.get_clusters() == clusters
+        assert "img0" not in dict(cluster.get_related_images("img0"))
+    finally:
+        release.set()
+        thread.join()
+
+
+def test_writer_waits_for_readers():
+    lock = ReadWriteLock()
+    events = []
+
+    def writer():
+        with lock.write():
+            events.append("write")
+
+    with lock.read():
+        thread = threading.Thread(target=writer)
+        thread.start()
+        thread.join(timeout=0.1)
+        events.append("read")
+    thread.join()
+
+    assert events == ["read", "write"]
@@ -0,0 +1,227 @@
+import json
+import sqlite3
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+from app.database import faces as faces_module
+from app.database import images as images_module
+from app.facecluster import facecluster as facecluster_module
+from app.facecluster.facecluster import FaceCluster
+from app.facenet import facenet as facenet_module
+from app.utils.image_loader import NO_SCALE
+
+
+@pytest.fixture
+def store_faces(monkeypatch, image_ids_as_paths):
+    # Faces stored in the same database, with image paths as image IDs
+    def store(faces, db_path):
+        monkeypatch.setattr(images_module, "get_id_from_path", lambda path: path)
+        monkeypatch.setattr(faces_module, "DATABASE_PATH", str(db_path))
+        faces_module.create_faces_table()
+        for image_id, embeddings in faces.items():
+            faces_module.insert_face_embeddings(image_id, list(embeddings))
+
+    return store
+
+
+def assignments(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute(
+            "SELECT seq, image_id, face_index, label FROM face_cluster_assignments"
+        ).fetchall()
+
+
+def test_restores_state_from_per_face_assignments(tmp_path, face_library, store_faces):
+    faces = face_library(np.random.default_rng(0), 30)
+    db_path = tmp_path / "faces.db"
+    store_faces(faces, db_path)
+
+    cluster = FaceCluster(db_path=db_path)
+    cluster.fit([], [])
+    cluster.save_to_db()
+    for image_id, embeddings in faces.items():
+        for embedding in embeddings:
+            cluster.add_face(embedding, image_id)
+    cluster.remove_image("img4")
+    faces_module.delete_face_embeddings("img4")
+
+    restored = FaceCluster.load_from_db(db_path)
+
+    assert restored.image_ids == cluster.image_ids
+    np.testing.assert_array_equal(restored.labels, cluster.labels)
+    np.testing.assert_array_equal(restored.embeddings, cluster.embeddings)
+
+
+def test_saves_only_changed_faces_in_the_callers_transaction(
+    tmp_path, face_library, store_faces
+):
+    faces = face_library(np.random.default_rng(1), 30)
+    db_path = tmp_path / "faces.db"
+    store_faces(faces, db_path)
+    cluster = FaceCluster(db_path=db_path)
+    image_ids = [image_id for image_id, e in faces.items() for _ in e]
+    cluster.fit([e for embeddings in faces.values() for e in embeddings], image_ids)
+    cluster.save_to_db()
+    saved = assignments(db_path)
+
+    conn = sqlite3.connect(db_path)
+    cluster.add_face(faces["img0"][0], "new", save=False)
+    cluster.save_to_db(conn)
+    # Nothing is visible before the caller commits
+    assert assignments(db_path) == saved
+    conn.commit()
+    conn.close()
+
+    updated = assignments(db_path)
+    assert len(updated) == len(saved) + 1
+    # Existing rows were updated in place, not rewritten
+    assert [row[:3] for row in updated[:-1]] == [row[:3] for row in saved]
+    assert updated[-1][1:3] == ("new", 0)
+
+
+def test_migrates_the_json_state(tmp_path, face_library, store_faces):
+    faces = face_library(np.random.default_rng(2), 3)
+    db_path = tmp_path / "faces.db"
+    store_faces(faces, db_path)
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(
+            "CREATE TABLE face_clusters (id INTEGER PRIMARY KEY, image_ids TEXT, labels TEXT)"
+        )
+        conn.execute(
+            "INSERT INTO face_clusters (image_ids, labels) VALUES (?, ?)",
+            (
+                json.dumps(["img0", "img0", "img1", "img2", "img2"]),
+                json.dumps([0, 1, 0, -1, 1]),
+            ),
+        )
+
+    # Without the engine build, which would relabel the faces meanwhile
+    cluster = FaceCluster.load_from_db(db_path, incremental=False)
+
+    assert cluster.image_ids == ["img0", "img0", "img1", "img2", "img2"]
+    np.testing.assert_array_equal(cluster.labels, [0, 1, 0, -1, 1])
+    np.testing.assert_array_equal(cluster.embeddings[1], faces["img0"][1])
+    assert [row[1:] for row in assignments(db_path)] == [
+        ("img0", 0, 0),
+        ("img0", 1, 1),
+        ("img1", 0, 0),
+        ("img2", 0, -1),
+        ("img2", 1, 1),
+    ]
+
+
+def test_restores_from_snapshot_until_the_database_changes(
+    tmp_path, monkeypatch, face_library, store_faces
+):
+    faces = face_library(np.random.default_rng(3), 30)
+    db_path = tmp_path / "faces.db"
+    store_faces(faces, db_path)
+    cluster = FaceCluster(db_path=db_path)
+    image_ids = [image_id for image_id, e in faces.items() for _ in e]
+    cluster.fit([e for embeddings in faces.values() for e in embeddings], image_ids)
+    cluster.save_to_db()
+    cluster.save_snapshot()
+
+    def fail(blob):
+        raise AssertionError("State was rebuilt from the database")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(facecluster_module, "blob_to_embedding", fail)
+        restored = FaceCluster.load_from_db(db_path)
+    assert restored.image_ids == cluster.image_ids
+    np.testing.assert_array_equal(restored.labels, cluster.labels)
+    np.testing.assert_array_equal(restored.embeddings, cluster.embeddings)
+    # The incremental engine is built in the background after the restore
+    restored._engine_thread.join(timeout=10)
+    assert restored.engine is not None
+    np.testing.assert_array_equal(restored.labels, cluster.labels)
+    # The snapshot is read in place, and rewriting it leaves the map intact
+    assert not restored.embeddings.flags.writeable
+    restored.save_snapshot()
+    np.testing.assert_array_equal(restored.embeddings, cluster.embeddings)
+
+    # A face added after the snapshot makes it stale
+    faces_module.insert_face_embeddings("new", [faces["img0"][0]])
+    restored.add_face(faces["img0"][0], "new")
+    assert restored.embeddings.flags.writeable
+    rebuilt = FaceCluster.load_from_db(db_path)
+    assert rebuilt.image_ids == image_ids + ["new"]
+
+
+def test_reprocessed_image_replaces_its_faces(tmp_path, face_library, store_faces):
+    faces = face_library(np.random.default_rng(4), 30, faces_per_image=3)
+    db_path = tmp_path / "faces.db"
+    store_faces(faces, db_path)
+    cluster = FaceCluster(db_path=db_path)
+    image_ids = [image_id for image_id, e in faces.items() for _ in e]
+    cluster.fit([e for embeddings in faces.values() for e in embeddings], image_ids)
+    cluster.save_to_db()
+
+    # img2 is processed again and now has two faces
+    new_faces = faces["img5"][:2]
+    with sqlite3.connect(db_path) as conn:
+        cluster.add_faces(new_faces, ["img2", "img2"], conn=conn, replace=True)
+        faces_module.insert_face_embeddings("img2", list(new_faces), conn=conn)
+        conn.commit()
+
+    assert cluster.image_ids.count("img2") == 2
+    assert len(cluster.image_ids) == len(image_ids) - 1
+    assert sorted(row[2] for row in assignments(db_path) if row[1] == "img2") == [0, 1]
+    restored = FaceCluster.load_from_db(db_path)
+    assert sorted(restored.image_ids) == sorted(cluster.image_ids)
+    np.testing.assert_array_equal(
+        np.sort(restored.embeddings, axis=0), np.sort(cluster.embeddings, axis=0)
+    )
+
+
+def test_snapshot_is_skipped_for_faces_without_image_ids(
+    tmp_path, monkeypatch, face_library, store_faces
+):
+    faces = face_library(np.random.default_rng(5), 5)
+    db_path = tmp_path / "faces.db"
+    store_faces(faces, db_path)
+    # An image path with no ID mapped to it
+    monkeypatch.setattr(
+        facecluster_module,
+        "get_id_from_path",
+        lambda path: None if path == "unmapped" else path,
+    )
+    cluster = FaceCluster(db_path=db_path)
+    paths = [image_id for image_id, e in faces.items() for _ in e]
+    paths[0] = "unmapped"
+    cluster.fit([e for embeddings in faces.values() for e in embeddings], paths)
+
+    cluster.save_snapshot()
+
+    assert not (cluster.snapshot_dir / "meta.json").exists()
+
+
+def test_faces_join_the_clusters_only_once_saved(tmp_path, monkeypatch):
+    db_path = tmp_path / "faces.db"
+    cluster = FaceCluster(db_path=db_path)
+    image = cv2.imread(str(Path(__file__).parent / "inputs" / "zidane.jpg"))
+    box = np.array([[700, 40, 1000, 420]], dtype=np.float32)
+
+    def detector(img, scale):
+        return box, np.array([0.9]), np.array([0])
+
+    def fail(*args, **kwargs):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(facenet_module, "DATABASE_PATH", str(db_path))
+    monkeypatch.setattr(facenet_module, "get_detector", lambda *a, **k: detector)
+    monkeypatch.setattr(
+        facenet_module, "embed_face_batch", lambda batch: np.ones((len(batch), 16))
+    )
+    monkeypatch.setattr(facenet_module, "get_id_from_path", lambda path: 1)
+    monkeypatch.setattr(facenet_module, "get_face_cluster", lambda: cluster)
+    monkeypatch.setattr(facenet_module, "insert_face_embeddings", fail)
+
+    with pytest.raises(sqlite3.OperationalError):
+        facenet_module.detect_faces("zidane.jpg", image, NO_SCALE)
+
+    assert cluster.image_ids == []
+    assert cluster.view.image_ids == []
@@ -0,0 +1,68 @@
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from app.facenet.facenet import select_faces
+from app.facenet.quality import (
+    SKIPPED_BLURRED,
+    SKIPPED_LOW_SCORE,
+    SKIPPED_TOO_SMALL,
+    box_skip_reason,
+    count_reasons,
+    crop_skip_reason,
+    sharpness,
+)
+from app.utils.image_loader import NO_SCALE
+
+INPUTS_DIR = Path(__file__).parent / "inputs"
+
+
+def test_boxes_are_checked_for_score_and_size():
+    assert box_skip_reason((0, 0, 100, 100), 0.9) is None
+    assert box_skip_reason((0, 0, 100, 100), 0.2) == SKIPPED_LOW_SCORE
+    assert box_skip_reason((0, 0, 100, 12), 0.9) == SKIPPED_TOO_SMALL
+    assert box_skip_reason((0, 0, 100, 12), 0.9, min_size=0) is None
+
+
+def test_blurred_crops_are_skipped():
+    face = cv2.imread(str(INPUTS_DIR / "Frank_Solich_0001.jpg"))[30:120, 30:120]
+    blurred = cv2.GaussianBlur(face, (0, 0), 3)
+
+    assert sharpness(blurred) < sharpness(face)
+    assert crop_skip_reason(face) is None
+    assert crop_skip_reason(blurred) == SKIPPED_BLURRED
+    assert crop_skip_reason(blurred, min_sharpness=0) is None
+
+
+def test_select_faces_records_why_faces_were_skipped():
+    image = cv2.imread(str(INPUTS_DIR / "zidane.jpg"))
+    image[100:400, 100:400] = cv2.GaussianBlur(image[100:400, 100:400], (0, 0), 6)
+    boxes = np.array(
+        [
+            [700, 40, 1000, 420],  # sharp face-sized region
+            [150, 150, 350, 350],  # blurred
+            [900, 500, 910, 515],  # tiny
+            [500, 100, 700, 300],  # low score
+        ],
+        dtype=np.float32,
+    )
+    scores = np.array([0.9, 0.9, 0.9, 0.25], dtype=np.float32)
+
+    crops, kept_boxes, kept_scores, skipped = select_faces(
+        "zidane.jpg", image, NO_SCALE, boxes, scores
+    )
+
+    assert len(crops) == 1
+    np.testing.assert_array_equal(kept_boxes[0], boxes[0])
+    assert kept_scores == [scores[0]]
+    assert [reason for _, _, reason in skipped] == [
+        SKIPPED_BLURRED,
+        SKIPPED_TOO_SMALL,
+        SKIPPED_LOW_SCORE,
+    ]
+    assert count_reasons(skipped) == {
+        SKIPPED_BLURRED: 1,
+        SKIPPED_TOO_SMALL: 1,
+        SKIPPED_LOW_SCORE: 1,
+    }
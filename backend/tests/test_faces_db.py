@@ -0,0 +1,92 @@
+import json
+import sqlite3
+
+import numpy as np
+import pytest
+
+from app.database import faces as faces_module
+from app.database import images as images_module
+
+
+@pytest.fixture
+def faces_db(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "faces.db")
+    monkeypatch.setattr(faces_module, "DATABASE_PATH", db_path)
+    monkeypatch.setattr(images_module, "get_id_from_path", lambda path: int(path[3:]))
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(
+            "CREATE TABLE image_id_mapping (id INTEGER PRIMARY KEY, path TEXT)"
+        )
+        conn.executemany(
+            "INSERT INTO image_id_mapping (id, path) VALUES (?, ?)",
+            [(1, "img1"), (2, "img2")],
+        )
+    return db_path
+
+
+def test_embeddings_round_trip_as_float32(faces_db):
+    faces_module.create_faces_table()
+    embeddings = np.random.default_rng(0).normal(size=(3, 512))
+
+    faces_module.insert_face_embeddings(
+        "img1", list(embeddings), boxes=[(0, 0, 10, 10)] * 3, scores=[0.9, 0.8, 0.7]
+    )
+    # Re-processing an image replaces its faces instead of adding rows
+    faces_module.insert_face_embeddings("img1", list(embeddings[:2]))
+
+    [stored] = faces_module.get_all_face_embeddings()
+    assert stored["image_path"] == "img1"
+    assert len(stored["embeddings"]) == 2
+    for original, loaded in zip(embeddings, stored["embeddings"]):
+        assert loaded.dtype == np.float32
+        assert not loaded.flags.owndata
+        np.testing.assert_array_equal(loaded, original.astype(np.float32))
+    assert faces_module.get_face_embeddings("img1").shape == (2, 512)
+
+
+def test_json_rows_are_migrated(faces_db):
+    with sqlite3.connect(faces_db) as conn:
+        conn.execute(
+            """
+            CREATE TABLE faces (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                image_id INTEGER,
+                embeddings TEXT
+            )
+        """
+        )
+        rows = [(1, [[1.0, 2.0], [3.0, 4.0]]), (2, [[5.0, 6.0]]), (1, [[7.0, 8.0]])]
+        conn.executemany(
+            "INSERT INTO faces (image_id, embeddings) VALUES (?, ?)",
+            [(image_id, json.dumps(embeddings)) for image_id, embeddings in rows],
+        )
+
+    faces_module.create_faces_table()
+
+    stored = {
+        item["image_path"]: [e.tolist() for e in item["embeddings"]]
+        for item in faces_module.get_all_face_embeddings()
+    }
+    # The latest row of an image stored twice wins
+    assert stored == {"img1": [[7.0, 8.0]], "img2": [[5.0, 6.0]]}
+
+
+def test_skipped_faces_are_replaced_and_deleted_with_the_image(faces_db):
+    faces_module.create_faces_table()
+    with sqlite3.connect(faces_db) as conn:
+        faces_module.insert_skipped_faces(
+            1,
+            [((0, 0, 8, 8), 0.9, "too_small"), ((5, 5, 90, 90), 0.2, "low_score")],
+            conn,
+        )
+        faces_module.insert_skipped_faces(2, [((0, 0, 50, 50), 0.8, "blurred")], conn)
+        # Re-processing an image replaces its skipped faces
+        faces_module.insert_skipped_faces(1, [((0, 0, 8, 8), 0.9, "too_small")], conn)
+
+    faces_module.delete_face_embeddings(2)
+
+    with sqlite3.connect(faces_db) as conn:
+        rows = conn.execute(
+            "SELECT image_id, x1, y1, x2, y2, score, reason FROM skipped_faces"
+        ).fetchall()
+    assert rows == [(1, 0.0, 0.0, 8.0, 8.0, 0.9, "too_small")]
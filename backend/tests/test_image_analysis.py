@@ -0,0 +1,70 @@
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from app.utils.image_analysis import ImageAnalysis
+from app.utils.metadata import extract_metadata
+
+INPUTS_DIR = Path(__file__).parent / "inputs"
+
+
+def test_image_is_read_and_decoded_once(monkeypatch):
+    analysis = ImageAnalysis(str(INPUTS_DIR / "zidane.jpg"))
+    calls = []
+    decode = analysis._decode
+    monkeypatch.setattr(analysis, "_decode", lambda: calls.append(1) or decode())
+
+    first = analysis.image
+    second = analysis.image
+
+    assert first is second
+    assert first.shape[2] == 3
+    assert len(calls) == 1
+
+
+def test_metadata_from_bytes_matches_path():
+    path = str(INPUTS_DIR / "zidane.jpg")
+    analysis = ImageAnalysis(path)
+
+    assert analysis.metadata() == extract_metadata(path)
+
+
+def test_thumbnail_matches_pillow_size(tmp_path):
+    path = INPUTS_DIR / "zidane.jpg"
+    thumbnail_path = tmp_path / "zidane.jpg"
+
+    ImageAnalysis(str(path)).save_thumbnail(str(thumbnail_path))
+
+    with Image.open(path) as original:
+        original.thumbnail((400, 400))
+        expected_size = original.size
+    with Image.open(thumbnail_path) as thumbnail:
+        assert thumbnail.size == expected_size
+
+
+def test_formats_opencv_cannot_decode_fall_back_to_pillow(tmp_path):
+    gif_path = tmp_path / "frame.gif"
+    Image.fromarray(np.full((20, 30, 3), 200, dtype=np.uint8)).save(gif_path)
+
+    image = ImageAnalysis(str(gif_path)).image
+
+    assert image is not None
+    assert image.shape == (20, 30, 3)
+
+
+def test_thumbnail_keeps_alpha_and_orientation(tmp_path):
+    png_path = tmp_path / "transparent.png"
+    Image.new("RGBA", (800, 200), (255, 0, 0, 0)).save(png_path)
+    jpeg_path = tmp_path / "rotated.jpg"
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Orientation: rotate 90 degrees clockwise to display
+    Image.new("RGB", (800, 200)).save(jpeg_path, exif=exif)
+
+    ImageAnalysis(str(png_path)).save_thumbnail(str(tmp_path / "a.png"))
+    ImageAnalysis(str(jpeg_path)).save_thumbnail(str(tmp_path / "b.jpg"))
+
+    with Image.open(tmp_path / "a.png") as thumbnail:
+        assert thumbnail.mode == "RGBA"
+    with Image.open(tmp_path / "b.jpg") as thumbnail:
+        assert thumbnail.size == (400, 100)
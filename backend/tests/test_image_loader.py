@@ -0,0 +1,82 @@
+import io
+from pathlib import Path
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from app.utils.image_analysis import ImageAnalysis
+from app.utils.image_loader import (
+    NO_SCALE,
+    crop_region,
+    decode_for_detection,
+    reduced_decode_factor,
+)
+
+INPUTS_DIR = Path(__file__).parent / "inputs"
+
+
+def large_jpeg(size=(3000, 2000), orientation=None):
+    image = Image.open(INPUTS_DIR / "zidane.jpg").convert("RGB").resize(size)
+    exif = Image.Exif()
+    if orientation is not None:
+        exif[0x0112] = orientation
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", exif=exif.tobytes())
+    return buffer.getvalue()
+
+
+def test_reduced_decode_factor_keeps_model_input_covered():
+    assert reduced_decode_factor(6000, 4000) == 4
+    assert reduced_decode_factor(4000, 6000) == 4
+    assert reduced_decode_factor(3000, 2000) == 2
+    assert reduced_decode_factor(1280, 720) == 1
+    assert reduced_decode_factor(5120, 5120) == 8
+
+
+def test_large_jpeg_is_decoded_at_reduced_resolution():
+    image, scale = decode_for_detection(large_jpeg())
+
+    assert image.shape[:2] == (1000, 1500)
+    assert scale == (2.0, 2.0)
+
+
+def test_scale_follows_exif_rotation():
+    # Orientation 6 makes OpenCV rotate the image by 90 degrees
+    image, (scale_x, scale_y) = decode_for_detection(large_jpeg(orientation=6))
+
+    height, width = image.shape[:2]
+    assert (round(width * scale_x), round(height * scale_y)) == (2000, 3000)
+
+
+def test_small_and_non_jpeg_images_are_left_to_the_full_decode():
+    _, png = cv2.imencode(".png", np.zeros((2000, 2000, 3), dtype=np.uint8))
+
+    assert decode_for_detection(png.tobytes()) == (None, NO_SCALE)
+    with open(INPUTS_DIR / "zidane.jpg", "rb") as f:
+        assert decode_for_detection(f.read()) == (None, NO_SCALE)
+
+
+def test_crop_region_maps_original_coordinates():
+    image = np.arange(100 * 200).reshape(100, 200)
+
+    crop = crop_region(image, (40, 20, 100, 60), padding=10, scale=(2.0, 2.0))
+
+    np.testing.assert_array_equal(crop, image[5:35, 15:55])
+    full = crop_region(image, (40, 20, 100, 60), padding=10)
+    np.testing.assert_array_equal(full, image[10:70, 30:110])
+
+
+def test_thumbnail_from_reduced_decode_skips_full_decode(tmp_path):
+    path = tmp_path / "large.jpg"
+    path.write_bytes(large_jpeg())
+    analysis = ImageAnalysis(str(path))
+
+    analysis.save_thumbnail(str(tmp_path / "thumbnail.jpg"))
+
+    assert analysis._image is None
+    with Image.open(path) as original:
+        original.thumbnail((400, 400))
+        expected_size = original.size
+    with Image.open(tmp_path / "thumbnail.jpg") as thumbnail:
+        assert thumbnail.size == expected_size
@@ -0,0 +1,154 @@
+import threading
+
+import numpy as np
+from sklearn.cluster import DBSCAN
+
+from app.facecluster import facecluster as facecluster_module
+from app.facecluster.facecluster import FaceCluster
+from app.facecluster.incremental_dbscan import IncrementalDBSCAN
+
+EPS = 0.3
+MIN_SAMPLES = 3
+
+
+def fresh_fit(embeddings):
+    dbscan = DBSCAN(eps=EPS, min_samples=MIN_SAMPLES, metric="cosine")
+    return dbscan.fit_predict(embeddings)
+
+
+def test_fit_matches_dbscan(clustered_embeddings):
+    embeddings = clustered_embeddings(np.random.default_rng(0), 800)
+
+    labels = IncrementalDBSCAN(EPS, MIN_SAMPLES).fit(embeddings)
+
+    np.testing.assert_array_equal(labels, fresh_fit(embeddings))
+
+
+def test_removals_and_additions_match_a_fresh_fit(clustered_embeddings):
+    rng = np.random.default_rng(1)
+    current = clustered_embeddings(rng, 600)
+    engine = IncrementalDBSCAN(EPS, MIN_SAMPLES)
+    engine.fit(current)
+
+    for step in range(40):
+        if step % 4 == 3:
+            added = clustered_embeddings(rng, 6)
+            labels = engine.add(added)
+            current = np.vstack([current, added])
+        else:
+            removed = rng.choice(len(current), size=8, replace=False)
+            labels = engine.remove(removed)
+            current = np.delete(current, removed, axis=0)
+
+        assert len(engine) == len(current)
+        np.testing.assert_array_equal(labels, fresh_fit(current))
+
+
+def test_border_rows_of_a_demoted_core_row_become_noise():
+    # Row 1 is core through rows 0 and 2; row 0 hangs off row 1 only
+    angles = np.array([0, 0.15, 0.30, 2.0, 2.05, 2.1, 3.0, 3.05, 3.1])
+    embeddings = np.stack([np.cos(angles), np.sin(angles)], axis=1)
+    engine = IncrementalDBSCAN(0.02, 3)
+    engine.fit(embeddings)
+
+    labels = engine.remove([0])
+
+    expected = DBSCAN(eps=0.02, min_samples=3, metric="cosine")
+    np.testing.assert_array_equal(labels, expected.fit_predict(embeddings[1:]))
+    np.testing.assert_array_equal(labels, [-1, -1, 0, 0, 0, 1, 1, 1])
+
+
+def test_removing_everything_leaves_no_clusters(clustered_embeddings):
+    embeddings = clustered_embeddings(np.random.default_rng(2), 50)
+    engine = IncrementalDBSCAN(EPS, MIN_SAMPLES)
+    engine.fit(embeddings)
+
+    labels = engine.remove(range(50))
+
+    assert len(labels) == 0
+    assert len(engine.add(embeddings[:1])) == 1
+
+
+def test_face_cluster_removal_does_not_refit(
+    tmp_path, monkeypatch, clustered_embeddings, image_ids_as_paths
+):
+    rng = np.random.default_rng(3)
+    embeddings = clustered_embeddings(rng, 300)
+    paths = [f"img{i // 3}" for i in range(len(embeddings))]
+
+    cluster = FaceCluster(
+        eps=EPS, min_samples=MIN_SAMPLES, db_path=tmp_path / "faces.db"
+    )
+    cluster.fit(list(embeddings), paths)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("DBSCAN was refitted")
+
+    monkeypatch.setattr(cluster.dbscan, "fit_predict", fail)
+    for image_id in ["img0", "img10", "img42"]:
+        cluster.remove_image(image_id)
+
+    kept = [i for i, path in enumerate(paths) if path not in {"img0", "img10", "img42"}]
+    np.testing.assert_array_equal(cluster.labels, fresh_fit(embeddings[kept]))
+
+
+def test_face_cluster_adds_match_a_fresh_fit_with_a_trained_ivf_index(
+    tmp_path, monkeypatch, clustered_embeddings, image_ids_as_paths
+):
+    make_index = facecluster_module.make_index
+    # A small, trained index that scans a single bucket for top-k queries
+    monkeypatch.setattr(
+        facecluster_module,
+        "make_index",
+        lambda kind, nprobe: make_index(kind, nprobe=1, min_train_size=200),
+    )
+    # Overlapping people, so many eps-neighbors sit in other buckets
+    embeddings = clustered_embeddings(
+        np.random.default_rng(4), 700, num_people=8, spread=0.6
+    )
+    paths = [f"img{i}" for i in range(len(embeddings))]
+
+    cluster = FaceCluster(
+        eps=EPS, min_samples=MIN_SAMPLES, db_path=tmp_path / "faces.db"
+    )
+    cluster.fit(list(embeddings[:300]), paths[:300])
+    cluster.add_faces(embeddings[300:], paths[300:])
+    assert cluster.index.trained
+
+    np.testing.assert_array_equal(cluster.labels, fresh_fit(embeddings))
+
+
+def test_engine_is_built_without_blocking_writers(
+    tmp_path, monkeypatch, clustered_embeddings, image_ids_as_paths
+):
+    embeddings = clustered_embeddings(np.random.default_rng(5), 400)
+    paths = [f"img{i // 2}" for i in range(len(embeddings))]
+    cluster = FaceCluster(
+        eps=EPS, min_samples=MIN_SAMPLES, db_path=tmp_path / "faces.db"
+    )
+    cluster.fit(list(embeddings[:300]), paths[:300])
+    # As after a restart, the engine is not built yet
+    cluster.engine = None
+    monkeypatch.setattr(cluster, "start_engine_build", lambda: None)
+    cluster.add_faces(embeddings[300:350], paths[300:350])
+    assert cluster.engine is None
+
+    fit = IncrementalDBSCAN.fit
+
+    def change_faces():
+        cluster.remove_image("img3")
+        cluster.add_faces(embeddings[350:], paths[350:])
+
+    def fit_while_faces_change(engine, vectors):
+        writer = threading.Thread(target=change_faces, daemon=True)
+        writer.start()
+        writer.join(timeout=10)
+        assert not writer.is_alive(), "The neighbor graph is built under the lock"
+        return fit(engine, vectors)
+
+    monkeypatch.setattr(IncrementalDBSCAN, "fit", fit_while_faces_change)
+    cluster.build_engine()
+
+    kept = [i for i, path in enumerate(paths) if path != "img3"]
+    assert cluster.engine is not None
+    np.testing.assert_array_equal(cluster.labels, fresh_fit(embeddings[kept]))
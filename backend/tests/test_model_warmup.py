@@ -0,0 +1,34 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app.config.settings import DEFAULT_FACENET_MODEL
+from app.utils.model_warmup import readiness, warm_up_models
+
+
+def test_importing_the_routes_loads_no_model():
+    code = (
+        "import app.routes.images, app.scheduler\n"
+        "from app.utils.onnx_manager import get_session_stats\n"
+        "assert get_session_stats() == [], get_session_stats()\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+
+
+def test_warm_up_loads_models_and_reports_ready():
+    if not os.path.exists(DEFAULT_FACENET_MODEL):
+        pytest.skip(f"Model file not found: {DEFAULT_FACENET_MODEL}")
+
+    warm_up_models()
+
+    report = readiness()
+    assert report["ready"]
+    assert report["warmup"] == "done"
+    assert report["timings_ms"]["warmup"] > 0
+    loaded = {os.path.basename(model["model_path"]) for model in report["models"]}
+    assert {"yolov8n.onnx", "yolov8n-face.onnx", "facenet.onnx"} <= loaded
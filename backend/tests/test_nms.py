@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from app.yolov8.utils import compute_iou, compute_iou_matrix, multiclass_nms, nms
+from benchmarks.bench_nms import (
+    crowded_scene,
+    multiclass_nms_reference,
+    nms_reference,
+)
+
+
+@pytest.mark.parametrize("num_candidates", [1, 10, 150, 600])
+@pytest.mark.parametrize("iou_threshold", [0.3, 0.5, 0.7])
+def test_multiclass_nms_matches_sequential_implementation(
+    num_candidates, iou_threshold
+):
+    boxes, scores, class_ids = crowded_scene(num_candidates, seed=num_candidates)
+
+    expected = multiclass_nms_reference(boxes, scores, class_ids, iou_threshold)
+    actual = multiclass_nms(boxes, scores, class_ids, iou_threshold)
+
+    assert list(actual) == list(expected)
+
+
+def test_nms_matches_sequential_implementation():
+    boxes, scores, _ = crowded_scene(300, num_classes=1, seed=7)
+
+    assert list(nms(boxes, scores, 0.45)) == list(nms_reference(boxes, scores, 0.45))
+
+
+def test_iou_matrix_matches_row_wise_iou():
+    boxes, _, _ = crowded_scene(40, seed=3)
+
+    ious = compute_iou_matrix(boxes, chunk_size=7)
+
+    for i, box in enumerate(boxes):
+        np.testing.assert_allclose(ious[i], compute_iou(box, boxes), rtol=1e-6)
+
+
+def test_max_det_caps_detections_by_score():
+    boxes, scores, class_ids = crowded_scene(400, seed=1)
+
+    capped = multiclass_nms(boxes, scores, class_ids, 0.5, max_det=5)
+    full = multiclass_nms(boxes, scores, class_ids, 0.5)
+
+    assert len(capped) == 5
+    best = sorted(full, key=lambda i: -scores[i])[:5]
+    assert set(capped) == set(best)
+
+
+def test_top_k_limits_candidates():
+    boxes, scores, class_ids = crowded_scene(400, seed=2)
+
+    kept = multiclass_nms(boxes, scores, class_ids, 0.5, top_k=20)
+
+    top_candidates = set(np.argsort(scores)[::-1][:20])
+    assert set(kept) <= top_candidates
+
+
+def test_degenerate_boxes_match_sequential_implementation():
+    boxes, scores, class_ids = crowded_scene(60, seed=4)
+    boxes[::7, 2] = boxes[::7, 0]  # zero-width boxes have an undefined IoU
+
+    expected = multiclass_nms_reference(boxes, scores, class_ids, 0.5)
+    actual = multiclass_nms(boxes, scores, class_ids, 0.5)
+
+    assert list(actual) == list(expected)
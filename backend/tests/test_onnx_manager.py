@@ -1,7 +1,12 @@
 import pytest
 import os
 import numpy as np
-from app.utils.onnx_manager import onnx_session
+import onnxruntime
+from app.utils.onnx_manager import (
+    OnnxSessionRegistry,
+    PerformanceProfile,
+    onnx_session,
+)
 from app.utils.memory_monitor import get_current_memory_usage
 
 
@@ -30,3 +35,69 @@ def test_onnx_session_context_manager():
 
     # Allow for some memory overhead, but it shouldn't be excessive
     assert memory_diff < 100, f"Memory leak detected: {memory_diff:.2f}MB increase"
+
+
+def test_session_registry_reuses_sessions():
+    model_path = "app/models/yolov8n.onnx"
+
+    if not os.path.exists(model_path):
+        pytest.skip(f"Model file not found: {model_path}")
+
+    registry = OnnxSessionRegistry()
+    first = registry.get_session(model_path)
+    second = registry.get_session(model_path)
+
+    assert first is second
+    stats = registry.stats()
+    assert len(stats) == 1
+    assert stats[0]["hits"] == 1
+    assert stats[0]["load_time_ms"] > 0
+
+
+def test_performance_profile_session_options():
+    profile = PerformanceProfile(
+        intra_op_threads=2,
+        inter_op_threads=1,
+        execution_mode="parallel",
+        graph_optimization_level="extended",
+    )
+
+    options = profile.session_options()
+
+    assert options.intra_op_num_threads == 2
+    assert options.inter_op_num_threads == 1
+    assert options.execution_mode == onnxruntime.ExecutionMode.ORT_PARALLEL
+    assert (
+        options.graph_optimization_level
+        == onnxruntime.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+    )
+    with pytest.raises(ValueError):
+        PerformanceProfile(graph_optimization_level="fastest")
+
+
+def test_optimized_model_is_cached_across_registries(tmp_path):
+    model_path = "app/models/yolov8n.onnx"
+
+    if not os.path.exists(model_path):
+        pytest.skip(f"Model file not found: {model_path}")
+
+    profile = PerformanceProfile(optimized_model_dir=str(tmp_path))
+    providers = ["CPUExecutionProvider"]
+
+    first = OnnxSessionRegistry()
+    first.get_session(model_path, providers, profile=profile)
+    [written] = first.stats()
+    assert not written["from_optimized_cache"]
+    assert os.path.exists(written["optimized_model_path"])
+
+    # A new registry stands in for a later startup
+    second = OnnxSessionRegistry()
+    session = second.get_session(model_path, providers, profile=profile)
+    [loaded] = second.stats()
+    assert loaded["from_optimized_cache"]
+    assert loaded["optimized_model_path"] == written["optimized_model_path"]
+
+    model_input = session.get_inputs()[0]
+    shape = [dim if isinstance(dim, int) else 1 for dim in model_input.shape]
+    dummy_input = np.zeros(shape, dtype=np.float32)
+    assert session.run(None, {model_input.name: dummy_input})
@@ -0,0 +1,65 @@
+import cv2
+import numpy as np
+
+from app.facenet.preprocess import (
+    normalize_embedding,
+    normalize_embeddings,
+    preprocess_image,
+    preprocess_images,
+)
+from app.yolov8.utils import prepare_input_tensor
+
+
+def random_images(shapes, seed=0):
+    rng = np.random.default_rng(seed)
+    return [rng.integers(0, 256, size=shape, dtype=np.uint8) for shape in shapes]
+
+
+def test_preprocess_images_matches_single_image_path():
+    faces = random_images([(90, 70, 3), (200, 160, 3), (160, 160, 3)])
+
+    batch = preprocess_images(faces)
+
+    assert batch.shape == (3, 3, 160, 160)
+    assert batch.dtype == np.float32
+    expected = np.concatenate([preprocess_image(face) for face in faces])
+    np.testing.assert_allclose(batch, expected, rtol=0, atol=1e-6)
+
+
+def test_normalize_embeddings_matches_row_wise_normalization():
+    embeddings = np.random.default_rng(1).normal(size=(5, 512)).astype(np.float32)
+
+    normalized = normalize_embeddings(embeddings)
+
+    expected = np.stack([normalize_embedding(e) for e in embeddings])
+    np.testing.assert_allclose(normalized, expected, rtol=1e-6)
+    np.testing.assert_allclose(np.linalg.norm(normalized, axis=1), 1, rtol=1e-5)
+
+
+def reference_yolo_input(image, width, height):
+    # Previous YOLOv8.prepare_input
+    input_img = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    input_img = cv2.resize(input_img, (width, height))
+    input_img = input_img / 255.0
+    input_img = input_img.transpose(2, 0, 1)
+    return input_img[np.newaxis, :, :, :].astype(np.float32)
+
+
+def test_prepare_input_tensor_matches_previous_preprocessing():
+    for image in random_images([(480, 640, 3), (1000, 750, 3), (320, 320, 3)]):
+        tensor = prepare_input_tensor(image, 640, 640)
+
+        assert tensor.shape == (1, 3, 640, 640)
+        assert tensor.dtype == np.float32
+        expected = reference_yolo_input(image, 640, 640)
+        np.testing.assert_allclose(tensor, expected, rtol=0, atol=1e-6)
+
+
+def test_prepare_input_tensor_reuses_thread_buffer():
+    first, second = random_images([(300, 400, 3), (500, 200, 3)])
+
+    tensor = prepare_input_tensor(first, 320, 320)
+    assert prepare_input_tensor(second, 320, 320) is tensor
+
+    out = np.empty((1, 3, 320, 320), dtype=np.float32)
+    assert prepare_input_tensor(first, 320, 320, out=out) is out
@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+from app.utils.quantization import (
+    quantized_model_path,
+    resolve_model_path,
+    save_report,
+)
+
+
+@pytest.fixture
+def models(tmp_path):
+    model_path = tmp_path / "yolov8n.onnx"
+    model_path.write_bytes(b"float")
+    quantized_path = tmp_path / "yolov8n.int8-dynamic.onnx"
+    quantized_path.write_bytes(b"int8")
+    return str(model_path), str(quantized_path), str(tmp_path / "report.json")
+
+
+def write_entry(report_path, quantized_path, passed, mtime_ns=None):
+    if mtime_ns is None:
+        mtime_ns = os.stat(quantized_path).st_mtime_ns
+    entry = {"passed": passed, "mtime_ns": mtime_ns}
+    save_report({os.path.basename(quantized_path): entry}, report_path)
+
+
+def test_quantized_model_path():
+    assert (
+        quantized_model_path("app/models/facenet.onnx", "static")
+        == "app/models/facenet.int8-static.onnx"
+    )
+    with pytest.raises(ValueError):
+        quantized_model_path("app/models/facenet.onnx", "int4")
+
+
+def test_passing_variant_is_selected(models):
+    model_path, quantized_path, report_path = models
+    write_entry(report_path, quantized_path, passed=True)
+
+    assert resolve_model_path(model_path, "dynamic", report_path) == quantized_path
+    assert resolve_model_path(model_path, "", report_path) == model_path
+
+
+def test_float_model_is_kept_unless_the_gate_passed(models):
+    model_path, quantized_path, report_path = models
+
+    # Not benchmarked yet
+    assert resolve_model_path(model_path, "dynamic", report_path) == model_path
+
+    write_entry(report_path, quantized_path, passed=False)
+    assert resolve_model_path(model_path, "dynamic", report_path) == model_path
+
+    # Re-quantized after the benchmark ran
+    write_entry(report_path, quantized_path, passed=True, mtime_ns=0)
+    assert resolve_model_path(model_path, "dynamic", report_path) == model_path
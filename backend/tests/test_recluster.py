@@ -0,0 +1,91 @@
+import sqlite3
+import time
+
+import numpy as np
+
+from app.facecluster.facecluster import FaceCluster
+from app.facecluster.recluster import Reclusterer
+
+PEOPLE = dict(dim=16, num_people=6, spread=0.1)
+
+
+def make_cluster(tmp_path, embeddings):
+    cluster = FaceCluster(db_path=tmp_path / "faces.db", incremental=False)
+    cluster.fit(list(embeddings), [f"img{i}" for i in range(len(embeddings))])
+    # Attached but idle, so changes are left to `recluster`
+    cluster.reclusterer = Reclusterer(cluster, dirty_threshold=10**9)
+    return cluster
+
+
+def test_recluster_matches_a_full_fit(
+    tmp_path, clustered_embeddings, image_ids_as_paths
+):
+    embeddings = clustered_embeddings(np.random.default_rng(0), 120, **PEOPLE)
+    cluster = make_cluster(tmp_path, embeddings[:100])
+    cluster.add_faces(embeddings[100:], [f"img{i}" for i in range(100, 120)])
+    for i in range(0, 100, 9):
+        cluster.remove_image(f"img{i}")
+    version = cluster.view.version
+    assert cluster.dirty_faces == 20 + 12
+
+    assert cluster.recluster()
+
+    np.testing.assert_array_equal(
+        cluster.labels, cluster.dbscan.fit_predict(cluster.embeddings)
+    )
+    assert cluster.dirty_faces == 0
+    assert cluster.view.version > version
+    assert cluster.view.reclustered_at is not None
+    with sqlite3.connect(tmp_path / "faces.db") as conn:
+        saved = conn.execute(
+            "SELECT label FROM face_cluster_assignments ORDER BY seq"
+        ).fetchall()
+    assert [label for (label,) in saved] == cluster.labels.tolist()
+
+
+def test_faces_added_during_recluster_are_kept(
+    tmp_path, monkeypatch, clustered_embeddings, image_ids_as_paths
+):
+    embeddings = clustered_embeddings(np.random.default_rng(1), 80, **PEOPLE)
+    cluster = make_cluster(tmp_path, embeddings[:60])
+    cluster.add_faces(embeddings[60:70], [f"img{i}" for i in range(60, 70)])
+    fit_predict = cluster.dbscan.fit_predict
+    served = []
+
+    def slow_fit_predict(snapshot):
+        # Readers and writers go on while the refit runs
+        served.append(cluster.view.version)
+        cluster.add_faces(embeddings[70:], [f"img{i}" for i in range(70, 80)])
+        served.append(cluster.view.version)
+        return fit_predict(snapshot)
+
+    monkeypatch.setattr(cluster.dbscan, "fit_predict", slow_fit_predict)
+    assert cluster.recluster()
+
+    assert served[1] == served[0] + 1
+    assert len(cluster.labels) == 80
+    np.testing.assert_array_equal(cluster.labels[:70], fit_predict(embeddings[:70]))
+    assert set(cluster.labels[70:].tolist()) <= set(cluster.get_centroids())
+    assert cluster.dirty_faces == 10
+
+
+def test_reclusterer_runs_once_enough_faces_changed(
+    tmp_path, clustered_embeddings, image_ids_as_paths
+):
+    embeddings = clustered_embeddings(np.random.default_rng(2), 50, **PEOPLE)
+    cluster = make_cluster(tmp_path, embeddings[:40])
+    reclusterer = Reclusterer(cluster, dirty_threshold=10, interval=60)
+    reclusterer.start()
+    try:
+        cluster.add_faces(embeddings[40:45], [f"img{i}" for i in range(40, 45)])
+        time.sleep(0.2)
+        assert cluster.dirty_faces == 5
+
+        cluster.add_faces(embeddings[45:], [f"img{i}" for i in range(45, 50)])
+        deadline = time.time() + 10
+        while cluster.dirty_faces and time.time() < deadline:
+            time.sleep(0.02)
+        assert cluster.dirty_faces == 0
+    finally:
+        reclusterer.stop()
+    assert cluster.reclusterer is None
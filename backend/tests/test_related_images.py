@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from app.facecluster.facecluster import ClusterView
+
+
+def make_view(rng, num_images=300, faces_per_image=3, dim=16, eps=0.3):
+    centers = rng.normal(size=(10, dim))
+    owners = rng.integers(0, 10, size=num_images * faces_per_image)
+    noise = rng.normal(scale=0.3, size=(len(owners), dim))
+    embeddings = (centers[owners] + noise).astype(np.float32)
+    image_ids = [f"img{i // faces_per_image}" for i in range(len(embeddings))]
+    view = ClusterView(
+        embeddings,
+        np.linalg.norm(embeddings, axis=1),
+        image_ids,
+        np.full(len(embeddings), -1),
+        eps,
+    )
+    return view, embeddings, image_ids
+
+
+def brute_force(embeddings, image_ids, image_id, min_similarity):
+    unit = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    rows = [i for i, owner in enumerate(image_ids) if owner == image_id]
+    similarity = (unit @ unit[rows].T).max(axis=1)
+    best = {}
+    for row, owner in enumerate(image_ids):
+        if owner != image_id and similarity[row] >= min_similarity:
+            best[owner] = max(best.get(owner, -1.0), similarity[row])
+    return best
+
+
+@pytest.mark.parametrize("min_similarity", [None, 0.5])
+def test_related_images_are_ranked_by_best_face_similarity(min_similarity):
+    view, embeddings, image_ids = make_view(np.random.default_rng(0))
+
+    related = view.related_images("img7", min_similarity=min_similarity)
+
+    threshold = 1 - view.eps if min_similarity is None else min_similarity
+    expected = brute_force(embeddings, image_ids, "img7", threshold)
+    assert len(related) > 20
+    assert [image_id for image_id, _ in related] == sorted(
+        expected, key=lambda image_id: -expected[image_id]
+    )
+    for image_id, similarity in related:
+        assert similarity == pytest.approx(expected[image_id], abs=1e-5)
+
+
+def test_limit_returns_the_most_similar_images():
+    view, _, _ = make_view(np.random.default_rng(1))
+    related = view.related_images("img3")
+
+    for limit in (1, 5, len(related), len(related) + 10):
+        assert view.related_images("img3", limit=limit) == related[:limit]
+    assert view.related_images("img3", min_similarity=1.1) == []
+    assert view.related_images("missing") == []
@@ -0,0 +1,120 @@
+import json
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.facecluster.similarity_join import image_blocks, similar_image_pairs
+from app.routes import facetagging
+from main import app
+
+PEOPLE = dict(faces_per_image=None, num_people=8, spread=0.4)
+
+
+def flatten(faces):
+    # All faces in one array, with the image number of every row
+    embeddings = list(faces.values())
+    image_index = np.repeat(np.arange(len(embeddings)), [len(e) for e in embeddings])
+    return np.concatenate(embeddings), image_index
+
+
+def brute_force(embeddings, image_index, threshold):
+    unit = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    similarity = unit @ unit.T
+    best = {}
+    for i, j in zip(*np.nonzero(similarity >= threshold)):
+        first, second = image_index[i], image_index[j]
+        if first < second:
+            best[first, second] = max(best.get((first, second), -1), similarity[i, j])
+    return best
+
+
+@pytest.mark.parametrize(
+    "block_size, column_block, workers", [(7, 5, 3), (512, 4096, 1)]
+)
+def test_pairs_match_brute_force(block_size, column_block, workers, face_library):
+    embeddings, image_index = flatten(
+        face_library(np.random.default_rng(0), 120, **PEOPLE)
+    )
+
+    pairs = list(
+        similar_image_pairs(
+            embeddings,
+            image_index,
+            0.7,
+            block_size=block_size,
+            column_block=column_block,
+            workers=workers,
+        )
+    )
+
+    expected = brute_force(embeddings, image_index, 0.7)
+    assert len(pairs) > 100
+    assert [(first, second) for first, second, _ in pairs] == sorted(expected)
+    for first, second, similarity in pairs:
+        assert similarity == pytest.approx(expected[first, second], abs=1e-5)
+
+
+def test_limit_and_blocks(face_library):
+    embeddings, image_index = flatten(
+        face_library(np.random.default_rng(1), 120, **PEOPLE)
+    )
+    pairs = list(similar_image_pairs(embeddings, image_index, 0.7, block_size=9))
+
+    assert list(similar_image_pairs(embeddings, image_index, 0.7, limit=10)) == (
+        pairs[:10]
+    )
+    blocks = image_blocks(image_index, 9)
+    assert blocks[0][0] == 0 and blocks[-1][1] == len(image_index)
+    for (_, end), (start, _) in zip(blocks, blocks[1:]):
+        assert end == start and image_index[start - 1] != image_index[start]
+
+
+def test_match_endpoint_streams_pairs(monkeypatch, face_library):
+    faces = face_library(np.random.default_rng(2), 40, **PEOPLE)
+    embeddings, image_index = flatten(faces)
+    all_embeddings = [
+        {"image_path": f"/photos/{image}.jpg", "embeddings": list(image_faces)}
+        for image, image_faces in faces.items()
+    ]
+    monkeypatch.setattr(facetagging, "get_all_face_embeddings", lambda: all_embeddings)
+    client = TestClient(app)
+
+    response = client.get("/tag/match", params={"threshold": 0.8, "limit": 5})
+
+    assert response.status_code == 200
+    body = json.loads(response.text)
+    assert body["success"] is True
+    expected = sorted(brute_force(embeddings, image_index, 0.8))[:5]
+    assert [(pair["image1"], pair["image2"]) for pair in body["similar_pairs"]] == [
+        (f"img{first}.jpg", f"img{second}.jpg") for first, second in expected
+    ]
+
+
+def test_match_endpoint_reports_join_failures(monkeypatch, face_library):
+    faces = face_library(np.random.default_rng(3), 10, **PEOPLE)
+    all_embeddings = [
+        {"image_path": f"/photos/{image}.jpg", "embeddings": list(image_faces)}
+        for image, image_faces in faces.items()
+    ]
+    monkeypatch.setattr(facetagging, "get_all_face_embeddings", lambda: all_embeddings)
+    client = TestClient(app)
+
+    def failing_join(fail_after):
+        def join(*args):
+            for _ in range(fail_after):
+                yield 0, 1, 0.9
+            raise RuntimeError("join failed")
+
+        return join
+
+    # Before any pair is found the request fails as a whole
+    monkeypatch.setattr(facetagging, "similar_image_pairs", failing_join(0))
+    assert client.get("/tag/match").status_code == 500
+
+    # Later, the streamed document is still complete JSON
+    monkeypatch.setattr(facetagging, "similar_image_pairs", failing_join(1500))
+    response = client.get("/tag/match")
+    body = json.loads(response.text)
+    assert body["success"] is False
+    assert len(body["similar_pairs"]) == 1000